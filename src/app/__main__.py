@@ -2,6 +2,8 @@ import asyncio
 import logging
 import sys
 from dotenv import load_dotenv
+from app.agents import RunScheduler
+from app.api.prefetch import PrefetchDaemon
 from app.configs import AppConfig
 from app.interface import *
 
@@ -13,13 +15,18 @@ if __name__ == "__main__":
         configs = AppConfig.load()
         # =====================
 
-        chat = ChatManager()
+        if configs.prefetch.enabled:
+            PrefetchDaemon(configs.prefetch).start()
+
+        scheduler = RunScheduler()
+        chat = ChatManager(scheduler)
         gradio = chat.gradio_build_interface()
         _app, local_url, share_url = gradio.launch(server_name="0.0.0.0", server_port=configs.port, quiet=True, prevent_thread_lock=True, share=configs.gradio_share)
+        mount_metrics(_app)
         logging.info(f"UPO AppAI Chat is running on {share_url or local_url}")
 
         try:
-            telegram = TelegramApp()
+            telegram = TelegramApp(scheduler)
             telegram.add_miniapp_url(share_url)
             telegram.run()
         except AssertionError as e:
@@ -1,4 +1,5 @@
 from app.agents.pipeline import Pipeline, PipelineEvent
 from app.agents.core import PipelineInputs, QueryOutputs
+from app.agents.scheduler import RunScheduler, RunRejected
 
-__all__ = ["Pipeline", "PipelineInputs", "PipelineEvent", "QueryOutputs"]
+__all__ = ["Pipeline", "PipelineInputs", "PipelineEvent", "QueryOutputs", "RunScheduler", "RunRejected"]
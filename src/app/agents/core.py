@@ -1,14 +1,31 @@
+from typing import Any, Callable
 from pydantic import BaseModel
 from agno.agent import Agent
 from agno.team import Team
+from agno.tools import Toolkit
 from agno.tools.reasoning import ReasoningTools
 from app.api.tools.plan_memory_tool import PlanMemoryTool
+from app.api.tools.compaction import ToolOutputCompactor
+from app.api.core.metrics import tool_metrics_hook
+from app.api.core.tracing import team_tracing_hook, tool_tracing_hook
 from app.api.tools import *
 from app.configs import AppConfig
 from app.agents.prompts import *
 
 
 
+def with_tool_hooks(toolkits: list[Toolkit], hooks: list[Callable[..., Any]]) -> list[Toolkit]:
+    """
+    Applica gli hook a tutte le funzioni dei toolkit e restituisce i toolkit.
+    Serve per i tools del Team Leader: gli hook non vanno passati al Team, perché agno li applicherebbe anche
+    alle funzioni di delega ai membri (asincrone), e il Team Leader riceverebbe una coroutine al posto della risposta.
+    """
+    for toolkit in toolkits:
+        for function in toolkit.functions.values():
+            function.tool_hooks = hooks
+    return toolkits
+
+
 class QueryInputs(BaseModel):
     user_query: str
     strategy: str
@@ -99,18 +116,43 @@ class PipelineInputs:
             strategy=self.strategy.label,
         )
 
+    def get_tool_hooks(self, team_name: str | None = None) -> list[Callable[..., Any]]:
+        """
+        Restituisce gli hook da applicare ai tools degli agenti.
+        Ogni chiamata viene registrata nella traccia della run e la sua latenza e i suoi errori nelle metriche.
+        Se il budget di token è positivo, l'output dei tools viene compattato prima di essere passato al modello.
+        Args:
+            team_name: se indicato, gli hook sono per i tools del Team Leader, e le chiamate sono tracciate con il nome del team.
+        """
+        budget = self.configs.api.tool_token_budget
+        compaction = [ToolOutputCompactor(token_budget=budget).hook] if budget > 0 else []
+        tracing = team_tracing_hook(team_name) if team_name else tool_tracing_hook
+        return [tracing, tool_metrics_hook, *compaction]
+
     # ======================
     # Agent getters
     # ======================
+    def get_agent_members(self, with_symbols: bool = False) -> list[Agent]:
+        """
+        Crea gli agenti membri del Team (Market, News, Social).
+        Args:
+            with_symbols: se True, fornisce anche CryptoSymbolsTools all'agente di mercato,
+                necessario quando non c'è il Team Leader a risolvere i nomi delle criptovalute.
+        """
+        hooks = self.get_tool_hooks()
+        market_tools: list[Toolkit] = [MarketAPIsTool(), CryptoSymbolsTools()] if with_symbols else [MarketAPIsTool()]
+        market_agent = self.team_model.get_agent(MARKET_INSTRUCTIONS, "Market Agent", tools=market_tools, tool_hooks=hooks)
+        news_agent = self.team_model.get_agent(NEWS_INSTRUCTIONS, "News Agent", tools=[NewsAPIsTool()], tool_hooks=hooks)
+        social_agent = self.team_model.get_agent(SOCIAL_INSTRUCTIONS, "Socials Agent", tools=[SocialAPIsTool()], tool_hooks=hooks)
+        return [market_agent, news_agent, social_agent]
+
     def get_agent_team(self) -> Team:
-        market_agent = self.team_model.get_agent(MARKET_INSTRUCTIONS, "Market Agent", tools=[MarketAPIsTool()])
-        news_agent = self.team_model.get_agent(NEWS_INSTRUCTIONS, "News Agent", tools=[NewsAPIsTool()])
-        social_agent = self.team_model.get_agent(SOCIAL_INSTRUCTIONS, "Socials Agent", tools=[SocialAPIsTool()])
+        team_name = "CryptoAnalysisTeam"
         return Team(
             model=self.team_leader_model.get_model(TEAM_LEADER_INSTRUCTIONS),
-            name="CryptoAnalysisTeam",
-            tools=[ReasoningTools(), PlanMemoryTool(), CryptoSymbolsTools()],
-            members=[market_agent, news_agent, social_agent],
+            name=team_name,
+            tools=with_tool_hooks([ReasoningTools(), PlanMemoryTool(), CryptoSymbolsTools()], self.get_tool_hooks(team_name)),
+            members=self.get_agent_members(),
         )
 
     def get_agent_query_checker(self) -> Agent:
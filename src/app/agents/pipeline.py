@@ -1,18 +1,27 @@
+import asyncio
 from enum import Enum
 import logging
-import random
+import time
 from typing import Any, AsyncGenerator, Callable
-from agno.agent import RunEvent
+from agno.agent import Agent, RunEvent, RunOutput
+from agno.run.team import TeamRunEvent
 from agno.run.workflow import WorkflowRunEvent
 from agno.workflow.types import StepInput, StepOutput
 from agno.workflow.step import Step
 from agno.workflow.workflow import Workflow
 from app.agents.core import *
+from app.api.core.deadline import Deadline, set_deadline
+from app.api.core.metrics import get_metrics
+from app.api.core.tracing import Trace, set_trace
 
 logging = logging.getLogger("pipeline")
 
+# Ogni quanti secondi controllare se la run è stata cancellata mentre si aspetta il prossimo evento
+CANCEL_POLL_SECONDS = 0.5
+
 
 class PipelineEvent(str, Enum):
+    QUEUED = "Queued"
     QUERY_CHECK = "Query Check"
     QUERY_CHECK_END = "Query Check End"
     INFO_RECOVERY = "Info Recovery"
@@ -33,7 +42,7 @@ class PipelineEvent(str, Enum):
         return step_name == value and step_state == event
 
     @classmethod
-    def get_log_events(cls, run_id: int) -> list[tuple['PipelineEvent', Callable[[Any], str | None]]]:
+    def get_log_events(cls, run_id: str) -> list[tuple['PipelineEvent', Callable[[Any], str | None]]]:
         return [
             (PipelineEvent.QUERY_CHECK_END, lambda _: logging.info(f"[{run_id}] Query Check completed.")),
             (PipelineEvent.INFO_RECOVERY_END, lambda _: logging.info(f"[{run_id}] Info Recovery completed.")),
@@ -43,6 +52,77 @@ class PipelineEvent(str, Enum):
         ]
 
 
+class ThinkFilter:
+    """
+    Rimuove in modo incrementale i blocchi <think>...</think> dal testo generato da un modello.
+    Il testo arriva a pezzi (token) e un tag può essere spezzato tra due pezzi, quindi la parte
+    finale che potrebbe essere l'inizio di un tag viene trattenuta finché non arriva il pezzo successivo.
+    Se viene trovato un </think> senza il corrispettivo <think> (alcuni modelli omettono il tag di apertura)
+    tutto il testo precedente viene scartato.
+    """
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.text = ""
+        self.pending = ""
+        self.thinking = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Aggiunge un pezzo di testo al filtro.
+        Args:
+            chunk: il nuovo pezzo di testo generato
+        Returns:
+            Il testo visibile (senza i blocchi di ragionamento) accumulato finora.
+        """
+        buffer = self.pending + chunk
+        self.pending = ""
+
+        while buffer:
+            if self.thinking:
+                end = buffer.find(self.CLOSE)
+                if end == -1:
+                    self.pending = self.__partial_tag(buffer, self.CLOSE)
+                    return self.text
+                buffer = buffer[end + len(self.CLOSE):]
+                self.thinking = False
+                continue
+
+            start = buffer.find(self.OPEN)
+            close = buffer.find(self.CLOSE)
+            if close != -1 and (start == -1 or close < start):
+                self.text = "" # chiusura senza apertura: il testo precedente era ragionamento
+                buffer = buffer[close + len(self.CLOSE):]
+                continue
+            if start != -1:
+                self.text += buffer[:start]
+                buffer = buffer[start + len(self.OPEN):]
+                self.thinking = True
+                continue
+
+            self.pending = self.__partial_tag(buffer, self.OPEN) or self.__partial_tag(buffer, self.CLOSE)
+            self.text += buffer[:len(buffer) - len(self.pending)]
+            break
+        return self.text
+
+    def result(self) -> str:
+        """
+        Restituisce il testo visibile finale, includendo l'eventuale parte trattenuta.
+        """
+        return (self.text + ("" if self.thinking else self.pending)).strip()
+
+    @staticmethod
+    def __partial_tag(text: str, tag: str) -> str:
+        """
+        Restituisce la parte finale di text che corrisponde all'inizio di tag (es. "<thi").
+        """
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if tag.startswith(text[-size:]):
+                return text[-size:]
+        return ""
+
+
 class Pipeline:
     """
     Coordina gli agenti di servizio (Market, News, Social) e il Predictor finale.
@@ -57,6 +137,30 @@ class Pipeline:
             inputs: istanza di PipelineInputs contenente le configurazioni e i parametri della pipeline.
         """
         self.inputs = inputs
+        self.cancelled = False
+        self.trace: Trace | None = None
+
+        configs = inputs.configs
+        self.deadline = Deadline(
+            seconds=configs.agents.run_timeout_seconds,
+            request_timeout=configs.api.request_timeout_seconds,
+            stages={str(name): seconds for name, seconds in configs.agents.stage_timeouts.items()},
+        )
+
+    @property
+    def timed_out(self) -> bool:
+        """
+        Indica se l'ultima esecuzione è stata interrotta per la scadenza della run o di uno step.
+        """
+        return self.deadline.timed_out
+
+    def cancel(self) -> None:
+        """
+        Cancella l'esecuzione della pipeline.
+        Lo stream termina e le chiamate ai tools ancora in corso si fermano al primo controllo della scadenza.
+        """
+        self.cancelled = True
+        self.deadline.cancel()
 
     async def interact(self, listeners: list[tuple[PipelineEvent, Callable[[Any], str | None]]] = []) -> str:
         """
@@ -79,7 +183,10 @@ class Pipeline:
         Returns:
             La risposta generata dalla pipeline.
         """
-        run_id = random.randint(1000, 9999) # Per tracciare i log
+        self.trace = Trace(query=self.inputs.user_query, strategy=self.inputs.strategy.label)
+        run_id = self.trace.run_id # Per tracciare i log
+        self.deadline.restart() # il tempo passato in coda non conta
+        self.deadline.timed_out = False
         logging.info(f"[{run_id}] Pipeline query: {self.inputs.user_query}")
 
         events = [*PipelineEvent.get_log_events(run_id), *listeners]
@@ -89,8 +196,17 @@ class Pipeline:
         )
 
         workflow = self.build_workflow()
-        async for item in self.run_stream(workflow, query, events=events):
-            yield item
+        try:
+            async for item in self.run_stream(workflow, query, events=events, deadline=self.deadline, trace=self.trace):
+                yield item
+        finally:
+            tracing = self.inputs.configs.tracing
+            if tracing.enabled:
+                try:
+                    path = self.trace.export(tracing.directory, tracing.format)
+                    logging.info(f"[{run_id}] Trace saved to {path}")
+                except OSError as e:
+                    logging.warning(f"[{run_id}] Trace could not be saved: {e}")
 
     def build_workflow(self) -> Workflow:
         """
@@ -99,7 +215,6 @@ class Pipeline:
             L'istanza di Workflow costruita.
         """
         # Step 1: Crea gli agenti e il team
-        team = self.inputs.get_agent_team()
         query_check = self.inputs.get_agent_query_checker()
         report = self.inputs.get_agent_report_generator()
 
@@ -110,7 +225,13 @@ class Pipeline:
             return StepOutput(stop=stop)
 
         query_check = Step(name=PipelineEvent.QUERY_CHECK, agent=query_check)
-        info_recovery = Step(name=PipelineEvent.INFO_RECOVERY, team=team)
+        agents_configs = self.inputs.configs.agents
+        if agents_configs.parallel_members:
+            members = self.inputs.get_agent_members(with_symbols=True)
+            executor = self.build_parallel_members(members, agents_configs.members_timeout_seconds)
+            info_recovery = Step(name=PipelineEvent.INFO_RECOVERY, executor=executor)
+        else:
+            info_recovery = Step(name=PipelineEvent.INFO_RECOVERY, team=self.inputs.get_agent_team())
         report_generation = Step(name=PipelineEvent.REPORT_GENERATION, agent=report)
 
         # Step 3: Ritorna il workflow completo
@@ -121,40 +242,213 @@ class Pipeline:
             report_generation
         ])
 
+    @staticmethod
+    def build_parallel_members(members: list[Agent], timeout: float) -> Callable[[StepInput], AsyncGenerator[Any, None]]:
+        """
+        Crea l'executor dello step di Info Recovery che esegue gli agenti membri in parallelo.
+        Gli eventi degli agenti (es. i tool usati) vengono inoltrati appena arrivano, in modo che
+        i listeners della pipeline continuino a funzionare. Tutti gli agenti condividono la stessa
+        scadenza: allo scadere, gli agenti ancora in esecuzione vengono cancellati.
+        Args:
+            members: gli agenti da eseguire in parallelo
+            timeout: scadenza condivisa in secondi
+        Returns:
+            La funzione asincrona da usare come executor di uno Step.
+        """
+        async def executor(step_input: StepInput) -> AsyncGenerator[Any, None]:
+            queue: asyncio.Queue[Any] = asyncio.Queue()
+            outputs: dict[str, str] = {}
+
+            async def run_member(agent: Agent) -> None:
+                try:
+                    stream = agent.arun(step_input.input, stream=True, stream_intermediate_steps=True, yield_run_response=True) # type: ignore
+                    async for event in stream: # type: ignore
+                        if isinstance(event, RunOutput):
+                            outputs[agent.name or ""] = str(event.content or "")
+                        else:
+                            await queue.put(event)
+                except Exception as e:
+                    logging.warning(f"{agent.name} failed: {e}")
+                    outputs[agent.name or ""] = f"Errore durante il recupero dei dati: {e}"
+                finally:
+                    await queue.put(None) # segnala che l'agente ha terminato
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            tasks = [asyncio.create_task(run_member(agent)) for agent in members]
+            running = len(tasks)
+            try:
+                while running > 0:
+                    event = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - loop.time()))
+                    if event is None: running -= 1
+                    else: yield event
+            except asyncio.TimeoutError:
+                logging.warning(f"Parallel members exceeded the deadline of {timeout}s")
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            sections = [f"## {agent.name}\n{outputs.get(agent.name or '', 'Nessun risultato entro il tempo limite.')}" for agent in members]
+            yield StepOutput(content="\n\n".join(sections))
+
+        return executor
+
     @classmethod
-    async def run_stream(cls, workflow: Workflow, query: QueryInputs, events: list[tuple[PipelineEvent, Callable[[Any], str | None]]]) -> AsyncGenerator[str, None]:
+    async def run_stream(cls, workflow: Workflow, query: QueryInputs, events: list[tuple[PipelineEvent, Callable[[Any], str | None]]], deadline: Deadline | None = None, trace: Trace | None = None) -> AsyncGenerator[str, None]:
         """
         Esegue il workflow e restituisce gli eventi di stato e il risultato finale.
+        Il workflow viene eseguito in un task separato che condivide la scadenza con i tools, in modo da poter
+        essere interrotto allo scadere della run o di uno step, oppure quando lo stream viene chiuso (es. il client
+        Gradio si disconnette). In tutti questi casi la scadenza viene cancellata e i tools smettono di fare richieste.
         Args:
             workflow: L'istanza di Workflow da eseguire
             query: Gli input della query
             events: La lista di eventi e callback da gestire durante l'esecuzione.
+            deadline: La scadenza della run (opzionale, di default nessuna scadenza)
+            trace: La traccia della run, in cui registrare step, agenti, tools e chiamate ai provider (opzionale)
         Yields:
-            Aggiornamenti di stato e la risposta finale generata dal workflow.
+            Aggiornamenti di stato, il report parziale man mano che viene generato e la risposta finale.
         """
-        iterator = await workflow.arun(query, stream=True, stream_intermediate_steps=True)
+        deadline = deadline or Deadline()
+        trace = trace or Trace()
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+
+        async def produce() -> None:
+            set_deadline(deadline) # ereditata dai task e dai thread creati dal workflow
+            set_trace(trace)
+            try:
+                iterator = await workflow.arun(query, stream=True, stream_intermediate_steps=True)
+                async for event in iterator:
+                    cls.__trace_event(trace, event) # prima che il workflow prosegua, così gli step contengono i propri agenti
+                    await queue.put(event)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        task = asyncio.create_task(produce())
         content = None
+        report = ThinkFilter()
+        metrics = get_metrics()
+        started = time.monotonic()
+        stages_started: dict[str, float] = {}
+        outcome = "completed"
 
-        async for event in iterator:
-            step_name = getattr(event, 'step_name', '')
+        try:
+            while True:
+                try:
+                    remaining = deadline.remaining()
+                    timeout = CANCEL_POLL_SECONDS if remaining is None else min(remaining, CANCEL_POLL_SECONDS)
+                    event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if deadline.cancelled.is_set():
+                        outcome = "cancelled"
+                        logging.info("Run cancelled")
+                        yield "🛑 Esecuzione annullata."
+                        return
+                    if deadline.expired():
+                        outcome = "timeout"
+                        deadline.timed_out = True
+                        stage = deadline.stage or "la run"
+                        logging.error(f"Deadline exceeded during {stage}")
+                        yield f"⏱️ Tempo scaduto durante '{stage}', riprova più tardi."
+                        return
+                    continue
+                if event is None: break
+                if isinstance(event, Exception): raise event
 
-            # Chiama i listeners (se presenti) per ogni evento
-            for app_event, listener in events:
-                if app_event.check_event(event.event, step_name):
-                    update = listener(event)
-                    if update: yield update
+                step_name = getattr(event, 'step_name', '')
+                if event.event == WorkflowRunEvent.step_started.value and step_name:
+                    deadline.start_stage(step_name)
+                    stages_started[step_name] = time.monotonic()
+                if event.event == WorkflowRunEvent.step_completed.value and step_name in stages_started:
+                    metrics.observe("pipeline_stage_seconds", time.monotonic() - stages_started.pop(step_name), stage=step_name)
+                cls.__record_agent_metrics(event)
 
-            # Salva il contenuto finale quando uno step è completato
-            if event.event == WorkflowRunEvent.step_completed.value:
-                content = getattr(event, 'content', '')
+                # Chiama i listeners (se presenti) per ogni evento
+                for app_event, listener in events:
+                    if app_event.check_event(event.event, step_name):
+                        update = listener(event)
+                        if update: yield update
+
+                # Restituisce il report parziale man mano che arrivano i token
+                delta = getattr(event, 'content', None)
+                if event.event == RunEvent.run_content.value and step_name == PipelineEvent.REPORT_GENERATION and isinstance(delta, str):
+                    previous = report.text
+                    partial = report.feed(delta)
+                    if partial.strip() and partial != previous: yield partial
+
+                # Salva il contenuto finale quando uno step è completato
+                if event.event == WorkflowRunEvent.step_completed.value:
+                    content = getattr(event, 'content', '')
+        except GeneratorExit:
+            outcome = "closed" if outcome == "completed" else outcome
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            # Run terminata, scaduta o cancellata: ferma il workflow e i tools ancora in esecuzione
+            deadline.cancel()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            metrics.inc("pipeline_runs_total", outcome=outcome)
+            metrics.observe("pipeline_run_seconds", time.monotonic() - started, outcome=outcome)
+            trace.finish(error=outcome if outcome in ("error", "timeout") else None, outcome=outcome)
 
         # Restituisce la risposta finale
         if content and isinstance(content, str):
-            think_str = "</think>"
-            think = content.rfind(think_str)
-            yield content[(think + len(think_str)):] if think != -1 else content
+            final = ThinkFilter()
+            final.feed(content)
+            yield final.result()
         elif content and isinstance(content, QueryOutputs):
             yield content.response
         else:
             logging.error(f"No output from workflow: {content}")
             yield "Nessun output dal workflow, qualcosa è andato storto."
+
+    @staticmethod
+    def __trace_event(trace: Trace, event: Any) -> None:
+        """
+        Registra nella traccia l'inizio e la fine degli step del workflow e dei turni degli agenti.
+        """
+        step_name = getattr(event, 'step_name', '')
+        if event.event == WorkflowRunEvent.step_started.value and step_name:
+            trace.start_step(step_name)
+        elif event.event == WorkflowRunEvent.step_completed.value and step_name:
+            trace.end_step(step_name)
+
+        # Il Team Leader ha gli stessi eventi degli agenti, ma con il nome del team
+        agent = getattr(event, 'agent_name', None) or getattr(event, 'team_name', None)
+        if not agent:
+            return
+        if event.event in (RunEvent.run_started.value, TeamRunEvent.run_started.value):
+            trace.agent_span(agent)
+        elif event.event in (RunEvent.run_error.value, TeamRunEvent.run_error.value):
+            trace.end_agent(agent, error=str(getattr(event, 'content', '') or "Run error"))
+        elif event.event in (RunEvent.run_completed.value, TeamRunEvent.run_completed.value):
+            run_metrics = getattr(event, 'metrics', None)
+            tokens = {"input_tokens": run_metrics.input_tokens or 0, "output_tokens": run_metrics.output_tokens or 0} if run_metrics else {}
+            trace.end_agent(agent, **tokens)
+
+    @staticmethod
+    def __record_agent_metrics(event: Any) -> None:
+        """
+        Registra nelle metriche la durata, il tempo al primo token, i token usati e gli errori delle run degli agenti.
+        """
+        agent = getattr(event, 'agent_name', None)
+        if not agent:
+            return
+        metrics = get_metrics()
+        if event.event == RunEvent.run_error.value:
+            metrics.inc("llm_errors_total", agent=agent)
+            return
+        run_metrics = getattr(event, 'metrics', None)
+        if event.event != RunEvent.run_completed.value or run_metrics is None:
+            return
+        if run_metrics.duration is not None:
+            metrics.observe("llm_run_seconds", run_metrics.duration, agent=agent)
+        if run_metrics.time_to_first_token is not None:
+            metrics.observe("llm_time_to_first_token_seconds", run_metrics.time_to_first_token, agent=agent)
+        metrics.inc("llm_tokens_total", run_metrics.input_tokens or 0, agent=agent, direction="input")
+        metrics.inc("llm_tokens_total", run_metrics.output_tokens or 0, agent=agent, direction="output")
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable
+from app.agents.pipeline import CANCEL_POLL_SECONDS, Pipeline, PipelineEvent
+from app.configs import AppConfig
+
+logging = logging.getLogger("scheduler")
+
+
+class RunRejected(Exception):
+    """
+    Eccezione lanciata quando una run non può essere accettata dallo scheduler
+    (coda piena oppure l'utente ha già una run attiva).
+    """
+
+
+@dataclass
+class QueuedEvent:
+    """
+    Evento inviato ai listeners di PipelineEvent.QUEUED mentre la run è in coda.
+    """
+    position: int
+    """Posizione in coda, 1 indica che la run è la prossima ad essere eseguita"""
+    event: str = PipelineEvent.QUEUED.value
+
+
+@dataclass(order=True)
+class Ticket:
+    """
+    Prenotazione di una run in attesa di essere eseguita.
+    L'ordinamento (priorità e poi ordine di arrivo) è quello usato dalla coda.
+    """
+    priority: int
+    sequence: int
+    user: str = field(compare=False)
+    loop: asyncio.AbstractEventLoop = field(compare=False)
+    changed: asyncio.Event = field(compare=False, default_factory=asyncio.Event)
+    admitted: bool = field(compare=False, default=False)
+
+
+class RunScheduler:
+    """
+    Scheduler delle run della Pipeline condiviso tra le interfacce (Gradio e Telegram).
+    - Limita il numero di run eseguite contemporaneamente (le altre attendono in una coda a priorità).
+    - Ogni utente può avere al massimo una run attiva (in coda o in esecuzione).
+    - Se la coda è piena le nuove run vengono rifiutate (backpressure).
+    - Mentre una run è in coda, i listeners di PipelineEvent.QUEUED ricevono la posizione aggiornata.
+
+    Le interfacce girano su event loop diversi, quindi lo stato è protetto da un lock
+    e le notifiche vengono inviate con call_soon_threadsafe.
+    """
+
+    def __init__(self, max_concurrent_runs: int | None = None, max_queued_runs: int | None = None):
+        """
+        Inizializza lo scheduler. I valori non specificati vengono letti da configs.yaml (sezione scheduler).
+        Args:
+            max_concurrent_runs: numero massimo di run eseguite contemporaneamente
+            max_queued_runs: numero massimo di run in attesa, oltre il quale le nuove vengono rifiutate
+        """
+        if max_concurrent_runs is None or max_queued_runs is None:
+            configs = AppConfig().scheduler
+            max_concurrent_runs = max_concurrent_runs or configs.max_concurrent_runs
+            max_queued_runs = max_queued_runs if max_queued_runs is not None else configs.max_queued_runs
+        self.max_concurrent_runs = max(1, max_concurrent_runs)
+        self.max_queued_runs = max_queued_runs
+
+        self.lock = threading.Lock()
+        self.running = 0
+        self.queue: list[Ticket] = []
+        self.active_users: set[str] = set()
+        self.counter = itertools.count()
+
+    async def run_stream(self, pipeline: Pipeline, user: str, listeners: list[tuple[PipelineEvent, Callable[[Any], str | None]]] = [], priority: int = 0) -> AsyncGenerator[str, None]:
+        """
+        Mette in coda la pipeline e, quando arriva il suo turno, la esegue restituendo il suo stream.
+        Args:
+            pipeline: la pipeline da eseguire
+            user: identificativo dell'utente che ha richiesto la run
+            listeners: i listeners da passare alla pipeline (compresi quelli di PipelineEvent.QUEUED)
+            priority: priorità della run, valori più bassi vengono eseguiti prima
+        Yields:
+            Gli aggiornamenti della coda restituiti dai listeners e poi lo stream della pipeline.
+        Raises:
+            RunRejected: se la coda è piena o l'utente ha già una run attiva.
+        """
+        ticket = self.__enqueue(user, priority)
+        try:
+            last_position = 0
+            while not ticket.admitted:
+                position = self.position(ticket)
+                if position != last_position:
+                    last_position = position
+                    for app_event, listener in listeners:
+                        if app_event == PipelineEvent.QUEUED:
+                            update = listener(QueuedEvent(position))
+                            if update: yield update
+
+                try:
+                    await asyncio.wait_for(ticket.changed.wait(), timeout=CANCEL_POLL_SECONDS)
+                    ticket.changed.clear()
+                except asyncio.TimeoutError:
+                    if pipeline.cancelled:
+                        yield "🛑 Esecuzione annullata."
+                        return
+
+            async for chunk in pipeline.interact_stream(listeners):
+                yield chunk
+        finally:
+            self.__release(ticket)
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        Restituisce la posizione in coda del ticket (1 = prossimo), oppure 0 se è già in esecuzione.
+        """
+        with self.lock:
+            if ticket.admitted:
+                return 0
+            return 1 + sum(1 for other in self.queue if other < ticket)
+
+    def status(self) -> dict[str, int]:
+        """
+        Restituisce lo stato attuale dello scheduler (run in esecuzione e in coda).
+        """
+        with self.lock:
+            return {"running": self.running, "queued": len(self.queue)}
+
+    def __enqueue(self, user: str, priority: int) -> Ticket:
+        with self.lock:
+            if user in self.active_users:
+                raise RunRejected("C'è già una richiesta in corso, attendi che termini.")
+            if self.running >= self.max_concurrent_runs and len(self.queue) >= self.max_queued_runs:
+                raise RunRejected("Troppe richieste in corso, riprova tra qualche minuto.")
+
+            ticket = Ticket(priority, next(self.counter), user, asyncio.get_running_loop())
+            self.active_users.add(user)
+            heapq.heappush(self.queue, ticket)
+            self.__admit()
+            logging.info(f"Run of {user} queued [running={self.running}, queued={len(self.queue)}]")
+            return ticket
+
+    def __release(self, ticket: Ticket) -> None:
+        with self.lock:
+            self.active_users.discard(ticket.user)
+            if ticket.admitted:
+                self.running -= 1
+            elif ticket in self.queue:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+            self.__admit()
+
+    def __admit(self) -> None:
+        """
+        Ammette le run in testa alla coda finché ci sono posti liberi e notifica tutte quelle in attesa,
+        dato che la loro posizione potrebbe essere cambiata. Deve essere chiamato con il lock acquisito.
+        """
+        while self.queue and self.running < self.max_concurrent_runs:
+            ticket = heapq.heappop(self.queue)
+            ticket.admitted = True
+            self.running += 1
+            self.__notify(ticket)
+
+        for ticket in self.queue:
+            self.__notify(ticket)
+
+    @staticmethod
+    def __notify(ticket: Ticket) -> None:
+        if ticket.loop.is_closed():
+            return
+        ticket.loop.call_soon_threadsafe(ticket.changed.set)
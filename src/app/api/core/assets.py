@@ -0,0 +1,289 @@
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from app.api.core.symbols import SymbolIndex, base_of, load_table, normalize_name
+
+
+CRYPTOS_FILE = "resources/cryptos.csv"
+"""Default table of the known crypto assets (the same cache used by CryptoSymbolsTools)"""
+
+FUZZY_CANDIDATES = 20
+"""Number of n-gram candidates checked with the edit distance"""
+
+MIN_TICKER_MARKET_CAP = 50_000_000
+"""Minimum market cap of an asset matched by a ticker-like input.
+The table contains many tiny tokens named after stock tickers (e.g. 'TSLA33436-USD', 'NVDA33890-USD'), that must not be
+resolved when the input is the stock ticker. Smaller assets keep the provider format of their base symbol anyway."""
+
+TICKER_PATTERN = re.compile(r"[a-z0-9]{1,5}(-[a-z]{3,4})?")
+"""Inputs that look like a ticker: up to 5 letters or digits, optionally with the quote currency (e.g. 'BTC', 'tsla', 'ETH-USD')"""
+
+ALIASES: dict[str, str] = {
+    "xbt": "BTC",
+    "ether": "ETH",
+    "ripple": "XRP",
+    "binance coin": "BNB",
+    "matic": "POL",
+    "polygon": "POL",
+    "tether": "USDT",
+}
+"""Common names and tickers that should always resolve to a specific base symbol"""
+
+PROVIDER_FORMATS: dict[str, str] = {
+    "binance": "{base}{quote}",
+    "coinbase": "{base}-{quote}",
+    "cryptocompare": "{base}",
+    "yfinance": "{base}-{quote}",
+}
+"""How each provider formats the symbol of an asset from its base symbol and quote currency"""
+
+
+@dataclass(frozen=True)
+class Asset:
+    """
+    An asset resolved from the user input.
+    """
+    base: str
+    """Base symbol used by the exchanges (e.g. 'BTC')"""
+    name: str
+    """Name of the asset (e.g. 'Bitcoin USD')"""
+    yahoo_symbol: str
+    """Symbol of the asset on Yahoo Finance, that can be disambiguated with digits (e.g. 'BANANA28886-USD')"""
+
+    def symbol(self, provider: str, quote: str = "USD") -> str:
+        """
+        Returns the symbol of the asset for the given provider.
+        Args:
+            provider (str): The name of the provider (one of PROVIDER_FORMATS, case-insensitive).
+            quote (str): The quote currency (e.g. 'USD' or 'USDT').
+        Returns:
+            str: The provider-specific symbol.
+        """
+        provider = provider.lower()
+        if provider == "yfinance" and self.yahoo_symbol.endswith(f"-{quote}"):
+            return self.yahoo_symbol
+        return PROVIDER_FORMATS.get(provider, "{base}-{quote}").format(base=self.base, quote=quote)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance between the two strings, computed only up to `max_distance`.
+    Returns `max_distance + 1` as soon as the distance is known to be greater.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def max_typos(text: str) -> int:
+    """
+    Maximum edit distance allowed for the text: short inputs (tickers) must match exactly.
+    """
+    length = len(text.replace(" ", ""))
+    if length < 5: return 0
+    if length < 9: return 1
+    return 2
+
+
+def is_ticker(key: str) -> bool:
+    """
+    Whether the (lowercase) input looks like a ticker rather than a name (see TICKER_PATTERN).
+    """
+    return TICKER_PATTERN.fullmatch(key) is not None
+
+
+class AssetResolver:
+    """
+    Central resolver from the user input (symbols, names, aliases, typos) to the assets known in the symbols table.
+    The resolution is done in order:
+    - aliases (e.g. 'xbt' -> BTC)
+    - exact symbol or name, also without spaces (e.g. 'doge coin' -> Dogecoin)
+    - bounded edit distance over the n-gram candidates of the SymbolIndex (e.g. 'etherum' -> Ethereum)
+    Ticker-like inputs (see is_ticker) only use the aliases and the exact matches of assets with a market cap of at least
+    MIN_TICKER_MARKET_CAP (or their exact Yahoo symbol): compact names and typos only apply to names, so that stock tickers
+    (e.g. 'TSLA', 'META', 'COIN') are not resolved to unrelated tokens.
+    Results are memoized, so each input is resolved only once; the shared resolver is rebuilt when the table is refreshed.
+    """
+
+    def __init__(self, index: SymbolIndex):
+        """
+        Args:
+            index (SymbolIndex): The index of the known assets.
+        """
+        self.index = index
+        self.by_compact_name: dict[str, int] = {}
+        for i, name in enumerate(index.normalized):
+            self.by_compact_name.setdefault(name.replace(" ", ""), i)
+
+        self.cache: dict[str, Asset | None] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def from_file(path: str = CRYPTOS_FILE) -> 'AssetResolver':
+        """
+        Builds the resolver from the symbols table saved by CryptoSymbolsTools (using its binary cache when available).
+        If the file does not exist, the resolver does not resolve anything.
+        """
+        table = load_table(path)
+        return AssetResolver(SymbolIndex(table["Symbol"], table["Name"], table["Market Cap"]))
+
+    def resolve(self, query: str) -> Asset | None:
+        """
+        Resolves the user input to a known asset.
+        Args:
+            query (str): A symbol (e.g. 'BTC', 'BTC-USD'), a name (e.g. 'bitcoin', 'doge coin') or a misspelled name.
+        Returns:
+            Asset | None: The resolved asset, or None if the input does not match any known asset.
+        """
+        key = query.strip().lower()
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+
+        asset = self.__resolve_ticker(key) if is_ticker(key) else self.__resolve(key)
+        with self.lock:
+            self.cache[key] = asset
+        return asset
+
+    def symbol(self, query: str, provider: str, quote: str = "USD") -> str | None:
+        """
+        Resolves the user input and returns the symbol for the given provider, or None if it is not resolved.
+        """
+        asset = self.resolve(query)
+        return asset.symbol(provider, quote) if asset else None
+
+    def __resolve_ticker(self, key: str) -> Asset | None:
+        if len(self.index) == 0:
+            return None
+
+        base = key.split("-")[0]
+        if base in ALIASES:
+            position = self.index.by_symbol.get(ALIASES[base])
+            if position is not None:
+                return self.__asset(position)
+
+        for position in self.index.exact(key) or self.index.exact(base):
+            if self.index.symbols[position].lower() == key or self.index.market_caps[position] >= MIN_TICKER_MARKET_CAP:
+                return self.__asset(position)
+        return None
+
+    def __resolve(self, key: str) -> Asset | None:
+        if not key or len(self.index) == 0:
+            return None
+
+        base = key.split("-")[0] if "-" in key else key
+        if base in ALIASES:
+            position = self.index.by_symbol.get(ALIASES[base])
+            if position is not None:
+                return self.__asset(position)
+
+        exact = self.index.exact(key) or self.index.exact(base)
+        if exact:
+            return self.__asset(exact[0])
+
+        compact = normalize_name(key).replace(" ", "")
+        if compact in self.by_compact_name:
+            return self.__asset(self.by_compact_name[compact])
+
+        max_distance = max_typos(compact)
+        if max_distance == 0:
+            return None
+
+        best: tuple[int, int] | None = None
+        for position in self.index.fuzzy(key, limit=FUZZY_CANDIDATES, min_similarity=0.0):
+            distance = edit_distance(compact, self.index.normalized[position].replace(" ", ""), max_distance)
+            if distance <= max_distance and (best is None or (distance, position) < best):
+                best = (distance, position)
+        return self.__asset(best[1]) if best else None
+
+    def __asset(self, position: int) -> Asset:
+        yahoo_symbol = self.index.symbols[position]
+        return Asset(base=base_of(yahoo_symbol), name=self.index.names[position], yahoo_symbol=yahoo_symbol)
+
+
+@lru_cache(maxsize=1)
+def get_asset_resolver() -> AssetResolver:
+    """
+    Returns the shared AssetResolver, built from the symbols table on the first call.
+    """
+    return AssetResolver.from_file()
+
+
+def invalidate_asset_resolver(path: str = CRYPTOS_FILE) -> None:
+    """
+    Discards the shared AssetResolver (and its memoized results) after the symbols table at `path` has been refreshed,
+    so that the next call to get_asset_resolver rebuilds it. Other tables do not affect the shared resolver.
+    """
+    if os.path.abspath(path) == os.path.abspath(CRYPTOS_FILE):
+        get_asset_resolver.cache_clear()
+
+
+def provider_symbol(asset_id: str, provider: str, quote: str = "USD") -> str:
+    """
+    Returns the symbol of the asset for the given provider.
+    Known crypto assets are resolved with the shared AssetResolver (tolerating names, aliases and typos);
+    other inputs (e.g. stock tickers) keep their base symbol and get the provider format.
+    Args:
+        asset_id (str): The asset requested by the user or the agent (e.g. 'BTC', 'BTC-USD', 'etherum').
+        provider (str): The name of the provider (one of PROVIDER_FORMATS).
+        quote (str): The quote currency.
+    Returns:
+        str: The provider-specific symbol.
+    """
+    symbol = get_asset_resolver().symbol(asset_id, provider, quote)
+    if symbol:
+        return symbol
+    base = asset_id.strip().split("-")[0].upper()
+    return PROVIDER_FORMATS.get(provider.lower(), "{base}-{quote}").format(base=base, quote=quote)
+
+
+def resolve_base(asset: str) -> str:
+    """
+    Returns the base symbol of an asset given as symbol or name (e.g. 'solana' -> 'SOL').
+    Unknown assets keep their base symbol in uppercase.
+    """
+    resolved = get_asset_resolver().resolve(asset)
+    return resolved.base if resolved else base_of(asset.strip())
+
+
+class AssetUsage:
+    """
+    Counts how many times each asset has been requested by the users (through the tools),
+    so that the most used ones can be refreshed in background.
+    """
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, asset_ids: list[str]) -> None:
+        bases = [resolve_base(asset_id) for asset_id in asset_ids if asset_id.strip()]
+        with self.lock:
+            self.counts.update(bases)
+
+    def most_used(self, n: int) -> list[str]:
+        """
+        Returns the base symbols of the `n` most requested assets.
+        """
+        with self.lock:
+            return [base for base, _ in self.counts.most_common(n)]
+
+
+@lru_cache(maxsize=1)
+def get_asset_usage() -> AssetUsage:
+    """
+    Returns the AssetUsage shared by all the runs.
+    """
+    return AssetUsage()
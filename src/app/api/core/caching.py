@@ -0,0 +1,35 @@
+import threading
+from functools import lru_cache
+
+
+class CachePolicy:
+    """
+    Process-wide policy of the provider caches (products, Google News results, X users).
+    Each cache has its own TTL, but when the background prefetch is enabled the data it fetches must stay fresh
+    until the next refresh: the prefetch raises the minimum TTL to its interval, and the caches read it at every lookup.
+    """
+
+    def __init__(self):
+        self.min_ttl_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def extend(self, seconds: float) -> None:
+        """
+        Raises the minimum TTL of all the caches to `seconds` (it is never lowered).
+        """
+        with self.lock:
+            self.min_ttl_seconds = max(self.min_ttl_seconds, seconds)
+
+    def ttl(self, seconds: float) -> float:
+        """
+        Returns the TTL to use for a cache whose own TTL is `seconds`.
+        """
+        return max(seconds, self.min_ttl_seconds)
+
+
+@lru_cache(maxsize=1)
+def get_cache_policy() -> CachePolicy:
+    """
+    Returns the CachePolicy shared by all the caches.
+    """
+    return CachePolicy()
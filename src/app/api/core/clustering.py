@@ -0,0 +1,126 @@
+import hashlib
+import re
+from collections import defaultdict
+import numpy as np
+from app.api.core.news import Article
+
+
+NUM_PERMUTATIONS = 64
+"""Number of hash functions of the MinHash signatures"""
+
+BANDS = 16
+"""Number of LSH bands (NUM_PERMUTATIONS // BANDS rows each): pairs with similarity 0.6 are candidates ~90% of the times, 0.7 ~98%"""
+
+SIMILARITY_THRESHOLD = 0.6
+"""Minimum Jaccard similarity of the titles (or of the descriptions) to consider two articles the same story"""
+
+__PRIME = (1 << 31) - 1
+__RANDOM = np.random.default_rng(seed=96)
+__A = __RANDOM.integers(1, __PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+__B = __RANDOM.integers(0, __PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str) -> set[str]:
+    """
+    Returns the words and the pairs of consecutive words of the text (lowercase, punctuation removed).
+    """
+    words = re.findall(r"[a-z0-9$€%]+", text.lower())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(features: set[str]) -> np.ndarray:
+    """
+    Computes the MinHash signature of a set of features.
+    Two signatures have the same value in a position with probability equal to the Jaccard similarity of the sets.
+    Args:
+        features (set[str]): The features (e.g. the shingles of a text).
+    Returns:
+        np.ndarray: The signature, NUM_PERMUTATIONS values. All values are the maximum if there are no features.
+    """
+    if not features:
+        return np.full(NUM_PERMUTATIONS, __PRIME, dtype=np.uint64)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode(), digest_size=4).digest(), "big") for f in features),
+        dtype=np.uint64, count=len(features),
+    )
+    permuted = (np.outer(__A, hashes) + __B[:, None]) % __PRIME
+    return permuted.min(axis=1)
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def cluster_articles(articles: list[Article], threshold: float = SIMILARITY_THRESHOLD) -> list[list[int]]:
+    """
+    Groups the articles that report the same story, even with slightly different titles.
+    Candidate pairs are found with LSH over the MinHash signatures of the titles and of the descriptions
+    (linear in the number of articles), then confirmed with the exact Jaccard similarity.
+    Args:
+        articles (list[Article]): The articles to group.
+        threshold (float): The minimum similarity of titles or descriptions.
+    Returns:
+        list[list[int]]: The clusters, as lists of positions in the input, ordered by their first article.
+    """
+    parent = list(range(len(articles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERMUTATIONS // BANDS
+    checked: set[tuple[int, int]] = set()
+    for field in ("title", "description"):
+        features = [shingles(getattr(article, field)) for article in articles]
+        buckets: dict[tuple[int, bytes], list[int]] = defaultdict(list)
+        for i, feature in enumerate(features):
+            if not feature: continue
+            signature = minhash(feature)
+            for band in range(BANDS):
+                buckets[(band, signature[band * rows:(band + 1) * rows].tobytes())].append(i)
+
+        checked.clear()
+        for bucket in buckets.values():
+            for j, other in enumerate(bucket):
+                for candidate in bucket[:j]:
+                    if (candidate, other) in checked or find(candidate) == find(other):
+                        continue
+                    checked.add((candidate, other))
+                    if jaccard(features[candidate], features[other]) >= threshold:
+                        parent[find(other)] = find(candidate)
+
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(articles)):
+        clusters[find(i)].append(i)
+    return sorted(clusters.values(), key=lambda cluster: cluster[0])
+
+
+def deduplicate_articles(articles_by_provider: dict[str, list[Article]], threshold: float = SIMILARITY_THRESHOLD) -> dict[str, list[Article]]:
+    """
+    Removes the near-duplicate articles returned by multiple providers (or by the same one).
+    Each story is kept once, as the article with the longest description, under its own provider
+    and with `source_count` set to the number of articles of the story.
+    Args:
+        articles_by_provider (dict[str, list[Article]]): The articles of each provider.
+        threshold (float): The minimum similarity of titles or descriptions.
+    Returns:
+        dict[str, list[Article]]: The representative articles of each provider, in the original order.
+    """
+    flat = [(provider, position, article) for provider, articles in articles_by_provider.items() for position, article in enumerate(articles)]
+    clusters = cluster_articles([article for _, _, article in flat], threshold)
+
+    keep: dict[tuple[str, int], int] = {}
+    for cluster in clusters:
+        representative = max(cluster, key=lambda i: (len(flat[i][2].description), -i))
+        provider, position, _ = flat[representative]
+        keep[(provider, position)] = sum(flat[i][2].source_count for i in cluster)
+
+    return {
+        provider: [
+            article.model_copy(update={"source_count": keep[(provider, position)]})
+            for position, article in enumerate(articles) if (provider, position) in keep
+        ]
+        for provider, articles in articles_by_provider.items()
+    }
@@ -0,0 +1,117 @@
+import threading
+import time
+from contextvars import ContextVar
+
+
+DEFAULT_REQUEST_TIMEOUT = 20.0
+"""Default timeout in seconds for a single request to an external API"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a run exceeds its deadline or when it has been cancelled.
+    """
+
+
+class Deadline:
+    """
+    Deadline and cancellation signal of a pipeline run.
+    It is shared by the run, its stages and every tool call executed in it (also in other threads),
+    so that everything can stop as soon as the run expires or is cancelled.
+    The run has a global deadline and each stage can add a stricter one when it starts.
+    """
+
+    def __init__(self, seconds: float | None = None, request_timeout: float = DEFAULT_REQUEST_TIMEOUT, stages: dict[str, float] | None = None):
+        """
+        Args:
+            seconds (float | None): Seconds available for the whole run. None means no deadline.
+            request_timeout (float): Maximum seconds for a single request to an external API.
+            stages (dict[str, float] | None): Seconds available for each stage, by stage name.
+        """
+        self.seconds = seconds
+        self.run_expires_at = time.monotonic() + seconds if seconds else None
+        self.stages = stages or {}
+        self.stage = ""
+        self.stage_expires_at: float | None = None
+        self.request_timeout = request_timeout
+        self.cancelled = threading.Event()
+        self.timed_out = False
+        """Whether the run was stopped because the deadline expired (set by the pipeline)"""
+
+    def restart(self) -> None:
+        """
+        Restarts the run deadline from now, e.g. when a queued run actually starts.
+        """
+        self.run_expires_at = time.monotonic() + self.seconds if self.seconds else None
+
+    def start_stage(self, name: str) -> None:
+        """
+        Starts a new stage of the run, replacing the deadline of the previous stage.
+        If the stage has no configured seconds, only the run deadline applies.
+        Args:
+            name (str): The name of the stage.
+        """
+        seconds = self.stages.get(name)
+        self.stage = name
+        self.stage_expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float | None:
+        """
+        Returns the seconds left before the closest deadline (never negative), or None if there is no deadline.
+        """
+        deadlines = [d for d in (self.run_expires_at, self.stage_expires_at) if d is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def cancel(self) -> None:
+        """
+        Cancels the run. Every following `check` raises DeadlineExceeded and every `sleep` wakes up.
+        """
+        self.cancelled.set()
+
+    def check(self) -> None:
+        """
+        Raises:
+            DeadlineExceeded: If the run has been cancelled or the deadline has expired.
+        """
+        if self.cancelled.is_set():
+            raise DeadlineExceeded("Run cancelled")
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline exceeded{f' during {self.stage}' if self.stage else ''}")
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Sleeps for the given seconds, waking up earlier if the run is cancelled or the deadline expires.
+        Raises:
+            DeadlineExceeded: If the run has been cancelled or the deadline has expired.
+        """
+        remaining = self.remaining()
+        self.cancelled.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+    def timeout(self) -> float:
+        """
+        Returns the timeout to use for a single request: the request timeout, capped by the time left.
+        """
+        remaining = self.remaining()
+        return self.request_timeout if remaining is None else max(0.1, min(self.request_timeout, remaining))
+
+
+__current: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Deadline:
+    """
+    Returns the deadline of the current run. If there is no run, a deadline that never expires is returned.
+    """
+    return __current.get() or Deadline()
+
+def set_deadline(deadline: Deadline) -> None:
+    """
+    Sets the deadline for the current context. Tasks and `asyncio.to_thread` calls started afterwards inherit it.
+    """
+    __current.set(deadline)
@@ -0,0 +1,268 @@
+import bisect
+import hashlib
+import re
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Callable, Generic, TypeVar
+from app.api.core.assets import ALIASES, AssetResolver, get_asset_resolver, resolve_base
+from app.api.core.news import Article
+from app.api.core.news_index import article_key
+from app.api.core.social import SocialPost
+from app.api.core.symbols import SymbolIndex, base_of
+
+
+MENTION_MAX_RANK = 500
+"""Only the assets in the top ranks by market cap are recognized by name or plain ticker (cashtags are always recognized)"""
+
+LOWERCASE_MAX_RANK = 30
+"""Tickers written in lowercase (e.g. 'btc') are recognized only for the top assets, to limit false positives"""
+
+MAX_NAME_WORDS = 3
+"""Maximum number of words of an asset name (e.g. 'bitcoin cash', 'shiba inu')"""
+
+AMBIGUOUS_WORDS = {
+    "a", "ai", "all", "am", "any", "ape", "are", "ath", "be", "big", "cex", "ceo", "defi", "dex", "dyor", "etf", "eur",
+    "fud", "gas", "hot", "i", "it", "just", "key", "link", "me", "new", "nft", "now", "ok", "on", "one", "or", "sec",
+    "so", "ton", "top", "us", "usd", "we",
+}
+"""Words that are also tickers but are much more often used with their common meaning"""
+
+MENTION_RETENTION_HOURS = 48
+"""Posts and articles older than this are removed from the MentionIndex"""
+
+CASHTAG_PATTERN = re.compile(r"\$([A-Za-z][A-Za-z0-9]{1,9})\b")
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+
+
+class MentionExtractor:
+    """
+    Finds the crypto assets mentioned in a text, using the symbols table:
+    - cashtags (e.g. '$SOL'), for any known asset
+    - uppercase tickers (e.g. 'SOL'), and lowercase ones for the top assets (e.g. 'sol')
+    - names of up to MAX_NAME_WORDS words (e.g. 'solana', 'shiba inu') and the common aliases (e.g. 'ether')
+    Ambiguous words (e.g. 'ONE', 'LINK') are recognized only as cashtags.
+    Mentions are returned as base symbols (e.g. 'SOL'), in order of first appearance.
+    """
+
+    def __init__(self, index: SymbolIndex, max_rank: int = MENTION_MAX_RANK):
+        """
+        Args:
+            index (SymbolIndex): The index of the known assets.
+            max_rank (int): Number of top assets recognized by name or plain ticker.
+        """
+        self.all_symbols: dict[str, str] = {}
+        self.symbols: dict[str, str] = {}
+        self.lowercase_symbols: dict[str, str] = {}
+        self.names: dict[str, str] = {}
+
+        for position, symbol in enumerate(index.symbols):
+            base = base_of(symbol)
+            self.all_symbols.setdefault(base, base)
+            if position >= max_rank:
+                continue
+            if base.lower() not in AMBIGUOUS_WORDS:
+                self.symbols.setdefault(base, base)
+                if position < LOWERCASE_MAX_RANK and len(base) >= 3:
+                    self.lowercase_symbols.setdefault(base.lower(), base)
+
+            name = index.normalized[position]
+            if len(name) >= 4 and name not in AMBIGUOUS_WORDS and len(name.split()) <= MAX_NAME_WORDS:
+                self.names.setdefault(name, base)
+
+        for alias, base in ALIASES.items():
+            if base in self.all_symbols:
+                self.names.setdefault(alias, base)
+
+    def extract(self, text: str) -> list[str]:
+        """
+        Returns the base symbols of the assets mentioned in the text, without duplicates.
+        """
+        found: dict[str, None] = {}
+        for tag in CASHTAG_PATTERN.findall(text):
+            base = self.all_symbols.get(tag.upper())
+            if base: found[base] = None
+
+        words = WORD_PATTERN.findall(text)
+        lower = [word.lower() for word in words]
+        for i, word in enumerate(words):
+            base = self.symbols.get(word) if word.isupper() else self.lowercase_symbols.get(word)
+            if base:
+                found[base] = None
+                continue
+            for size in range(MAX_NAME_WORDS, 0, -1):
+                base = self.names.get(" ".join(lower[i:i + size])) if i + size <= len(words) else None
+                if base:
+                    found[base] = None
+                    break
+        return list(found)
+
+    def extract_all(self, texts: list[str]) -> list[list[str]]:
+        return [self.extract(text) for text in texts]
+
+
+@lru_cache(maxsize=1)
+def mention_extractor(resolver: AssetResolver) -> MentionExtractor:
+    return MentionExtractor(resolver.index)
+
+
+def get_mention_extractor() -> MentionExtractor:
+    """
+    Returns the shared MentionExtractor, built on the index of the shared AssetResolver.
+    It is keyed on the resolver, so it is rebuilt when the resolver is (after a refresh of the symbols table).
+    """
+    return mention_extractor(get_asset_resolver())
+
+
+def parse_time(text: str) -> float | None:
+    """
+    Parses the time of a post or article ('YYYY-MM-DD HH:MM', ISO 8601 or RFC 2822) into a UNIX timestamp.
+    Returns None if the format is not recognized.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(text).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def post_key(post: SocialPost) -> str:
+    return "sha1:" + hashlib.sha1(f"{post.timestamp}|{post.title}|{post.description}".encode()).hexdigest()
+
+
+ItemType = TypeVar("ItemType", SocialPost, Article)
+
+
+class MentionIndex(Generic[ItemType]):
+    """
+    Inverted index from the mentioned assets (base symbols) to the posts or articles that mention them,
+    built as they are fetched, so that "mentions of X in the last N hours" does not need to scan or refetch anything.
+    Items must already be annotated with their `tickers` (see sentiment.annotate_posts and annotate_articles).
+    Each posting list is kept sorted by time; items older than the retention period are dropped.
+    The index is shared between threads (tools run in worker threads), so every access is serialized.
+    """
+
+    def __init__(self, key: Callable[[ItemType], str], published: Callable[[ItemType], str], retention_hours: float = MENTION_RETENTION_HOURS):
+        """
+        Args:
+            key (Callable): Returns the deduplication key of an item.
+            published (Callable): Returns the time of an item as text. Unparsable times become the time of the insertion.
+            retention_hours (float): Items older than this are removed.
+        """
+        self.key = key
+        self.published = published
+        self.retention_seconds = retention_hours * 3600
+        self.items: dict[str, tuple[float, ItemType]] = {}
+        self.postings: dict[str, list[tuple[float, str]]] = {}
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, items: list[ItemType]) -> int:
+        """
+        Adds the annotated items to the index, ignoring the ones already stored and the ones without mentions.
+        Returns:
+            int: The number of new items.
+        """
+        now = time.time()
+        added = 0
+        with self.lock:
+            self.updated_at = now
+            for item in items:
+                key = self.key(item)
+                if not item.tickers or key in self.items:
+                    continue
+                timestamp = parse_time(self.published(item)) or now
+                if timestamp < now - self.retention_seconds:
+                    continue
+                self.items[key] = (timestamp, item)
+                for ticker in item.tickers:
+                    bisect.insort(self.postings.setdefault(ticker, []), (timestamp, key))
+                added += 1
+        self.evict(now)
+        return added
+
+    def mentions(self, asset: str, hours: float = 24, limit: int = 10) -> list[ItemType]:
+        """
+        Returns the items mentioning the asset in the last hours, the newest first.
+        Args:
+            asset (str): The asset, as a symbol or a name (resolved with the shared AssetResolver).
+            hours (float): How many hours to look back.
+            limit (int): The maximum number of items.
+        Returns:
+            list[ItemType]: The matching items.
+        """
+        base = resolve_base(asset)
+        since = time.time() - hours * 3600
+        with self.lock:
+            posting = self.postings.get(base, [])
+            start = bisect.bisect_left(posting, (since, ""))
+            keys = [key for _, key in reversed(posting[start:])][:limit]
+            return [self.items[key][1] for key in keys]
+
+    def counts(self, hours: float = 24) -> dict[str, int]:
+        """
+        Returns the number of items mentioning each asset in the last hours, the most mentioned first.
+        """
+        since = time.time() - hours * 3600
+        with self.lock:
+            counts = {base: len(posting) - bisect.bisect_left(posting, (since, "")) for base, posting in self.postings.items()}
+        return dict(sorted(((b, c) for b, c in counts.items() if c > 0), key=lambda bc: (-bc[1], bc[0])))
+
+    def evict(self, now: float | None = None) -> int:
+        """
+        Removes the items older than the retention period.
+        Returns:
+            int: The number of removed items.
+        """
+        cutoff = (now or time.time()) - self.retention_seconds
+        with self.lock:
+            old = [key for key, (timestamp, _) in self.items.items() if timestamp < cutoff]
+            for key in old:
+                del self.items[key]
+            if old:
+                for base in list(self.postings):
+                    posting = self.postings[base]
+                    del posting[:bisect.bisect_left(posting, (cutoff, ""))]
+                    if not posting:
+                        del self.postings[base]
+        return len(old)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.items)
+
+
+def post_index() -> MentionIndex[SocialPost]:
+    return MentionIndex(post_key, lambda post: post.timestamp)
+
+
+def article_index() -> MentionIndex[Article]:
+    return MentionIndex(article_key, lambda article: article.time)
+
+
+@lru_cache(maxsize=1)
+def get_post_index() -> MentionIndex[SocialPost]:
+    """
+    Returns the MentionIndex of the social posts shared by all the runs.
+    """
+    return post_index()
+
+
+@lru_cache(maxsize=1)
+def get_article_index() -> MentionIndex[Article]:
+    """
+    Returns the MentionIndex of the news articles shared by all the runs.
+    """
+    return article_index()
@@ -0,0 +1,234 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+
+
+METRICS_PREFIX = "upo_"
+"""Prefix of the metric names in the Prometheus exposition"""
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+"""Upper bounds in seconds of the latency histograms"""
+
+METRICS: dict[str, tuple[str, str]] = {
+    "wrapper_call_seconds": ("histogram", "Latency of each attempt to call a provider wrapper, by wrapper and outcome"),
+    "wrapper_errors_total": ("counter", "Failed attempts to call a provider wrapper, by wrapper"),
+    "pipeline_run_seconds": ("histogram", "Duration of the pipeline runs, by outcome"),
+    "pipeline_runs_total": ("counter", "Pipeline runs, by outcome (completed, cancelled, timeout, closed, error)"),
+    "pipeline_stage_seconds": ("histogram", "Duration of the pipeline stages, by stage"),
+    "llm_run_seconds": ("histogram", "Duration of the agent runs (model calls included), by agent"),
+    "llm_time_to_first_token_seconds": ("histogram", "Time to the first token of the agent runs, by agent"),
+    "llm_tokens_total": ("counter", "Tokens used by the agents, by agent and direction (input, output)"),
+    "llm_errors_total": ("counter", "Failed agent runs, by agent"),
+    "tool_call_seconds": ("histogram", "Latency of the tool calls, by tool and outcome"),
+    "tool_errors_total": ("counter", "Failed tool calls, by tool"),
+    "cache_requests_total": ("counter", "Cache lookups, by cache and result (hit, miss)"),
+}
+"""Type and description of the known metrics, by name"""
+
+LabelsKey = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, as in Prometheus (the counts are not cumulative here).
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-quantile (0 <= q <= 1) interpolating inside its bucket, like histogram_quantile in Prometheus.
+        Values over the last bucket are reported as its upper bound.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms of the application (providers, pipeline, agents, tools and caches).
+    Metrics are identified by name (see METRICS) and labels, and are created when first recorded.
+    They can be read as a dictionary (snapshot) or in the Prometheus text format (render).
+    Every access is serialized, since metrics are recorded from the tools' worker threads.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Args:
+            buckets (tuple[float, ...]): The upper bounds of the latency histograms, in seconds.
+        """
+        self.buckets = buckets
+        self.counters: dict[str, dict[LabelsKey, float]] = {}
+        self.histograms: dict[str, dict[LabelsKey, Histogram]] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Increments the counter `name` with the given labels.
+        """
+        key = MetricsRegistry.__key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """
+        Records a latency in the histogram `name` with the given labels.
+        """
+        key = MetricsRegistry.__key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(seconds)
+
+    @contextmanager
+    def timed(self, name: str, errors: str | None = None, **labels: str) -> Iterator[None]:
+        """
+        Records the duration of the block in the histogram `name`, with the label outcome ('ok' or 'error').
+        If the block raises, the counter `errors` (if given) is also incremented and the exception is propagated.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.monotonic() - start, outcome="error", **labels)
+            if errors:
+                self.inc(errors, **labels)
+            raise
+        self.observe(name, time.monotonic() - start, outcome="ok", **labels)
+
+    def cache(self, cache: str, hit: bool) -> None:
+        """
+        Records a lookup in the cache, as a hit or a miss.
+        """
+        self.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_ratios(self) -> dict[str, float]:
+        """
+        Returns the ratio of hits over the lookups of each cache.
+        """
+        totals: dict[str, list[float]] = {}
+        with self.lock:
+            for key, value in self.counters.get("cache_requests_total", {}).items():
+                labels = dict(key)
+                hits_lookups = totals.setdefault(labels.get("cache", ""), [0.0, 0.0])
+                hits_lookups[0] += value if labels.get("result") == "hit" else 0.0
+                hits_lookups[1] += value
+        return {cache: round(hits / lookups, 4) for cache, (hits, lookups) in sorted(totals.items()) if lookups}
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns the current values of all the metrics, e.g. to show or log them.
+        Histograms are summarized by count, sum, mean and the estimated p50, p90 and p99.
+        Returns:
+            dict[str, Any]: {'counters': {name: [...]}, 'histograms': {name: [...]}, 'cache_hit_ratio': {cache: ratio}}
+        """
+        with self.lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(self.counters.items())
+            }
+            histograms = {
+                name: [{
+                    "labels": dict(key),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "mean": round(h.sum / h.count, 6) if h.count else 0.0,
+                    "p50": round(h.quantile(0.5), 6),
+                    "p90": round(h.quantile(0.9), 6),
+                    "p99": round(h.quantile(0.99), 6),
+                } for key, h in sorted(series.items())]
+                for name, series in sorted(self.histograms.items())
+            }
+        return {"counters": counters, "histograms": histograms, "cache_hit_ratio": self.cache_hit_ratios()}
+
+    def render(self) -> str:
+        """
+        Returns all the metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines: list[str] = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                MetricsRegistry.__header(lines, name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{METRICS_PREFIX}{name}{MetricsRegistry.__labels(key)} {value:g}")
+
+            for name, series in sorted(self.histograms.items()):
+                MetricsRegistry.__header(lines, name, "histogram")
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip([*h.buckets, float("inf")], h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{METRICS_PREFIX}{name}_bucket{MetricsRegistry.__labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{METRICS_PREFIX}{name}_sum{MetricsRegistry.__labels(key)} {h.sum:.6f}")
+                    lines.append(f"{METRICS_PREFIX}{name}_count{MetricsRegistry.__labels(key)} {h.count}")
+
+        ratios = self.cache_hit_ratios()
+        if ratios:
+            lines.append(f"# HELP {METRICS_PREFIX}cache_hit_ratio Ratio of hits over the lookups of each cache")
+            lines.append(f"# TYPE {METRICS_PREFIX}cache_hit_ratio gauge")
+            for cache, ratio in ratios.items():
+                lines.append(f"{METRICS_PREFIX}cache_hit_ratio{MetricsRegistry.__labels((('cache', cache),))} {ratio:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    @staticmethod
+    def __key(labels: dict[str, str]) -> LabelsKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def __labels(key: LabelsKey) -> str:
+        if not key:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in key)
+        return "{" + ",".join(f"{name}=\"{value}\"" for (name, _), value in zip(key, escaped)) + "}"
+
+    @staticmethod
+    def __header(lines: list[str], name: str, kind: str) -> None:
+        _, description = METRICS.get(name, (kind, name))
+        lines.append(f"# HELP {METRICS_PREFIX}{name} {description}")
+        lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> MetricsRegistry:
+    """
+    Returns the MetricsRegistry shared by the whole application.
+    """
+    return MetricsRegistry()
+
+
+def tool_metrics_hook(function_name: str, function_call: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+    """
+    Agno tool hook that records the latency and the errors of each tool call.
+    """
+    with get_metrics().timed("tool_call_seconds", errors="tool_errors_total", tool=function_name):
+        return function_call(**arguments)
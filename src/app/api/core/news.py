@@ -9,6 +9,13 @@ class Article(BaseModel):
     time: str = ""
     title: str = ""
     description: str = ""
+    url: str = ""
+    source_count: int = 1
+    """Number of articles (from any provider) reporting the same story"""
+    sentiment: float = 0.0
+    """Polarity of the article, from -1 (bearish) to 1 (bullish)"""
+    tickers: list[str] = []
+    """Base symbols of the crypto assets mentioned in the article"""
 
 class NewsWrapper:
     """
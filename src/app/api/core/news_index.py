@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from app.api.core.news import Article
+
+logging = logging.getLogger("news_index")
+
+
+NEWS_INDEX_FILE = "resources/news_index.db"
+"""Default location of the local news index"""
+
+EVICTION_INTERVAL_SECONDS = 3600
+"""Minimum interval between two evictions of the old articles"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    provider TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_ingested_at ON articles (ingested_at);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS query_articles (
+    query TEXT NOT NULL,
+    article_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (query, article_id)
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, description, content='articles', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+"""
+
+
+def article_key(article: Article) -> str:
+    """
+    Returns the deduplication key of the article: its URL if available, otherwise a hash of source and title.
+    """
+    if article.url:
+        return article.url.strip()
+    text = f"{article.source.strip().lower()}|{re.sub(r'[^a-z0-9]+', ' ', article.title.lower()).strip()}"
+    return "sha1:" + hashlib.sha1(text.encode()).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query, so that equivalent queries share the same freshness (e.g. 'Bitcoin  ETF' and 'bitcoin etf').
+    """
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class NewsIndex:
+    """
+    Local full-text index (SQLite FTS5) of the articles returned by the news providers.
+    - Articles are deduplicated by URL (or by a hash of source and title when there is no URL).
+    - Each search query remembers when it was last fetched from the network and which articles it returned,
+      so that a repeated query can be answered locally while it is fresh.
+    - Articles older than the retention period are evicted.
+    If the SQLite build does not support FTS5, the search falls back to LIKE over title and description.
+    The index is shared between threads (tools run in worker threads), so every access is serialized.
+    """
+
+    def __init__(self, path: str = NEWS_INDEX_FILE, retention_seconds: float = 48 * 3600):
+        """
+        Args:
+            path (str): The SQLite file of the index, or ':memory:' for an in-memory index.
+            retention_seconds (float): Articles ingested before this many seconds ago are evicted.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.retention_seconds = retention_seconds
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            logging.warning("SQLite without FTS5, the news index falls back to LIKE searches")
+            self.fts = False
+        self.last_eviction = 0.0
+        self.evict()
+
+    def ingest(self, articles: list[Article], provider: str = "", query: str | None = None) -> int:
+        """
+        Adds the articles to the index, ignoring the ones already stored.
+        Args:
+            articles (list[Article]): The articles to add.
+            provider (str): The name of the provider that returned them.
+            query (str | None): The search query that returned them, if any: they replace its previous results.
+        Returns:
+            int: The number of new articles.
+        """
+        return self.ingest_all({provider: articles}, query)
+
+    def ingest_all(self, results: dict[str, list[Article]], query: str | None = None) -> int:
+        """
+        Adds the articles returned by multiple providers for the same request, ignoring the ones already stored.
+        If the query is given, the articles become its only results (in provider order), replacing the ones of the
+        previous fetch in the same transaction, so that old and new results are never mixed.
+        Args:
+            results (dict[str, list[Article]]): The articles to add, by provider.
+            query (str | None): The search query that returned them, if any.
+        Returns:
+            int: The number of new articles.
+        """
+        now = time.time()
+        if now - self.last_eviction > EVICTION_INTERVAL_SECONDS:
+            self.evict()
+        rows = [
+            (article_key(a), provider, a.source, a.time, a.title, a.description, a.url, now)
+            for provider, articles in results.items() for a in articles if a.title
+        ]
+        with self.lock, self.connection:
+            added = self.connection.executemany(
+                "INSERT OR IGNORE INTO articles (key, provider, source, time, title, description, url, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+
+            if query is not None:
+                normalized = normalize_query(query)
+                self.connection.execute("DELETE FROM query_articles WHERE query = ?", (normalized,))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO query_articles (query, article_id, position) SELECT ?, id, ? FROM articles WHERE key = ?",
+                    [(normalized, position, row[0]) for position, row in enumerate(rows)],
+                )
+            return added
+
+    def results(self, query: str, limit: int = 100) -> list[Article]:
+        """
+        Returns the articles returned by the providers the last time the query was fetched, in their original order.
+        """
+        sql = """SELECT a.source, a.time, a.title, a.description, a.url FROM query_articles q
+                 JOIN articles a ON a.id = q.article_id
+                 WHERE q.query = ? ORDER BY q.position, a.id LIMIT ?"""
+        with self.lock:
+            rows = self.connection.execute(sql, (normalize_query(query), limit)).fetchall()
+        return [Article(source=s, time=t, title=title, description=d, url=u) for s, t, title, d, u in rows]
+
+    def search(self, query: str, limit: int = 100, max_age_seconds: float | None = None) -> list[Article]:
+        """
+        Searches the articles matching all the words of the query, ranked by relevance and then by recency.
+        Args:
+            query (str): The search query.
+            limit (int): The maximum number of articles.
+            max_age_seconds (float | None): Only articles ingested in the last seconds. None means all the stored ones.
+        Returns:
+            list[Article]: The matching articles.
+        """
+        words = normalize_query(query).split()
+        if not words:
+            return []
+        since = time.time() - max_age_seconds if max_age_seconds is not None else 0.0
+
+        if self.fts:
+            match = " ".join(f'"{word}"' for word in words)
+            sql = """SELECT a.source, a.time, a.title, a.description, a.url FROM articles_fts
+                     JOIN articles a ON a.id = articles_fts.rowid
+                     WHERE articles_fts MATCH ? AND a.ingested_at >= ?
+                     ORDER BY bm25(articles_fts), a.ingested_at DESC LIMIT ?"""
+            params: list[object] = [match, since, limit]
+        else:
+            conditions = " AND ".join("(title LIKE ? OR description LIKE ?)" for _ in words)
+            sql = f"""SELECT source, time, title, description, url FROM articles
+                      WHERE {conditions} AND ingested_at >= ? ORDER BY ingested_at DESC LIMIT ?"""
+            params = [p for word in words for p in (f"%{word}%", f"%{word}%")] + [since, limit]
+
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [Article(source=s, time=t, title=title, description=d, url=u) for s, t, title, d, u in rows]
+
+    def mark_fetched(self, query: str, limit: int) -> None:
+        """
+        Records that the query has just been fetched from the network, asking for `limit` articles.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO queries (query, fetched_at, requested) VALUES (?, ?, ?)",
+                (normalize_query(query), time.time(), limit),
+            )
+
+    def is_fresh(self, query: str, max_age_seconds: float, limit: int = 0) -> bool:
+        """
+        Returns True if the query was fetched from the network in the last `max_age_seconds`,
+        asking for at least `limit` articles (so that the stored results are not a smaller page).
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT fetched_at, requested FROM queries WHERE query = ?", (normalize_query(query),)).fetchone()
+        return row is not None and time.time() - row[0] <= max_age_seconds and row[1] >= limit
+
+    def evict(self) -> int:
+        """
+        Removes the articles and the queries older than the retention period.
+        Returns:
+            int: The number of evicted articles.
+        """
+        self.last_eviction = time.time()
+        cutoff = self.last_eviction - self.retention_seconds
+        with self.lock, self.connection:
+            evicted = self.connection.execute("DELETE FROM articles WHERE ingested_at < ?", (cutoff,)).rowcount
+            self.connection.execute("DELETE FROM queries WHERE fetched_at < ?", (cutoff,))
+            self.connection.execute("DELETE FROM query_articles WHERE article_id NOT IN (SELECT id FROM articles)")
+        if evicted:
+            logging.info(f"Evicted {evicted} articles from the news index")
+        return evicted
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+@lru_cache(maxsize=1)
+def get_news_index(retention_seconds: float = 48 * 3600) -> NewsIndex:
+    """
+    Returns the NewsIndex (at NEWS_INDEX_FILE) shared by all the runs and the prefetch,
+    so that they use a single SQLite connection and lock.
+    """
+    return NewsIndex(NEWS_INDEX_FILE, retention_seconds)
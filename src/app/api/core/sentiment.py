@@ -0,0 +1,172 @@
+import re
+from collections import defaultdict
+import numpy as np
+from pydantic import BaseModel
+from app.api.core.mentions import get_mention_extractor
+from app.api.core.news import Article
+from app.api.core.social import SocialPost
+
+
+LEXICON: dict[str, float] = {
+    # bullish
+    "bull": 1.5, "bullish": 2.0, "moon": 2.0, "mooning": 2.5, "pump": 1.5, "pumping": 1.5, "rally": 2.0, "rallies": 2.0,
+    "surge": 2.0, "surges": 2.0, "soar": 2.0, "soars": 2.0, "breakout": 1.5, "ath": 1.5, "gain": 1.0, "gains": 1.0,
+    "up": 0.5, "rise": 1.0, "rises": 1.0, "rising": 1.0, "buy": 1.0, "buying": 1.0, "long": 0.5, "hodl": 1.0,
+    "accumulate": 1.0, "accumulating": 1.0, "adoption": 1.5, "approval": 1.5, "approved": 1.5, "partnership": 1.0,
+    "upgrade": 1.0, "record": 1.0, "high": 0.5, "higher": 1.0, "recovery": 1.5, "recover": 1.0, "rebound": 1.5,
+    "inflows": 1.5, "strong": 1.0, "good": 1.0, "great": 1.5, "love": 1.5, "undervalued": 1.5, "green": 1.0,
+    "optimistic": 1.5, "profit": 1.0, "profits": 1.0, "win": 1.0, "winning": 1.0, "🚀": 2.0, "📈": 1.5, "💎": 1.0,
+    # bearish
+    "bear": -1.5, "bearish": -2.0, "dump": -2.0, "dumping": -2.0, "crash": -2.5, "crashes": -2.5, "crashing": -2.5,
+    "plunge": -2.0, "plunges": -2.0, "drop": -1.0, "drops": -1.0, "fall": -1.0, "falls": -1.0, "falling": -1.0,
+    "down": -0.5, "decline": -1.0, "declines": -1.0, "sell": -1.0, "selling": -1.0, "selloff": -2.0, "short": -0.5,
+    "loss": -1.0, "losses": -1.5, "lose": -1.0, "rekt": -2.0, "scam": -2.5, "hack": -2.5, "hacked": -2.5,
+    "exploit": -2.0, "fud": -1.0, "fear": -1.5, "panic": -2.0, "ban": -2.0, "banned": -2.0, "lawsuit": -1.5,
+    "fraud": -2.5, "rug": -2.5, "liquidated": -2.0, "liquidations": -1.5, "outflows": -1.5, "weak": -1.0,
+    "bad": -1.0, "worst": -2.0, "overvalued": -1.5, "red": -1.0, "bubble": -1.5, "collapse": -2.5, "bankrupt": -2.5,
+    "low": -0.5, "lower": -1.0, "pessimistic": -1.5, "📉": -1.5,
+}
+"""Polarity of the words, tuned for crypto markets (positive is bullish)"""
+
+NEGATIONS = {"not", "no", "never", "without", "isn't", "aren't", "wasn't", "don't", "doesn't", "didn't", "won't", "can't", "nor"}
+
+NEGATION_WINDOW = 3
+"""A negation flips the polarity of the following words, up to this many and not beyond a punctuation mark"""
+
+NEGATION_FACTOR = -0.74
+"""Factor applied to the polarity of a negated word (the same used by VADER)"""
+
+NORMALIZATION_ALPHA = 15.0
+"""The sum of the polarities is mapped to [-1, 1] as x / sqrt(x^2 + alpha)"""
+
+NEUTRAL_THRESHOLD = 0.05
+"""Texts with polarity within this threshold are neutral"""
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+|[\U0001F300-\U0001FAFF]|[.,;:!?]")
+
+__VOCABULARY = {word: i for i, word in enumerate(list(LEXICON) + sorted(NEGATIONS - LEXICON.keys()) + list(".,;:!?"))}
+__UNKNOWN = len(__VOCABULARY)
+__WEIGHTS = np.array([LEXICON.get(word, 0.0) for word in __VOCABULARY] + [0.0])
+__IS_NEGATION = np.array([word in NEGATIONS for word in __VOCABULARY] + [False])
+__IS_BREAK = np.array([word in ".,;:!?" for word in __VOCABULARY] + [False])
+__BREAK = __VOCABULARY["."]
+
+
+class AssetSentiment(BaseModel):
+    """
+    Aggregate sentiment of the posts or articles mentioning an asset.
+    """
+    asset: str
+    mentions: int = 0
+    bullish: int = 0
+    bearish: int = 0
+    neutral: int = 0
+    bullish_ratio: float = 0.5
+    """Bullish / (bullish + bearish), 0.5 if there are no opinions"""
+    average_polarity: float = 0.0
+
+
+def polarity_scores(texts: list[str]) -> np.ndarray:
+    """
+    Computes the polarity of each text with the lexicon, handling negations (e.g. 'not bullish').
+    All the texts are scored together: their tokens are mapped to one array and summed per text.
+    Args:
+        texts (list[str]): The texts to score.
+    Returns:
+        np.ndarray: The polarity of each text, in [-1, 1] (positive is bullish).
+    """
+    if not texts:
+        return np.zeros(0)
+
+    ids: list[int] = []
+    lengths: list[int] = []
+    for text in texts:
+        tokens = [__VOCABULARY.get(token, __UNKNOWN) for token in TOKEN_PATTERN.findall(text.lower().replace("’", "'"))]
+        ids.extend(tokens)
+        ids.append(__BREAK) # so that negations do not cross texts
+        lengths.append(len(tokens) + 1)
+
+    tokens = np.array(ids, dtype=np.int64)
+    documents = np.repeat(np.arange(len(texts)), lengths)
+    positions = np.arange(len(tokens))
+
+    # position of the last negation and of the last punctuation mark before each token
+    none = -NEGATION_WINDOW - 1
+    last_negation = np.maximum.accumulate(np.where(__IS_NEGATION[tokens], positions, none))
+    last_break = np.maximum.accumulate(np.where(__IS_BREAK[tokens], positions, none))
+    last_negation = np.concatenate([[none], last_negation[:-1]])
+    last_break = np.concatenate([[none], last_break[:-1]])
+    negated = (last_negation > last_break) & (positions - last_negation <= NEGATION_WINDOW)
+
+    weights = __WEIGHTS[tokens]
+    weights = np.where(negated, weights * NEGATION_FACTOR, weights)
+    sums = np.bincount(documents, weights=weights, minlength=len(texts))
+    return sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
+
+
+def post_text(post: SocialPost) -> str:
+    return " ".join([post.title, post.description] + [comment.description for comment in post.comments])
+
+
+def article_text(article: Article) -> str:
+    return f"{article.title} {article.description}"
+
+
+def annotate_posts(posts: list[SocialPost]) -> list[SocialPost]:
+    """
+    Sets the `sentiment` and the mentioned `tickers` of each post (comments included), in place.
+    Returns:
+        list[SocialPost]: The same posts.
+    """
+    texts = [post_text(post) for post in posts]
+    for post, score, tickers in zip(posts, polarity_scores(texts), get_mention_extractor().extract_all(texts)):
+        post.sentiment = round(float(score), 3)
+        post.tickers = tickers
+    return posts
+
+
+def annotate_articles(articles: list[Article]) -> list[Article]:
+    """
+    Sets the `sentiment` and the mentioned `tickers` of each article, in place.
+    Returns:
+        list[Article]: The same articles.
+    """
+    texts = [article_text(article) for article in articles]
+    for article, score, tickers in zip(articles, polarity_scores(texts), get_mention_extractor().extract_all(texts)):
+        article.sentiment = round(float(score), 3)
+        article.tickers = tickers
+    return articles
+
+
+def aggregate_sentiment(items: list[SocialPost] | list[Article], min_mentions: int = 1) -> list[AssetSentiment]:
+    """
+    Aggregates the sentiment of annotated posts or articles by mentioned asset.
+    Args:
+        items (list[SocialPost] | list[Article]): The annotated posts or articles.
+        min_mentions (int): Assets with fewer mentions are omitted.
+    Returns:
+        list[AssetSentiment]: The sentiment of each asset, the most mentioned first.
+    """
+    polarities: dict[str, list[float]] = defaultdict(list)
+    for item in items:
+        for ticker in item.tickers:
+            polarities[ticker].append(item.sentiment)
+
+    results: list[AssetSentiment] = []
+    for asset, values in polarities.items():
+        if len(values) < min_mentions:
+            continue
+        scores = np.array(values)
+        bullish = int((scores > NEUTRAL_THRESHOLD).sum())
+        bearish = int((scores < -NEUTRAL_THRESHOLD).sum())
+        results.append(AssetSentiment(
+            asset=asset,
+            mentions=len(values),
+            bullish=bullish,
+            bearish=bearish,
+            neutral=len(values) - bullish - bearish,
+            bullish_ratio=round(bullish / (bullish + bearish), 3) if bullish + bearish else 0.5,
+            average_polarity=round(float(scores.mean()), 3),
+        ))
+    results.sort(key=lambda r: (-r.mentions, r.asset))
+    return results
@@ -13,6 +13,10 @@ class SocialPost(BaseModel):
     title: str = ""
     description: str = ""
     comments: list["SocialComment"] = []
+    sentiment: float = 0.0
+    """Polarity of the post and its comments, from -1 (bearish) to 1 (bullish)"""
+    tickers: list[str] = []
+    """Base symbols of the crypto assets mentioned in the post and its comments"""
 
     def set_timestamp(self, timestamp_ms: int | None = None, timestamp_s: int | None = None) -> None:
         """ Use the unified_timestamp function to set the time."""
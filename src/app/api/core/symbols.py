@@ -0,0 +1,306 @@
+import bisect
+import os
+import re
+from collections import defaultdict
+from typing import Any, Iterable
+import numpy as np
+import pandas as pd
+
+
+NGRAM_SIZE = 3
+"""Size of the n-grams used for substring and fuzzy search"""
+
+FUZZY_MIN_SIMILARITY = 0.4
+"""Minimum n-gram similarity (Dice coefficient) for a fuzzy match"""
+
+TEXT_COLUMNS = ["Symbol", "Name"]
+NUMERIC_COLUMNS = [
+    "Price", "Change", "Change %", "Market Cap", "Volume", "Volume In Currency (24hr)",
+    "Total Volume All Currencies (24hr)", "Circulating Supply", "52 Wk Change %", "52 Wk Low", "52 Wk High",
+]
+"""Columns of the typed symbols table, in order. Percentages are stored as numbers (e.g. -1.14 for '-1.14%')"""
+
+__SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+
+def parse_amount(value: Any) -> float:
+    """
+    Parses an amount as shown by Yahoo Finance (e.g. '2.218T', '487.824B', '1,234.5', '+67.83%') into a float.
+    Unparsable values (e.g. '--' or NaN) become 0.0.
+    Args:
+        value (Any): The value to parse.
+    Returns:
+        float: The parsed amount.
+    """
+    if isinstance(value, (int, float)):
+        return float(value) if value == value else 0.0
+    text = str(value).strip().replace(",", "").rstrip("%").upper()
+    multiplier = 1.0
+    if text and text[-1] in __SUFFIXES:
+        multiplier = __SUFFIXES[text[-1]]
+        text = text[:-1]
+    try:
+        return float(text) * multiplier
+    except ValueError:
+        return 0.0
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes an asset name for the search: lowercase, without the quote currency suffix and extra spaces.
+    E.g. 'Bitcoin USD' -> 'bitcoin'.
+    """
+    name = re.sub(r"\s+", " ", name.lower()).strip()
+    return name[:-4] if name.endswith(" usd") else name
+
+
+def base_of(symbol: str) -> str:
+    """
+    Returns the base symbol used by the exchanges from a Yahoo Finance symbol.
+    Yahoo disambiguates assets with the same ticker adding digits (e.g. 'BANANA28886-USD' -> 'BANANA').
+    """
+    base = symbol.split("-")[0].upper()
+    stripped = re.sub(r"\d{4,}$", "", base)
+    return stripped or base
+
+
+def ngrams(text: str, size: int = NGRAM_SIZE) -> set[str]:
+    """
+    Returns the set of n-grams of the text. Texts shorter than `size` are returned as a single n-gram.
+    """
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SymbolIndex:
+    """
+    In-memory search index over the symbols table, built once at load time.
+    Assets are stored by descending market cap, so the position of an asset is also its rank:
+    sorting matches by position sorts them by market cap without touching the table again.
+    - exact: hash maps of symbols (also as base symbols, e.g. 'BTC') and normalized names
+    - prefix: sorted array of normalized names, searched with bisect
+    - substring and fuzzy: inverted index of name n-grams (plus shorter grams for short queries)
+    Lookups only touch the posting lists of the query, so they do not scale with the table size.
+    """
+
+    def __init__(self, symbols: Iterable[str], names: Iterable[str], market_caps: Iterable[Any]):
+        """
+        Args:
+            symbols (Iterable[str]): The symbols of the assets (e.g. 'BTC-USD').
+            names (Iterable[str]): The names of the assets (e.g. 'Bitcoin USD').
+            market_caps (Iterable[Any]): The market caps, as numbers or Yahoo Finance strings (e.g. '2.218T').
+        """
+        rows = [(str(s), str(n), parse_amount(c)) for s, n, c in zip(symbols, names, market_caps)]
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        self.symbols = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.market_caps = [row[2] for row in rows]
+        self.normalized = [normalize_name(name) for name in self.names]
+
+        self.by_symbol: dict[str, int] = {}
+        self.by_name: dict[str, list[int]] = defaultdict(list)
+        self.postings: dict[str, list[int]] = defaultdict(list)
+        self.gram_counts: list[int] = []
+        for i, (symbol, name) in enumerate(zip(self.symbols, self.normalized)):
+            self.by_symbol.setdefault(symbol.upper(), i)
+            self.by_symbol.setdefault(symbol.upper().split("-")[0], i)
+            self.by_symbol.setdefault(base_of(symbol), i)
+            self.by_name[name].append(i)
+
+            grams = ngrams(name)
+            self.gram_counts.append(len(grams))
+            for size in range(1, NGRAM_SIZE):
+                grams |= ngrams(name, size) # shorter grams for queries with less than NGRAM_SIZE chars
+            for gram in grams:
+                self.postings[gram].append(i)
+
+        self.sorted_names = sorted((name, i) for i, name in enumerate(self.normalized))
+        self.sorted_keys = [name for name, _ in self.sorted_names]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def exact(self, query: str) -> list[int]:
+        """
+        Returns the positions of the assets whose symbol or normalized name is exactly the query.
+        """
+        found = set(self.by_name.get(normalize_name(query), []))
+        symbol = self.by_symbol.get(query.strip().upper())
+        if symbol is not None:
+            found.add(symbol)
+        return sorted(found)
+
+    def prefix(self, query: str) -> list[int]:
+        """
+        Returns the positions of the assets whose normalized name starts with the query.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        start = bisect.bisect_left(self.sorted_keys, query)
+        end = bisect.bisect_left(self.sorted_keys, query + "\uffff", lo=start)
+        return sorted(i for _, i in self.sorted_names[start:end])
+
+    def contains(self, query: str) -> list[int]:
+        """
+        Returns the positions of the assets whose normalized name contains the query.
+        The candidates are the intersection of the posting lists of the query n-grams.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        grams = ngrams(query, min(NGRAM_SIZE, len(query)))
+        postings = sorted((self.postings.get(gram, []) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return []
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if query in self.normalized[i])
+
+    def fuzzy(self, query: str, limit: int = 10, min_similarity: float = FUZZY_MIN_SIMILARITY) -> list[int]:
+        """
+        Returns the positions of the assets whose name is similar to the query (e.g. with typos),
+        ranked by n-gram similarity and then by market cap.
+        """
+        query = normalize_name(query)
+        grams = ngrams(query)
+        if not grams:
+            return []
+
+        shared: dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self.postings.get(gram, []):
+                shared[i] += 1
+
+        scored: list[tuple[float, int]] = []
+        for i, count in shared.items():
+            similarity = 2 * count / (len(grams) + self.gram_counts[i])
+            if similarity >= min_similarity:
+                scored.append((-similarity, i))
+        scored.sort()
+        return [i for _, i in scored[:limit]]
+
+    def search(self, query: str, limit: int | None = None, fuzzy: bool = True) -> list[int]:
+        """
+        Searches the query and returns the positions of the matches:
+        exact matches first, then prefix and substring matches (each group ranked by market cap),
+        and finally fuzzy matches if there are still fewer than `limit` results.
+        Args:
+            query (str): The name or symbol to search.
+            limit (int | None): The maximum number of results. None means no limit.
+            fuzzy (bool): Whether to add fuzzy matches.
+        Returns:
+            list[int]: The positions of the matching assets.
+        """
+        results: list[int] = []
+        seen: set[int] = set()
+        groups = [self.exact(query), self.prefix(query), self.contains(query)]
+        if fuzzy and (limit is None or sum(len(g) for g in groups) < limit):
+            groups.append(self.fuzzy(query, limit or 10))
+
+        for group in groups:
+            for i in group:
+                if i not in seen:
+                    seen.add(i)
+                    results.append(i)
+        return results if limit is None else results[:limit]
+
+    def items(self, positions: Iterable[int]) -> list[tuple[str, str]]:
+        """
+        Returns the (symbol, name) tuples of the given positions.
+        """
+        return [(self.symbols[i], self.names[i]) for i in positions]
+
+
+def parse_table(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the symbols table scraped from Yahoo Finance into typed columns (TEXT_COLUMNS + NUMERIC_COLUMNS).
+    The display strings are parsed into numbers, e.g. the 'Price' column '111,269.41 -1,277.88 (-1.14%)' becomes 111269.41
+    and the '52 Wk Range' '65,188.04 126,198.07' becomes the two columns '52 Wk Low' and '52 Wk High'.
+    Tables that are already typed are returned with the same values.
+    Args:
+        table (pd.DataFrame): The table to convert.
+    Returns:
+        pd.DataFrame: The typed table.
+    """
+    def first(value: Any) -> Any:
+        return value.split()[0] if isinstance(value, str) and value.strip() else value
+
+    def nth(series: pd.Series, n: int) -> pd.Series: # type: ignore
+        return series.map(lambda v: str(v).split()[n] if isinstance(v, str) and len(v.split()) > n else "") # type: ignore
+
+    typed = pd.DataFrame({column: table[column].fillna("").astype(str) if column in table else "" for column in TEXT_COLUMNS})
+    if "52 Wk Range" in table and "52 Wk Low" not in table:
+        table = table.assign(**{"52 Wk Low": nth(table["52 Wk Range"], 0), "52 Wk High": nth(table["52 Wk Range"], 1)}) # type: ignore
+    if "Price" in table:
+        table = table.assign(Price=table["Price"].map(first)) # type: ignore
+
+    for column in NUMERIC_COLUMNS:
+        values = table[column] if column in table else pd.Series(0.0, index=table.index)
+        typed[column] = np.fromiter((parse_amount(v) for v in values), dtype=np.float64, count=len(values))
+    return typed
+
+
+def binary_path(path: str) -> str:
+    """
+    Returns the path of the binary cache of a symbols table (same name, '.npy' extension).
+    """
+    return os.path.splitext(path)[0] + ".npy"
+
+
+def save_table(table: pd.DataFrame, path: str) -> None:
+    """
+    Saves the typed symbols table as CSV and as a NumPy structured array next to it (the binary cache),
+    that is loaded without parsing the CSV again.
+    Args:
+        table (pd.DataFrame): The table to save (it is converted with parse_table if needed).
+        path (str): The path of the CSV file.
+    """
+    table = parse_table(table)
+    table.to_csv(path, index=False)
+    save_binary(table, path)
+
+
+def save_binary(table: pd.DataFrame, path: str) -> None:
+    """
+    Saves only the binary cache of a typed symbols table, next to its CSV file.
+    """
+    dtype = [(c, f"U{max(1, int(table[c].str.len().max() or 1))}") for c in TEXT_COLUMNS] + [(c, "f8") for c in NUMERIC_COLUMNS]
+    records = np.empty(len(table), dtype=dtype)
+    for column in TEXT_COLUMNS + NUMERIC_COLUMNS:
+        records[column] = table[column].to_numpy()
+
+    temp = binary_path(path) + ".tmp"
+    with open(temp, "wb") as file:
+        np.save(file, records)
+    os.replace(temp, binary_path(path))
+
+
+def load_table(path: str) -> pd.DataFrame:
+    """
+    Loads the typed symbols table. The binary cache is read if it is up to date,
+    otherwise the CSV is parsed and the binary cache is written for the next load (the CSV is never rewritten).
+    Args:
+        path (str): The path of the CSV file.
+    Returns:
+        pd.DataFrame: The typed table, empty if there is no file.
+    """
+    binary = binary_path(path)
+    if os.path.exists(binary) and (not os.path.exists(path) or os.path.getmtime(binary) >= os.path.getmtime(path)):
+        records = np.load(binary)
+        return pd.DataFrame({column: records[column] for column in TEXT_COLUMNS + NUMERIC_COLUMNS})
+
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=TEXT_COLUMNS + NUMERIC_COLUMNS)
+    table = parse_table(pd.read_csv(path)) # type: ignore
+    try:
+        save_binary(table, path)
+    except OSError:
+        pass # Read-only location: the binary cache is only an optimization
+    return table
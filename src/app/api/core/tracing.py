@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+
+SERVICE_NAME = "upo-app-ai"
+"""Name of the service in the exported OTLP traces"""
+
+MAX_ATTRIBUTE_CHARS = 500
+"""Longer text attributes (e.g. queries and tool arguments) are truncated"""
+
+
+def new_run_id() -> str:
+    """
+    Returns a new unique run ID, also used as the trace ID (32 hex digits, as in OTLP).
+    """
+    return uuid.uuid4().hex
+
+
+@dataclass
+class Span:
+    """
+    A timed operation of a run (the run itself, a workflow step, an agent turn, a tool call, a provider attempt).
+    Times are UNIX nanoseconds; `end_ns` is 0 while the span is open.
+    """
+    name: str
+    category: str
+    span_id: str
+    parent_id: str | None
+    lane: str
+    """Timeline on which the span is drawn in the Chrome trace (e.g. the agent or the thread)"""
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set(self, **attributes: Any) -> 'Span':
+        for key, value in attributes.items():
+            self.attributes[key] = value if isinstance(value, (bool, int, float)) else str(value)[:MAX_ATTRIBUTE_CHARS]
+        return self
+
+    def end(self, error: str | None = None) -> None:
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = error[:MAX_ATTRIBUTE_CHARS]
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.time_ns()) - self.start_ns
+
+
+class Trace:
+    """
+    The spans of a pipeline run, identified by its run ID.
+    The run span is the root; steps, agent turns, tool calls and provider attempts are nested below it.
+    Spans are created from the tasks and threads of the run, so the list is guarded by a lock.
+    The trace can be exported as a Chrome trace (chrome://tracing, Perfetto) or as OTLP JSON.
+    """
+
+    def __init__(self, name: str = "Pipeline run", run_id: str | None = None, **attributes: Any):
+        """
+        Args:
+            name (str): The name of the root span.
+            run_id (str | None): The run ID, a new one if None.
+            attributes: The attributes of the root span.
+        """
+        self.run_id = run_id or new_run_id()
+        self.spans: list[Span] = []
+        self.step: Span | None = None
+        self.agents: dict[str, Span] = {}
+        self.lock = threading.Lock()
+        self.root = self.start_span(name, "run", parent=None, lane="pipeline", **attributes)
+
+    def start_span(self, name: str, category: str, parent: Span | None, lane: str | None = None, **attributes: Any) -> Span:
+        """
+        Starts a new span, child of `parent` (the root span if None is given after the root exists).
+        Args:
+            name (str): The name of the span.
+            category (str): The kind of operation (run, step, agent, tool, provider).
+            parent (Span | None): The parent span.
+            lane (str | None): The timeline of the span, the one of the parent if None.
+            attributes: The attributes of the span.
+        Returns:
+            Span: The new span, to be ended by the caller.
+        """
+        span = Span(
+            name=name,
+            category=category,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            lane=lane or (parent.lane if parent else "pipeline"),
+        ).set(**attributes)
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def start_step(self, name: str) -> Span:
+        """
+        Starts the span of a workflow step, ending the previous one.
+        """
+        with self.lock:
+            previous = self.step
+        if previous:
+            previous.end()
+        step = self.start_span(name, "step", parent=self.root, lane="pipeline")
+        with self.lock:
+            self.step = step
+        return step
+
+    def end_step(self, name: str) -> None:
+        with self.lock:
+            step = self.step if self.step and self.step.name == name else None
+            self.step = None if step else self.step
+        if step:
+            step.end()
+
+    def agent_span(self, agent: str) -> Span:
+        """
+        Returns the span of the current turn of the agent, starting it under the current step if needed.
+        The turn can start either from the agent events or from its first tool call, whichever comes first.
+        """
+        with self.lock:
+            span = self.agents.get(agent)
+            parent = self.step or self.root
+        if span is None:
+            span = self.start_span(agent, "agent", parent=parent, lane=agent, agent=agent)
+            with self.lock:
+                span = self.agents.setdefault(agent, span)
+        return span
+
+    def end_agent(self, agent: str, error: str | None = None, **attributes: Any) -> None:
+        with self.lock:
+            span = self.agents.pop(agent, None)
+        if span:
+            span.set(**attributes).end(error)
+
+    def finish(self, error: str | None = None, **attributes: Any) -> None:
+        """
+        Ends the run: the spans still open (e.g. of cancelled agents) are ended as unfinished.
+        """
+        with self.lock:
+            spans = list(self.spans)
+            self.agents.clear()
+            self.step = None
+        for span in spans:
+            if span is not self.root and not span.end_ns:
+                span.set(unfinished=True).end()
+        self.root.set(**attributes).end(error)
+
+    def to_chrome(self) -> dict[str, Any]:
+        """
+        Returns the trace in the Chrome trace event format: one complete event ('X') per span,
+        one timeline (thread) per lane, times in microseconds.
+        """
+        with self.lock:
+            spans = list(self.spans)
+        lanes: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in spans:
+            tid = lanes.setdefault(span.lane, len(lanes) + 1)
+            args = dict(span.attributes, span_id=span.span_id, parent_id=span.parent_id or "")
+            if span.error is not None:
+                args["error"] = span.error
+            events.append({
+                "name": span.name, "cat": span.category, "ph": "X", "pid": 1, "tid": tid,
+                "ts": span.start_ns / 1000, "dur": span.duration_ns / 1000, "args": args,
+            })
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": f"run {self.run_id}"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}} for lane, tid in lanes.items()]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": {"run_id": self.run_id}}
+
+    def to_otlp(self) -> dict[str, Any]:
+        """
+        Returns the trace in the OTLP/JSON format (as accepted by the OTLP/HTTP exporters and collectors).
+        """
+        with self.lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [Trace.__attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "app.tracing"},
+                "spans": [{
+                    "traceId": self.run_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1, # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                    "attributes": [Trace.__attribute("category", span.category)] + [Trace.__attribute(k, v) for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error is not None else {"code": 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, directory: str, format: str = "chrome") -> str:
+        """
+        Writes the trace to `directory`/<run_id>.json (Chrome) or `directory`/<run_id>.otlp.json (OTLP).
+        Returns:
+            str: The path of the written file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        otlp = format.lower() == "otlp"
+        path = os.path.join(directory, f"{self.run_id}{'.otlp' if otlp else ''}.json")
+        with open(path, "w") as file:
+            json.dump(self.to_otlp() if otlp else self.to_chrome(), file)
+        return path
+
+    @staticmethod
+    def __attribute(key: str, value: Any) -> dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+
+__trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+__span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+def current_trace() -> Trace | None:
+    """
+    Returns the trace of the current run, or None outside of a traced run.
+    """
+    return __trace.get()
+
+def set_trace(trace: Trace | None) -> None:
+    """
+    Sets the trace for the current context, with its root as current span. Tasks and `asyncio.to_thread` calls started afterwards inherit it.
+    """
+    __trace.set(trace)
+    __span.set(trace.root if trace else None)
+
+@contextmanager
+def span(name: str, category: str, parent: Span | None = None, lane: str | None = None, **attributes: Any) -> Iterator[Span | None]:
+    """
+    Records the block as a span of the current trace, child of `parent` or of the current span,
+    which it replaces until the end of the block. Errors are recorded and propagated.
+    Outside of a traced run nothing is recorded and None is yielded.
+    """
+    trace = __trace.get()
+    if trace is None:
+        yield None
+        return
+
+    opened = trace.start_span(name, category, parent=parent or __span.get() or trace.root, lane=lane, **attributes)
+    token = __span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.end(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        __span.reset(token)
+        opened.end()
+
+
+def tool_tracing_hook(function_name: str, function_call: Callable[..., Any], arguments: dict[str, Any], agent: Any = None) -> Any:
+    """
+    Agno tool hook that records each tool call as a span of the turn of the calling agent.
+    The provider attempts made by the tool are nested inside it.
+    """
+    return __trace_tool(getattr(agent, "name", None) or "agent", function_name, function_call, arguments)
+
+
+def team_tracing_hook(team_name: str) -> Callable[..., Any]:
+    """
+    Returns an agno tool hook for the tools of a team leader, that agno calls without an agent:
+    each call is recorded as a span of the turn of the team, named `team_name`.
+    """
+    def hook(function_name: str, function_call: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+        return __trace_tool(team_name, function_name, function_call, arguments)
+    return hook
+
+
+def __trace_tool(agent_name: str, function_name: str, function_call: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+    trace = __trace.get()
+    if trace is None:
+        return function_call(**arguments)
+
+    parent = trace.agent_span(agent_name)
+    lane = f"{agent_name} / {threading.current_thread().name}"
+    with span(function_name, "tool", parent=parent, lane=lane, arguments=json.dumps(arguments, default=str)):
+        return function_call(**arguments)
@@ -1,6 +1,8 @@
 import os
 from typing import Any
 from binance.client import Client # type: ignore
+from app.api.core.assets import provider_symbol
+from app.api.core.deadline import current_deadline
 from app.api.core.markets import ProductInfo, MarketWrapper, Price
 
 
@@ -51,21 +53,29 @@ class BinanceWrapper(MarketWrapper):
         api_secret = os.getenv("BINANCE_API_SECRET")
 
         self.currency = currency if currency not in FIAT_TO_STABLECOIN else FIAT_TO_STABLECOIN[currency]
-        self.client = Client(api_key=api_key, api_secret=api_secret)
+        self.client = Client(api_key=api_key, api_secret=api_secret, requests_params={'timeout': current_deadline().timeout()})
 
     def __format_symbol(self, asset_id: str) -> str:
         """
         Formatta l'asset_id nel formato richiesto da Binance.
+        Se l'asset_id contiene già la valuta (es. "BTCUSDT") viene lasciato invariato,
+        altrimenti viene risolto con l'AssetResolver (es. "bitcoin" -> "BTCUSDT").
         """
         i = asset_id.find('-')
-        if i != -1: asset_id = asset_id[:i]
-        return f"{asset_id}{self.currency}" if self.currency not in asset_id else asset_id
+        base = asset_id[:i] if i != -1 else asset_id
+        return base if self.currency in base else provider_symbol(asset_id, "binance", self.currency)
+
+    def __requests_params(self) -> dict[str, Any]:
+        """
+        Parametri per la singola richiesta: il timeout segue la scadenza della run corrente (api.request_timeout_seconds).
+        """
+        return {'timeout': current_deadline().timeout()}
 
     def get_product(self, asset_id: str) -> ProductInfo:
         symbol = self.__format_symbol(asset_id)
 
-        ticker: dict[str, Any] = self.client.get_symbol_ticker(symbol=symbol) # type: ignore
-        ticker_24h: dict[str, Any] = self.client.get_ticker(symbol=symbol) # type: ignore
+        ticker: dict[str, Any] = self.client.get_symbol_ticker(symbol=symbol, requests_params=self.__requests_params()) # type: ignore
+        ticker_24h: dict[str, Any] = self.client.get_ticker(symbol=symbol, requests_params=self.__requests_params()) # type: ignore
         ticker['volume'] = ticker_24h.get('volume', 0)
 
         return extract_product(self.currency, ticker)
@@ -76,10 +86,11 @@ class BinanceWrapper(MarketWrapper):
     def get_historical_prices(self, asset_id: str, limit: int = 100) -> list[Price]:
         symbol = self.__format_symbol(asset_id)
 
-        # Ottiene candele orarie degli ultimi 30 giorni
-        klines: list[list[Any]] = self.client.get_historical_klines( # type: ignore
+        # Ottiene le ultime `limit` candele orarie (get_klines accetta i parametri della richiesta, get_historical_klines no)
+        klines: list[list[Any]] = self.client.get_klines( # type: ignore
             symbol=symbol,
             interval=Client.KLINE_INTERVAL_1HOUR,
             limit=limit,
+            requests_params=self.__requests_params(),
         )
         return [extract_price(kline) for kline in klines]
@@ -3,6 +3,8 @@ from enum import Enum
 from datetime import datetime, timedelta
 from coinbase.rest import RESTClient # type: ignore
 from coinbase.rest.types.product_types import Candle, GetProductResponse, Product # type: ignore
+from app.api.core.assets import provider_symbol
+from app.api.core.deadline import current_deadline
 from app.api.core.markets import ProductInfo, MarketWrapper, Price
 
 
@@ -27,6 +29,21 @@ def extract_price(candle_data: Candle) -> Price:
     return price
 
 
+class DeadlineRESTClient(RESTClient):
+    """
+    RESTClient le cui richieste usano il timeout della scadenza della run corrente (api.request_timeout_seconds),
+    invece di quello fisso passato al costruttore.
+    """
+
+    @property
+    def timeout(self) -> float: # type: ignore
+        return current_deadline().timeout()
+
+    @timeout.setter
+    def timeout(self, value: float | None) -> None:
+        pass
+
+
 class Granularity(Enum):
     UNKNOWN_GRANULARITY = 0
     ONE_MINUTE = 60
@@ -55,15 +72,13 @@ class CoinBaseWrapper(MarketWrapper):
         assert api_private_key, "COINBASE_API_SECRET environment variable not set"
 
         self.currency = currency
-        self.client: RESTClient = RESTClient(
+        self.client: RESTClient = DeadlineRESTClient(
             api_key=api_key,
-            api_secret=api_private_key
+            api_secret=api_private_key,
         )
 
     def __format(self, asset_id: str) -> str:
-        i = asset_id.find('-')
-        if i != -1: asset_id = asset_id[:i]
-        return f"{asset_id}-{self.currency}"
+        return provider_symbol(asset_id, "coinbase", self.currency)
 
     def get_product(self, asset_id: str) -> ProductInfo:
         asset_id = self.__format(asset_id)
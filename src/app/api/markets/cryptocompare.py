@@ -1,6 +1,8 @@
 import os
 from typing import Any
 import requests
+from app.api.core.assets import provider_symbol
+from app.api.core.deadline import current_deadline
 from app.api.core.markets import ProductInfo, MarketWrapper, Price
 
 
@@ -46,10 +48,14 @@ class CryptoCompareWrapper(MarketWrapper):
             params = {}
         params['api_key'] = self.api_key
 
-        response = requests.get(f"{BASE_URL}{endpoint}", params=params)
+        response = requests.get(f"{BASE_URL}{endpoint}", params=params, timeout=current_deadline().timeout())
         return response.json()
 
+    def __format(self, asset_id: str) -> str:
+        return provider_symbol(asset_id, "cryptocompare", self.currency)
+
     def get_product(self, asset_id: str) -> ProductInfo:
+        asset_id = self.__format(asset_id)
         response = self.__request("/data/pricemultifull", params = {
             "fsyms": asset_id,
             "tsyms": self.currency
@@ -58,6 +64,7 @@ class CryptoCompareWrapper(MarketWrapper):
         return extract_product(data)
 
     def get_products(self, asset_ids: list[str]) -> list[ProductInfo]:
+        asset_ids = [self.__format(asset_id) for asset_id in asset_ids]
         response = self.__request("/data/pricemultifull", params = {
             "fsyms": ",".join(asset_ids),
             "tsyms": self.currency
@@ -70,6 +77,7 @@ class CryptoCompareWrapper(MarketWrapper):
         return assets
 
     def get_historical_prices(self, asset_id: str, limit: int = 100) -> list[Price]:
+        asset_id = self.__format(asset_id)
         response = self.__request("/data/v2/histohour", params = {
             "fsym": asset_id,
             "tsym": self.currency,
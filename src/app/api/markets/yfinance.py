@@ -1,5 +1,7 @@
 import json
 from agno.tools.yfinance import YFinanceTools
+from app.api.core.assets import provider_symbol
+from app.api.core.symbols import base_of
 from app.api.core.markets import MarketWrapper, ProductInfo, Price
 
 
@@ -9,7 +11,7 @@ def extract_product(stock_data: dict[str, str]) -> ProductInfo:
     """
     product = ProductInfo()
     product.id = stock_data.get('Symbol', '')
-    product.symbol = product.id.split('-')[0]  # Rimuovi il suffisso della valuta per le crypto
+    product.symbol = base_of(product.id)  # Rimuovi il suffisso della valuta (e le cifre di disambiguazione) per le crypto
     product.price = float(stock_data.get('Current Stock Price', f"0.0 USD").split(" ")[0]) # prende solo il numero
     product.volume_24h = 0.0 # YFinance non fornisce il volume 24h direttamente
     product.currency = product.id.split('-')[1]  # La valuta è la parte dopo il '-'
@@ -46,10 +48,9 @@ class YFinanceWrapper(MarketWrapper):
         """
         Formatta il simbolo per yfinance.
         Per crypto, aggiunge '-' e la valuta (es. BTC -> BTC-USD).
+        Le crypto note vengono risolte con l'AssetResolver (es. "pepe" -> "PEPE24478-USD").
         """
-        i = asset_id.find('-')
-        if i != -1: asset_id = asset_id[:i]
-        return f"{asset_id}-{self.currency}"
+        return provider_symbol(asset_id, "yfinance", self.currency)
 
     def get_product(self, asset_id: str) -> ProductInfo:
         symbol = self._format_symbol(asset_id)
@@ -1,10 +1,25 @@
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from typing import Any
 import requests
 from enum import Enum
+from app.api.core.deadline import current_deadline
+from app.api.core.metrics import get_metrics
 from app.api.core.news import NewsWrapper, Article
 
 
+POLL_INTERVAL_SECONDS = 300
+"""Seconds during which the cached posts of a feed are returned without any request (the free plan has 100 req/month)"""
+
+MAX_PAGES_PER_POLL = 5
+"""Maximum number of pages followed in a single poll"""
+
+MAX_CACHED_POSTS = 500
+"""Maximum number of posts kept for each feed"""
+
+
 class CryptoPanicFilter(Enum):
     RISING = "rising"
     HOT = "hot"
@@ -29,15 +44,44 @@ def extract_articles(response: dict[str, Any]) -> list[Article]:
             article.time = item.get('published_at', '')
             article.title = item.get('title', '')
             article.description = item.get('description', '')
+            article.url = item.get('original_url') or item.get('url') or ''
             articles.append(article)
     return articles
 
+@dataclass
+class PostsCursor:
+    """
+    The posts already fetched for a feed (currencies, filter and kind), newest first.
+    """
+    posts: list[dict[str, Any]] = field(default_factory=list) # type: ignore
+    newest: str = ""
+    """The newest published_at seen, in the ISO format returned by the API (so it compares as a string)"""
+    polled_at: float = 0.0
+    older: str | None = None
+    """URL of the page with the posts older than the cached ones, None if there are no more"""
+
+    def merge(self, new_posts: list[dict[str, Any]]) -> None:
+        ids = {post.get('id') for post in new_posts}
+        self.posts = (new_posts + [post for post in self.posts if post.get('id') not in ids])[:MAX_CACHED_POSTS]
+        self.newest = max([self.newest] + [post.get('published_at', '') for post in new_posts])
+        self.polled_at = time.monotonic()
+
+    def append_older(self, old_posts: list[dict[str, Any]], older: str | None) -> None:
+        ids = {post.get('id') for post in self.posts}
+        self.posts = (self.posts + [post for post in old_posts if post.get('id') not in ids])[:MAX_CACHED_POSTS]
+        self.older = older
+
+
 class CryptoPanicWrapper(NewsWrapper):
     """
     A wrapper for the CryptoPanic API (Documentation: https://cryptopanic.com/developers/api/)
     Requires an API key set in the environment variable CRYPTOPANIC_API_KEY.
     It is free to use, but has rate limits and restrictions based on the plan type (the free plan is 'developer' with 100 req/month).
     Supports different plan types via the CRYPTOPANIC_API_PLAN environment variable (developer, growth, enterprise).
+    To save the quota the posts are polled incrementally: for each feed (currencies, filter and kind) the wrapper remembers
+    the newest post seen and follows the `next` pages only until it reaches posts already seen, while the older posts
+    are served from the local cache. A feed polled in the last POLL_INTERVAL_SECONDS is not requested at all.
+    If a request asks for more posts than the cached ones, the older pages are followed from where the cache ends.
     """
 
     def __init__(self):
@@ -51,6 +95,8 @@ class CryptoPanicWrapper(NewsWrapper):
         self.base_url = f"https://cryptopanic.com/api/{plan_type}/v2"
         self.filter = CryptoPanicFilter.ANY
         self.kind = CryptoPanicKind.NEWS
+        self.cursors: dict[tuple[str, str, str], PostsCursor] = {}
+        self.lock = threading.Lock()
 
     def get_base_params(self) -> dict[str, str]:
         params: dict[str, str] = {}
@@ -68,12 +114,73 @@ class CryptoPanicWrapper(NewsWrapper):
         return self.get_latest_news("", limit) # same endpoint so just call the other method
 
     def get_latest_news(self, query: str, limit: int = 100) -> list[Article]:
+        currencies = ",".join(sorted(c.strip().upper() for c in query.split(",") if c.strip()))
+        key = (currencies, self.filter.value, self.kind.value)
+        with self.lock:
+            cursor = self.cursors.setdefault(key, PostsCursor())
+            stale = not cursor.polled_at or time.monotonic() - cursor.polled_at > POLL_INTERVAL_SECONDS
+        get_metrics().cache("cryptopanic_posts", hit=not stale)
+        if stale:
+            newest = cursor.newest
+            new_posts, next_url = self.__poll(currencies, newest, limit)
+            with self.lock:
+                cursor.merge(new_posts)
+                if not newest: # the first poll of the feed starts the older pages
+                    cursor.older = next_url
+
+        with self.lock:
+            missing = min(limit, MAX_CACHED_POSTS) - len(cursor.posts)
+            older = cursor.older
+        if missing > 0 and older:
+            old_posts, next_url = self.__fetch_older(older, missing)
+            with self.lock:
+                cursor.append_older(old_posts, next_url)
+
+        with self.lock:
+            posts = cursor.posts[:limit]
+        return extract_articles({'results': posts})
+
+    def __poll(self, currencies: str, newest: str, limit: int) -> tuple[list[dict[str, Any]], str | None]:
+        """
+        Fetches the posts newer than `newest`, following the `next` pages until a post already seen is reached
+        (or, for a feed never polled, until there are `limit` posts).
+        Returns the new posts and the URL of the page after the last one read (None if there are no more).
+        """
         params = self.get_base_params()
-        params['currencies'] = query
+        if currencies:
+            params['currencies'] = currencies
 
-        response = requests.get(f"{self.base_url}/posts/", params=params)
-        assert response.status_code == 200, f"Error fetching data: {response}"
+        url: str | None = f"{self.base_url}/posts/"
+        new_posts: list[dict[str, Any]] = []
+        for _ in range(MAX_PAGES_PER_POLL):
+            if url is None:
+                break
+            json_response = self.__get(url, params)
+            results: list[dict[str, Any]] = json_response.get('results', [])
+            fresh = [post for post in results if post.get('published_at', '') > newest]
+            new_posts.extend(fresh)
+            url, params = json_response.get('next'), {} # the next URL already contains the parameters
+            if len(fresh) < len(results) or (not newest and len(new_posts) >= limit):
+                break
+        return new_posts, url
 
-        json_response = response.json()
-        articles = extract_articles(json_response)
-        return articles[:limit]
+    def __fetch_older(self, url: str, count: int) -> tuple[list[dict[str, Any]], str | None]:
+        """
+        Follows the `next` pages from `url` until there are `count` posts (at most MAX_PAGES_PER_POLL pages).
+        Returns the posts and the URL of the page after the last one read (None if there are no more).
+        """
+        old_posts: list[dict[str, Any]] = []
+        next_url: str | None = url
+        for _ in range(MAX_PAGES_PER_POLL):
+            if next_url is None or len(old_posts) >= count:
+                break
+            json_response = self.__get(next_url, {})
+            old_posts.extend(json_response.get('results', []))
+            next_url = json_response.get('next')
+        return old_posts, next_url
+
+    @staticmethod
+    def __get(url: str, params: dict[str, str]) -> dict[str, Any]:
+        response = requests.get(url, params=params, timeout=current_deadline().timeout())
+        assert response.status_code == 200, f"Error fetching data: {response}"
+        return response.json()
@@ -1,25 +1,97 @@
-from typing import Any
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
 from gnews import GNews # type: ignore
+from app.api.core.caching import get_cache_policy
+from app.api.core.metrics import get_metrics
 from app.api.core.news import Article, NewsWrapper
 
 
+RESULTS_TTL_SECONDS = 60
+"""Seconds during which the results of a request are reused without any network request"""
+
+MAX_CACHED_REQUESTS = 64
+"""Maximum number of requests (distinct queries and configurations) kept in the cache"""
+
+MAX_REUSABLE_RESULTS = 100
+"""Above this number of results GNews paginates by changing the dates of the client, so the client cannot be shared"""
+
+
 def extract_article(result: dict[str, Any]) -> Article:
     article = Article()
     article.source = result.get("source", "")
     article.time = result.get("publishedAt", "")
     article.title = result.get("title", "")
     article.description = result.get("description", "")
+    article.url = result.get("url", "") or ""
     return article
 
+
+@dataclass
+class CachedResults:
+    results: list[dict[str, Any]]
+    fetched_at: float
+
+
+class ResultsCache:
+    """
+    Cache of the results of the GNews requests (feed downloaded, parsed and processed), shared by all the clients of the wrapper.
+    Results fetched in the last `ttl_seconds` (or longer with the prefetch, see CachePolicy) are returned without any network request.
+    It wraps the public methods of GNews (get_news, get_top_news), so it does not depend on the internals of the library.
+    Empty results are not cached, since GNews also returns them when the request fails.
+    """
+
+    def __init__(self, ttl_seconds: float = RESULTS_TTL_SECONDS, max_requests: int = MAX_CACHED_REQUESTS):
+        self.ttl_seconds = ttl_seconds
+        self.max_requests = max_requests
+        self.requests: dict[tuple[Any, ...], CachedResults] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple[Any, ...], fetch: Callable[[], list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        """
+        Returns the results of the request, from the cache when they are fresh.
+        Args:
+            key (tuple): The request (e.g. kind, query and client configuration).
+            fetch (Callable[[], list[dict]]): Function that makes the request.
+        Returns:
+            list[dict]: The results of the request.
+        """
+        with self.lock:
+            cached = self.requests.get(key)
+        hit = cached is not None and time.monotonic() - cached.fetched_at < get_cache_policy().ttl(self.ttl_seconds)
+        get_metrics().cache("google_news_feed", hit=hit)
+        if cached is not None and hit:
+            return cached.results
+
+        results = fetch()
+        if results:
+            with self.lock:
+                self.requests.pop(key, None)
+                self.requests[key] = CachedResults(results=results, fetched_at=time.monotonic())
+                while len(self.requests) > self.max_requests:
+                    del self.requests[next(iter(self.requests))]
+        return results
+
+
 class GoogleNewsWrapper(NewsWrapper):
     """
     A wrapper for the Google News RSS Feed (Documentation: https://github.com/ranahaani/GNews/?tab=readme-ov-file#about-gnews)
     It does not require an API key and is free to use.
+    The GNews clients are kept per configuration and the results are cached (see ResultsCache),
+    so repeated requests within RESULTS_TTL_SECONDS do not use the network.
     """
 
+    def __init__(self, language: str = 'en', period: str = '7d'):
+        self.language = language
+        self.period = period
+        self.cache = ResultsCache()
+        self.clients: dict[tuple[str, str, int], GNews] = {}
+        self.lock = threading.Lock()
+
     def get_top_headlines(self, limit: int = 100) -> list[Article]:
-        gnews = GNews(language='en', max_results=limit, period='7d')
-        results: list[dict[str, Any]] = gnews.get_top_news() # type: ignore
+        gnews = self.__client(limit)
+        results = self.cache.get(("top", self.language, self.period, limit), lambda: gnews.get_top_news()) # type: ignore
 
         articles: list[Article] = []
         for result in results:
@@ -28,11 +100,21 @@ class GoogleNewsWrapper(NewsWrapper):
         return articles
 
     def get_latest_news(self, query: str, limit: int = 100) -> list[Article]:
-        gnews = GNews(language='en', max_results=limit, period='7d')
-        results: list[dict[str, Any]] = gnews.get_news(query) # type: ignore
+        gnews = self.__client(limit)
+        results = self.cache.get(("query", query, self.language, self.period, limit), lambda: gnews.get_news(query)) # type: ignore
 
         articles: list[Article] = []
         for result in results:
             article = extract_article(result)
             articles.append(article)
         return articles
+
+    def __client(self, limit: int) -> GNews:
+        if limit > MAX_REUSABLE_RESULTS:
+            return GNews(language=self.language, max_results=limit, period=self.period)
+
+        key = (self.language, self.period, limit)
+        with self.lock:
+            if key not in self.clients:
+                self.clients[key] = GNews(language=self.language, max_results=limit, period=self.period)
+            return self.clients[key]
@@ -1,15 +1,21 @@
 import os
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 import newsapi # type: ignore
 from app.api.core.news import Article, NewsWrapper
 
 
+MAX_CONCURRENT_PAGES = 4
+"""Maximum number of pages requested at the same time"""
+
+
 def extract_article(result: dict[str, Any]) -> Article:
     article = Article()
     article.source = result.get("source", {}).get("name", "")
     article.time = result.get("publishedAt", "")
     article.title = result.get("title", "")
     article.description = result.get("description", "")
+    article.url = result.get("url", "") or ""
     return article
 
 class NewsApiWrapper(NewsWrapper):
@@ -33,22 +39,41 @@ class NewsApiWrapper(NewsWrapper):
         pages = (limit // page_size) + (1 if limit % page_size > 0 else 0)
         return pages, page_size
 
-    def get_top_headlines(self, limit: int = 100) -> list[Article]:
+    def __fetch_pages(self, limit: int, fetch_page: Callable[[int, int], dict[str, Any]]) -> list[Article]:
+        """
+        Requests the pages concurrently (at most MAX_CONCURRENT_PAGES at a time) and returns the articles in page order.
+        It stops at the first short page (the last one available), when `limit` articles are collected or when a page fails,
+        cancelling the pages not yet requested so that they do not consume the quota.
+        Args:
+            limit (int): The maximum number of articles.
+            fetch_page (Callable[[int, int], dict[str, Any]]): Function that requests a page given its number and size.
+        Returns:
+            list[Article]: The articles, in the order returned by the API.
+        """
+        if limit <= 0:
+            return []
         pages, page_size = self.__calc_pages(limit, self.max_page_size)
         articles: list[Article] = []
 
-        for page in range(1, pages + 1):
-            headlines: dict[str, Any] = self.client.get_top_headlines(q="", category=self.category, language=self.language, page_size=page_size, page=page) # type: ignore
-            results = [extract_article(article) for article in headlines.get("articles", [])] # type: ignore
-            articles.extend(results)
-        return articles
+        with ThreadPoolExecutor(max_workers=min(pages, MAX_CONCURRENT_PAGES)) as pool:
+            futures = [pool.submit(fetch_page, page, page_size) for page in range(1, pages + 1)]
+            try:
+                for future in futures:
+                    results = [extract_article(article) for article in future.result().get("articles", [])]
+                    articles.extend(results)
+                    if len(results) < page_size or len(articles) >= limit:
+                        break
+            finally:
+                for future in futures:
+                    future.cancel()
+        return articles[:limit]
 
-    def get_latest_news(self, query: str, limit: int = 100) -> list[Article]:
-        pages, page_size = self.__calc_pages(limit, self.max_page_size)
-        articles: list[Article] = []
+    def get_top_headlines(self, limit: int = 100) -> list[Article]:
+        return self.__fetch_pages(limit, lambda page, page_size: self.client.get_top_headlines( # type: ignore
+            q="", category=self.category, language=self.language, page_size=page_size, page=page
+        ))
 
-        for page in range(1, pages + 1):
-            everything: dict[str, Any] = self.client.get_everything(q=query, language=self.language, sort_by="publishedAt", page_size=page_size, page=page) # type: ignore
-            results = [extract_article(article) for article in everything.get("articles", [])] # type: ignore
-            articles.extend(results)
-        return articles
+    def get_latest_news(self, query: str, limit: int = 100) -> list[Article]:
+        return self.__fetch_pages(limit, lambda page, page_size: self.client.get_everything( # type: ignore
+            q=query, language=self.language, sort_by="publishedAt", page_size=page_size, page=page
+        ))
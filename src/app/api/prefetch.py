@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+from app.api.core.assets import get_asset_resolver, get_asset_usage
+from app.api.core.caching import get_cache_policy
+from app.api.core.symbols import base_of, normalize_name
+from app.api.tools import MarketAPIsTool, NewsAPIsTool, SocialAPIsTool
+from app.configs import PrefetchConfig
+
+logging = logging.getLogger("prefetch")
+
+
+NEWS_ASSETS = 3
+"""Number of top assets whose news are also searched at every refresh"""
+
+REFRESH_MARGIN_SECONDS = 60
+"""Time a refresh can take: the prefetched data must stay in the caches for the interval plus this margin"""
+
+
+class RequestBudget:
+    """
+    Sliding window of the (estimated) requests sent to the providers in the last hour.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: float = 3600):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.spent: deque[tuple[float, int]] = deque()
+
+    def available(self) -> int:
+        cutoff = time.monotonic() - self.window_seconds
+        while self.spent and self.spent[0][0] < cutoff:
+            self.spent.popleft()
+        return self.max_requests - sum(cost for _, cost in self.spent)
+
+    def try_spend(self, cost: int) -> bool:
+        """
+        Spends `cost` requests if they are available in the window.
+        Returns:
+            bool: True if the requests can be sent.
+        """
+        if cost > self.available():
+            return False
+        self.spent.append((time.monotonic(), cost))
+        return True
+
+
+class PrefetchDaemon:
+    """
+    Background thread that periodically refreshes the shared caches, so that most user queries do not wait for the providers:
+    - the product information of the top assets (the most requested by the users, then the top ones by market cap)
+    - the top headlines and the news of the first NEWS_ASSETS assets (local news index and mention index)
+    - the top posts of all the social providers (provider caches and mention index)
+    The tools share their wrappers and caches with the runs (see WrapperHandler.build_wrappers with shared=True).
+    Every task has an estimated cost in requests: a task is skipped when it would exceed the hourly budget,
+    and consecutive tasks are spaced to respect the rate limits of the providers.
+    When started, it extends the TTL of the caches (see CachePolicy) so that the prefetched data is used until the next refresh.
+    """
+
+    def __init__(self, config: PrefetchConfig, market: MarketAPIsTool | None = None, news: NewsAPIsTool | None = None, social: SocialAPIsTool | None = None):
+        """
+        Args:
+            config (PrefetchConfig): The prefetch configuration.
+            market (MarketAPIsTool | None): The market tool to use, created on the first refresh if None.
+            news (NewsAPIsTool | None): The news tool to use, created on the first refresh if None.
+            social (SocialAPIsTool | None): The social tool to use, created on the first refresh if None.
+        """
+        self.config = config
+        self.market = market
+        self.news = news
+        self.social = social
+        self.budget = RequestBudget(config.max_requests_per_hour)
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """
+        Starts the background thread: the first refresh is immediate, the next ones every `interval_minutes`.
+        """
+        if self.thread is not None:
+            return
+        self.extend_cache_ttls()
+        self.thread = threading.Thread(target=self.__loop, name="prefetch", daemon=True)
+        self.thread.start()
+        logging.info(f"Prefetch started: every {self.config.interval_minutes} minutes, max {self.config.max_requests_per_hour} requests/hour")
+
+    def extend_cache_ttls(self) -> None:
+        """
+        Keeps the data of the shared caches fresh for a whole interval (plus REFRESH_MARGIN_SECONDS),
+        otherwise most of it would expire long before the next refresh.
+        """
+        get_cache_policy().extend(self.config.interval_minutes * 60 + REFRESH_MARGIN_SECONDS)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def top_assets(self) -> list[str]:
+        """
+        Returns the base symbols to refresh: the most requested ones, then the top ones by market cap.
+        """
+        n = self.config.top_assets
+        assets = get_asset_usage().most_used(n)
+        for symbol in get_asset_resolver().index.symbols[:n * 2]:
+            if len(assets) >= n:
+                break
+            base = base_of(symbol)
+            if base not in assets:
+                assets.append(base)
+        return assets[:n]
+
+    def refresh(self) -> int:
+        """
+        Runs all the refresh tasks once, within the request budget.
+        Returns:
+            int: The number of tasks executed.
+        """
+        executed = 0
+        for name, cost, task in self.tasks():
+            if self.stopped.is_set():
+                break
+            if not self.budget.try_spend(cost):
+                logging.info(f"Prefetch of {name} skipped: request budget exhausted")
+                continue
+            try:
+                task()
+                executed += 1
+            except Exception as e:
+                logging.warning(f"Prefetch of {name} failed: {e}")
+            self.stopped.wait(self.config.min_request_interval_seconds)
+        return executed
+
+    def tasks(self) -> list[tuple[str, int, Callable[[], Any]]]:
+        """
+        Returns the refresh tasks, as (name, estimated requests, function).
+        """
+        self.__ensure_tools()
+        assets = self.top_assets()
+        tasks: list[tuple[str, int, Callable[[], Any]]] = []
+        if assets:
+            tasks.append(("products", len(assets), lambda: self.market.refresh_products(assets)))
+        tasks.append(("headlines", 1, lambda: self.news.get_top_headlines(self.config.news_limit)))
+        for asset in assets[:NEWS_ASSETS]:
+            tasks.append((f"news {asset}", 1, lambda asset=asset: self.news.get_latest_news(self.__news_query(asset), self.config.news_limit)))
+        social_cost = len(self.social.handler.wrappers) + self.config.social_limit # Reddit also needs a request for the comments of each post
+        tasks.append(("social", social_cost, lambda: self.social.get_top_crypto_posts_aggregated(self.config.social_limit)))
+        return tasks
+
+    def __loop(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"Prefetch refresh failed: {e}")
+            self.stopped.wait(self.config.interval_minutes * 60)
+
+    def __ensure_tools(self) -> None:
+        self.market = self.market or MarketAPIsTool()
+        self.news = self.news or NewsAPIsTool()
+        self.social = self.social or SocialAPIsTool()
+
+    @staticmethod
+    def __news_query(asset: str) -> str:
+        resolved = get_asset_resolver().resolve(asset)
+        return normalize_name(resolved.name) if resolved else asset
@@ -0,0 +1,200 @@
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+from functools import lru_cache
+from typing import Any, Callable, get_type_hints
+from pydantic import TypeAdapter
+from app.api.core.deadline import current_deadline
+from app.api.core.markets import MarketWrapper
+from app.api.core.news import NewsWrapper
+from app.api.core.social import SocialWrapper
+from app.configs import ReplayConfig, ReplayProfile
+
+logging = logging.getLogger("replay")
+
+
+INTERFACES: list[type] = [MarketWrapper, NewsWrapper, SocialWrapper]
+"""Wrapper interfaces whose methods can be recorded and replayed"""
+
+MAX_RECORDINGS_PER_CALL = 5
+"""Only the latest responses of each call (method and arguments) are kept in the fixtures"""
+
+
+class InjectedFailure(Exception):
+    """
+    Raised by a replayed wrapper to simulate a provider failure.
+    """
+
+
+def interface_of(wrapper_class: type) -> type:
+    """
+    Returns the wrapper interface (MarketWrapper, NewsWrapper or SocialWrapper) implemented by the class.
+    Raises:
+        ValueError: If the class does not implement any of them.
+    """
+    for interface in INTERFACES:
+        if issubclass(wrapper_class, interface):
+            return interface
+    raise ValueError(f"{wrapper_class.__name__} does not implement any of {[i.__name__ for i in INTERFACES]}")
+
+
+def interface_methods(interface: type) -> list[str]:
+    return [name for name, _ in inspect.getmembers(interface, inspect.isfunction) if not name.startswith("_")]
+
+
+class FixtureStore:
+    """
+    JSON file with the recorded responses of a wrapper: `directory`/<wrapper name>.json.
+    Responses are grouped by method and by arguments (normalized with the signature of the interface,
+    so that positional and keyword arguments match): {method: {arguments: [{"result": ...} | {"error": ...}]}}.
+    Results are serialized and validated with the return types of the interface methods.
+    """
+
+    def __init__(self, directory: str, wrapper_name: str, interface: type):
+        """
+        Args:
+            directory (str): The directory of the fixtures.
+            wrapper_name (str): The name of the wrapper (e.g. 'BinanceWrapper').
+            interface (type): The interface implemented by the wrapper.
+        """
+        self.path = os.path.join(directory, f"{wrapper_name}.json")
+        self.interface = interface
+        self.lock = threading.Lock()
+        self.positions: dict[tuple[str, str], int] = {}
+        self.recordings: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                self.recordings = json.load(file)
+
+    def key(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        """
+        Returns the key of the arguments of a call, with the defaults of the interface applied.
+        """
+        bound = inspect.signature(getattr(self.interface, method)).bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = {name: value for name, value in bound.arguments.items() if name != "self"}
+        return json.dumps(arguments, sort_keys=True, default=str)
+
+    def record(self, method: str, key: str, result: Any = None, error: Exception | None = None) -> None:
+        """
+        Adds a response (or the error raised) to the fixtures and saves them.
+        """
+        entry = {"error": f"{type(error).__name__}: {error}"} if error is not None else {"result": self.__adapter(method).dump_python(result, mode="json")}
+        with self.lock:
+            entries = self.recordings.setdefault(method, {}).setdefault(key, [])
+            entries.append(entry)
+            del entries[:-MAX_RECORDINGS_PER_CALL]
+            self.__save()
+
+    def replay(self, method: str, key: str) -> Any:
+        """
+        Returns the next recorded response of the call, cycling through them in order.
+        Raises:
+            LookupError: If the call was never recorded.
+            Exception: The recorded error, if the call failed when it was recorded.
+        """
+        with self.lock:
+            entries = self.recordings.get(method, {}).get(key)
+            if not entries:
+                raise LookupError(f"No recorded response for {method}({key}) in {self.path}")
+            position = self.positions.get((method, key), 0)
+            self.positions[(method, key)] = position + 1
+            entry = entries[position % len(entries)]
+        if "error" in entry:
+            raise Exception(f"Recorded error: {entry['error']}")
+        return self.__adapter(method).validate_python(entry["result"])
+
+    def __adapter(self, method: str) -> TypeAdapter[Any]:
+        return TypeAdapter(get_type_hints(getattr(self.interface, method))["return"])
+
+    def __save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.recordings, file, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+class RecordingWrapper:
+    """
+    Forwards the calls to a real wrapper and records their responses (and errors) in a FixtureStore.
+    """
+
+    def __init__(self, wrapper: Any, store: FixtureStore):
+        self.wrapper = wrapper
+        self.store = store
+        for method in interface_methods(store.interface):
+            setattr(self, method, self.__recorder(method))
+
+    def __recorder(self, method: str) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            key = self.store.key(method, args, kwargs)
+            try:
+                result = getattr(self.wrapper, method)(*args, **kwargs)
+            except Exception as e:
+                self.store.record(method, key, error=e)
+                raise
+            self.store.record(method, key, result=result)
+            return result
+        return call
+
+
+class ReplayWrapper:
+    """
+    Answers the calls with the responses recorded in a FixtureStore, without using the network,
+    adding the synthetic latency and the failures of its ReplayProfile.
+    The random generator is seeded, so every handler built with the same configuration sees the same latencies and failures.
+    """
+
+    def __init__(self, store: FixtureStore, profile: ReplayProfile, seed: int | str = 0):
+        self.store = store
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        for method in interface_methods(store.interface):
+            setattr(self, method, self.__replayer(method))
+
+    def __replayer(self, method: str) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            key = self.store.key(method, args, kwargs)
+            with self.random_lock:
+                latency = max(0.0, self.profile.latency_ms + self.random.uniform(-1, 1) * self.profile.jitter_ms) / 1000
+                failing = self.random.random() < self.profile.failure_rate
+            if latency > 0:
+                current_deadline().sleep(latency)
+            if failing:
+                raise InjectedFailure(f"Injected failure of {self.__class__.__name__}.{method}")
+            return self.store.replay(method, key)
+        return call
+
+
+@lru_cache(maxsize=None)
+def get_fixture_store(directory: str, wrapper_name: str, interface: type) -> FixtureStore:
+    """
+    Returns the FixtureStore of the wrapper, shared by all the handlers (the tools are built at every run).
+    """
+    return FixtureStore(directory, wrapper_name, interface)
+
+
+def replay_wrapper(wrapper_class: type, config: ReplayConfig) -> Any:
+    """
+    Builds a ReplayWrapper for the class, without instantiating it (so no API key or network is needed).
+    Its class has the same name of the replaced wrapper, so that providers filters and results are unchanged.
+    """
+    name = wrapper_class.__name__
+    store = get_fixture_store(config.directory, name, interface_of(wrapper_class))
+    replay_class = type(name, (ReplayWrapper,), {})
+    return replay_class(store, config.providers.get(name, config.default), seed=f"{config.seed}:{name}")
+
+
+def recording_wrapper(wrapper: Any, config: ReplayConfig) -> Any:
+    """
+    Wraps a real wrapper so that its responses are recorded, keeping the name of its class.
+    """
+    name = wrapper.__class__.__name__
+    store = get_fixture_store(config.directory, name, interface_of(wrapper.__class__))
+    recording_class = type(name, (RecordingWrapper,), {})
+    return recording_class(wrapper, store)
@@ -1,94 +1,179 @@
+import os
 import re
 import html
+import json
+import time
+import logging
+import threading
 import requests
-import warnings
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 from datetime import datetime
+from typing import Any
+from app.api.core.deadline import current_deadline
+from app.api.core.metrics import get_metrics
 from app.api.core.social import *
 
-# Ignora i warning di BeautifulSoup quando incontra HTML malformato o un link, mentre si aspetta un HTML completo
-warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+logging = logging.getLogger("chan_wrapper")
+
+CATALOG_URL = "https://a.4cdn.org/biz/catalog.json"
+
+CATALOG_CACHE_FILE = "resources/chan_catalog.json"
+"""File dove vengono salvati il catalogo, la sua data di modifica e i post già elaborati"""
+
+MIN_REFRESH_SECONDS = 10
+"""Secondi in cui il catalogo viene riusato senza richieste (le regole dell'API chiedono di non aggiornarlo più spesso)"""
+
+TAG_PATTERN = re.compile(r"<[^>]*>")
+"""Tag HTML (i commenti di 4chan contengono solo tag semplici come <br>, <wbr>, <a> e <span>)"""
+
+SLASHES_PATTERN = re.compile(r"[\\/]+")
+SPACES_PATTERN = re.compile(r"\s+")
 
 
 class ChanWrapper(SocialWrapper):
     """
     Wrapper per l'API di 4chan, in particolare per la board /biz/ (Business & Finance)
     Fonte API: https://a.4cdn.org/biz/catalog.json
+    Il catalogo e i post elaborati vengono tenuti in memoria e su disco:
+    entro MIN_REFRESH_SECONDS non viene fatta nessuna richiesta, dopo il catalogo viene rivalidato con If-Modified-Since
+    e, se non è cambiato (304), vengono restituiti i post già elaborati.
     """
-    def __init__(self):
+    def __init__(self, cache_path: str = CATALOG_CACHE_FILE):
         super().__init__()
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.catalog: list[dict[str, Any]] | None = None
+        self.last_modified: str | None = None
+        self.posts: dict[int, list[SocialPost]] = {}
+        self.checked_at = 0.0
+        self.__load_cache()
 
     def __time_str(self, timestamp: str) -> int:
         """Converte una stringa da MM/GG/AA(DAY)HH:MM:SS di 4chan a millisecondi"""
-        time = datetime.strptime(timestamp, "%m/%d/%y(%a)%H:%M:%S")
-        return int(time.timestamp() * 1000)
+        date = datetime.strptime(timestamp, "%m/%d/%y(%a)%H:%M:%S")
+        return int(date.timestamp() * 1000)
 
     def __unformat_html_str(self, html_element: str) -> str:
-        """Pulisce il commento rimuovendo HTML e formattazioni inutili"""
+        """
+        Pulisce il commento rimuovendo HTML e formattazioni inutili.
+        I tag vengono tolti in un solo passaggio (sostituiti da uno spazio) e solo dopo vengono decodificate le entità,
+        così il testo come '&gt;&gt;123' resta testo e non viene scambiato per un tag.
+        """
         if not html_element: return ""
 
-        html_entities = html.unescape(html_element)
-        soup = BeautifulSoup(html_entities, 'html.parser')
-        html_element = soup.get_text(separator=" ")
-        html_element = re.sub(r"[\\/]+", "/", html_element)
-        html_element = re.sub(r"\s+", " ", html_element).strip()
-        return html_element
+        text = html.unescape(TAG_PATTERN.sub(" ", html_element))
+        text = SLASHES_PATTERN.sub("/", text)
+        return SPACES_PATTERN.sub(" ", text).strip()
 
     def get_top_crypto_posts(self, limit: int = 5) -> list[SocialPost]:
-        url = 'https://a.4cdn.org/biz/catalog.json'
-        response = requests.get(url)
-        assert response.status_code == 200, f"Error in 4chan API request [{response.status_code}] {response.text}"
-
+        with self.lock:
+            if self.catalog is not None and time.monotonic() - self.checked_at < MIN_REFRESH_SECONDS:
+                get_metrics().cache("chan_catalog", hit=True)
+                return self.__cached_posts(limit)
+            headers = {'If-Modified-Since': self.last_modified} if self.catalog is not None and self.last_modified else {}
+
+        response = requests.get(CATALOG_URL, headers=headers, timeout=current_deadline().timeout())
+        get_metrics().cache("chan_catalog", hit=response.status_code == 304 and self.catalog is not None)
+        with self.lock:
+            if response.status_code == 304 and self.catalog is not None:
+                self.checked_at = time.monotonic()
+                return self.__cached_posts(limit)
+
+            assert response.status_code == 200, f"Error in 4chan API request [{response.status_code}] {response.text}"
+            self.catalog = response.json()
+            self.last_modified = response.headers.get('Last-Modified')
+            self.posts = {}
+            self.checked_at = time.monotonic()
+            return self.__cached_posts(limit)
+
+    def __cached_posts(self, limit: int) -> list[SocialPost]:
+        """Restituisce i post del catalogo corrente, elaborandoli solo la prima volta per ogni `limit`"""
+        if limit not in self.posts:
+            self.posts[limit] = self.__parse_catalog(self.catalog or [], limit)
+            self.__save_cache()
+        return [post.model_copy(deep=True) for post in self.posts[limit]]
+
+    def __load_cache(self) -> None:
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.catalog = data['catalog']
+            self.last_modified = data.get('last_modified')
+            self.posts = {int(limit): [SocialPost.model_validate(p) for p in posts] for limit, posts in data.get('posts', {}).items()}
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring the invalid 4chan cache {self.cache_path}: {e}")
+
+    def __save_cache(self) -> None:
+        data = {
+            'last_modified': self.last_modified,
+            'catalog': self.catalog,
+            'posts': {str(limit): [post.model_dump() for post in posts] for limit, posts in self.posts.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            temp = self.cache_path + ".tmp"
+            with open(temp, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Cannot save the 4chan cache {self.cache_path}: {e}")
+
+    def __parse_catalog(self, catalog: list[dict[str, Any]], limit: int) -> list[SocialPost]:
+        """Converte i primi `limit` thread non fissati del catalogo in SocialPost"""
         social_posts: list[SocialPost] = []
 
         # Questa lista contiene un dizionario per ogni pagina della board di questo tipo {"page": page_number, "threads": [{thread_data}]}
-        for page in response.json():
-            for thread in page['threads']:
+        # Vengono elaborati solo i thread necessari: ci si ferma appena si hanno `limit` post
+        threads = (thread for page in catalog for thread in page['threads'])
+        for thread in threads:
+            if len(social_posts) >= limit:
+                break
 
-                # ci indica se il thread è stato fissato o meno, se non è presente vuol dire che non è stato fissato, i thread sticky possono essere ignorati
-                if 'sticky' in thread:
-                    continue
+            # ci indica se il thread è stato fissato o meno, se non è presente vuol dire che non è stato fissato, i thread sticky possono essere ignorati
+            if 'sticky' in thread:
+                continue
 
-                # la data di creazione del thread tipo "MM/GG/AA(day)hh:mm:ss", ci interessa solo MM/GG/AA
-                time = self.__time_str(thread.get('now', ''))
+            # la data di creazione del thread tipo "MM/GG/AA(day)hh:mm:ss", ci interessa solo MM/GG/AA
+            thread_time = self.__time_str(thread.get('now', ''))
 
-                # il nome dell'utente
-                name: str = thread.get('name', 'Anonymous')
+            # il nome dell'utente
+            name: str = thread.get('name', 'Anonymous')
 
-                # il nome del thread, può contenere anche elementi di formattazione html che saranno da ignorare, potrebbe non essere presente
-                title = self.__unformat_html_str(thread.get('sub', ''))
-                title = f"{name} posted: {title}"
+            # il nome del thread, può contenere anche elementi di formattazione html che saranno da ignorare, potrebbe non essere presente
+            title = self.__unformat_html_str(thread.get('sub', ''))
+            title = f"{name} posted: {title}"
 
-                # il commento del thread, può contenere anche elementi di formattazione html che saranno da ignorare
-                thread_description = self.__unformat_html_str(thread.get('com', ''))
-                if not thread_description:
-                    continue
+            # il commento del thread, può contenere anche elementi di formattazione html che saranno da ignorare
+            thread_description = self.__unformat_html_str(thread.get('com', ''))
+            if not thread_description:
+                continue
 
-                # una lista di dizionari conteneti le risposte al thread principale, sono strutturate similarmente al thread
-                response_list = thread.get('last_replies', [])
-                comments_list: list[SocialComment] = []
+            # una lista di dizionari conteneti le risposte al thread principale, sono strutturate similarmente al thread
+            response_list = thread.get('last_replies', [])
+            comments_list: list[SocialComment] = []
 
-                for i, response in enumerate(response_list):
-                    if i >= MAX_COMMENTS: break
+            for i, response in enumerate(response_list):
+                if i >= MAX_COMMENTS: break
 
-                    # la data di creazione della risposta tipo "MM/GG/AA(day)hh:mm:ss", ci interessa solo MM/GG/AA
-                    time = self.__time_str(response['now'])
+                # la data di creazione della risposta tipo "MM/GG/AA(day)hh:mm:ss", ci interessa solo MM/GG/AA
+                reply_time = self.__time_str(response['now'])
 
-                    # il commento della risposta, può contenere anche elementi di formattazione html che saranno da ignorare
-                    comment = self.__unformat_html_str(response.get('com', ''))
-                    if not comment:
-                        continue
+                # il commento della risposta, può contenere anche elementi di formattazione html che saranno da ignorare
+                comment = self.__unformat_html_str(response.get('com', ''))
+                if not comment:
+                    continue
 
-                    social_comment = SocialComment(description=comment)
-                    social_comment.set_timestamp(timestamp_ms=time)
-                    comments_list.append(social_comment)
+                social_comment = SocialComment(description=comment)
+                social_comment.set_timestamp(timestamp_ms=reply_time)
+                comments_list.append(social_comment)
 
-                social_post: SocialPost = SocialPost(
-                    title=title,
-                    description=thread_description,
-                    comments=comments_list
-                )
-                social_post.set_timestamp(timestamp_ms=time)
-                social_posts.append(social_post)
+            social_post: SocialPost = SocialPost(
+                title=title,
+                description=thread_description,
+                comments=comments_list
+            )
+            social_post.set_timestamp(timestamp_ms=thread_time)
+            social_posts.append(social_post)
 
-        return social_posts[:limit]
+        return social_posts
@@ -1,6 +1,13 @@
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
 from praw import Reddit # type: ignore
-from praw.models import Submission # type: ignore
+from praw.models import MoreComments, Submission # type: ignore
+from prawcore import Requestor # type: ignore
+from app.api.core.deadline import current_deadline
 from app.api.core.social import *
 
 
@@ -20,22 +27,83 @@ SUBREDDITS = [
     "btc" # alt subs of Bitcoin
 ]
 
+MAX_CONCURRENT_COMMENT_FETCHES = 8
+"""Maximum number of comment trees requested at the same time"""
+
 
 def extract_post(post: Submission) -> SocialPost:
     social = SocialPost()
     social.set_timestamp(timestamp_s=post.created)
     social.title = post.title
     social.description = post.selftext
+    return social
 
+def extract_comments(post: Submission) -> list[SocialComment]:
+    # Only the best MAX_COMMENTS comments are requested, and the "load more" placeholders are skipped
+    # instead of being expanded with other requests (like replace_more(limit=0))
+    post.comment_sort = "top"
+    post.comment_limit = MAX_COMMENTS
+    comments: list[SocialComment] = []
     for top_comment in post.comments:
+        if isinstance(top_comment, MoreComments):
+            continue
         comment = SocialComment()
         comment.set_timestamp(timestamp_s=top_comment.created)
         comment.description = top_comment.body
-        social.comments.append(comment)
+        comments.append(comment)
 
-        if len(social.comments) >= MAX_COMMENTS:
+        if len(comments) >= MAX_COMMENTS:
             break
-    return social
+    return comments
+
+class DeadlineRequestor(Requestor):
+    """
+    Requestor of PRAW whose requests use the timeout of the current run's deadline (api.request_timeout_seconds).
+    PRAW passes its own fixed timeout to every request, so it is replaced here.
+    """
+
+    def request(self, *args: Any, timeout: float | None = None, **kwargs: Any) -> Any:
+        return super().request(*args, timeout=current_deadline().timeout(), **kwargs)
+
+
+class RedditClients:
+    """
+    Pool of PRAW clients. PRAW is not thread-safe, so each client is used by one thread at a time:
+    the clients are created when needed (at most `size`) and reused by the following calls, keeping their session.
+    """
+
+    def __init__(self, factory: Callable[[], Reddit], size: int, clients: list[Reddit] | None = None):
+        """
+        Args:
+            factory (Callable[[], Reddit]): Creates a new client.
+            size (int): The maximum number of clients.
+            clients (list[Reddit] | None): Clients already created, added to the pool.
+        """
+        self.factory = factory
+        self.size = size
+        self.created = len(clients or [])
+        self.idle: queue.Queue[Reddit] = queue.Queue()
+        for client in clients or []:
+            self.idle.put(client)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def client(self) -> Iterator[Reddit]:
+        """
+        Borrows a client for the current thread, waiting for one to be returned if all of them are in use.
+        """
+        try:
+            client = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                self.created += create
+            client = self.factory() if create else self.idle.get()
+        try:
+            yield client
+        finally:
+            self.idle.put(client)
+
 
 class RedditWrapper(SocialWrapper):
     """
@@ -45,6 +113,10 @@ class RedditWrapper(SocialWrapper):
     - REDDIT_API_CLIENT_SECRET
 
     You can get them by creating an app at https://www.reddit.com/prefs/apps
+
+    Each post needs its own request for the comments: they are fetched concurrently (at most MAX_CONCURRENT_COMMENT_FETCHES
+    at a time), each one with its own client from a RedditClients pool, since PRAW clients cannot be shared between threads
+    (the wrapper itself is shared with the prefetch thread).
     """
 
     def __init__(self):
@@ -54,14 +126,32 @@ class RedditWrapper(SocialWrapper):
         client_secret = os.getenv("REDDIT_API_CLIENT_SECRET")
         assert client_secret, "REDDIT_API_CLIENT_SECRET environment variable is not set"
 
-        self.tool = Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.tool = self.new_client()
+        self.clients = RedditClients(self.new_client, MAX_CONCURRENT_COMMENT_FETCHES, [self.tool])
+
+    def new_client(self) -> Reddit:
+        return Reddit(
+            client_id=self.client_id,
+            client_secret=self.client_secret,
             user_agent="upo-appAI",
             check_for_async=False,
+            requestor_class=DeadlineRequestor,
         )
-        self.subreddits = self.tool.subreddit("+".join(SUBREDDITS))
 
     def get_top_crypto_posts(self, limit: int = 5) -> list[SocialPost]:
-        top_posts = self.subreddits.top(limit=limit, time_filter="week")
-        return [extract_post(post) for post in top_posts]
+        with self.clients.client() as reddit:
+            top_posts = list(reddit.subreddit("+".join(SUBREDDITS)).top(limit=limit, time_filter="week"))
+            posts = [extract_post(post) for post in top_posts]
+        if not top_posts:
+            return posts
+
+        with ThreadPoolExecutor(max_workers=min(len(top_posts), MAX_CONCURRENT_COMMENT_FETCHES)) as executor:
+            for post, comments in zip(posts, executor.map(self.__get_comments, [post.id for post in top_posts])):
+                post.comments = comments
+        return posts
+
+    def __get_comments(self, post_id: str) -> list[SocialComment]:
+        with self.clients.client() as reddit:
+            return extract_comments(reddit.submission(id=post_id))
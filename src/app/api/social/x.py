@@ -1,10 +1,20 @@
 import os
 import json
-import subprocess
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from shutil import which
 from datetime import datetime
+from typing import Any
+from app.api.core.caching import get_cache_policy
+from app.api.core.deadline import current_deadline
+from app.api.core.metrics import get_metrics
 from app.api.core.social import SocialWrapper, SocialPost
 
+logging = logging.getLogger("x_wrapper")
+
 
 # This is the list of users that can be interesting
 # To get the ID of a new user is necessary to search it on X, copy the url and insert it in a service like "https://get-id-x.foundtt.com/en/"
@@ -15,6 +25,12 @@ X_USERS = [
     'elonmusk'
 ]
 
+MAX_CONCURRENT_PROCESSES = 4
+"""Maximum number of rettiwt processes running at the same time"""
+
+USER_CACHE_TTL_SECONDS = 120
+"""Seconds during which the tweets of a user are reused without starting a new process, or longer with the prefetch (see CachePolicy)"""
+
 class XWrapper(SocialWrapper):
     def __init__(self):
         '''
@@ -27,22 +43,84 @@ class XWrapper(SocialWrapper):
         assert self.api_key, "X_API_KEY environment variable not set"
         assert which('rettiwt') is not None, "Command `rettiwt` not installed"
 
+        self.cache: dict[tuple[str, int], tuple[float, list[dict[str, Any]]]] = {}
+        self.lock = threading.Lock()
 
     def get_top_crypto_posts(self, limit:int = 5) -> list[SocialPost]:
-        posts: list[SocialPost] = []
+        timeout = current_deadline().timeout()
+        tweets_by_user = self.__run(self.__fetch_all(limit, timeout))
 
+        posts: list[SocialPost] = []
         for user in X_USERS:
-            cmd = ['rettiwt', '-k', self.api_key, 'tweet', 'search', str(limit), '-f', str(user)]
-            process = subprocess.run(cmd, capture_output=True)
-            results = process.stdout.decode()
-            json_result = json.loads(results)
-
-            for tweet in json_result.get('list', []):
-                time = datetime.fromisoformat(tweet['createdAt'])
+            for tweet in tweets_by_user.get(user, []):
+                created_at = datetime.fromisoformat(tweet['createdAt'])
                 social_post = SocialPost()
-                social_post.set_timestamp(timestamp_s=int(time.timestamp()))
+                social_post.set_timestamp(timestamp_s=int(created_at.timestamp()))
                 social_post.title = f"{user} tweeted: "
                 social_post.description = tweet['fullText']
                 posts.append(social_post)
 
         return posts
+
+    async def __fetch_all(self, limit: int, timeout: float) -> dict[str, list[dict[str, Any]]]:
+        """
+        Fetches the tweets of all the users, starting the rettiwt processes concurrently (at most MAX_CONCURRENT_PROCESSES).
+        The users whose tweets are cached are not fetched again. A failed user is logged and skipped,
+        unless all the users fail.
+        """
+        tweets_by_user: dict[str, list[dict[str, Any]]] = {}
+        for user in X_USERS:
+            tweets = self.__cached(user, limit)
+            get_metrics().cache("x_user_posts", hit=tweets is not None)
+            if tweets is not None:
+                tweets_by_user[user] = tweets
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROCESSES)
+        users = [user for user in X_USERS if user not in tweets_by_user]
+        results = await asyncio.gather(*(self.__fetch_user(user, limit, timeout, semaphore) for user in users), return_exceptions=True)
+
+        errors: list[BaseException] = []
+        for user, result in zip(users, results):
+            if isinstance(result, BaseException):
+                logging.warning(f"Cannot fetch the tweets of {user}: {result}")
+                errors.append(result)
+            else:
+                with self.lock:
+                    self.cache[(user, limit)] = (time.monotonic(), result)
+                tweets_by_user[user] = result
+        if users and len(errors) == len(users):
+            raise errors[0]
+
+        return {user: tweets_by_user[user] for user in X_USERS if user in tweets_by_user}
+
+    async def __fetch_user(self, user: str, limit: int, timeout: float, semaphore: asyncio.Semaphore) -> list[dict[str, Any]]:
+        cmd = ['rettiwt', '-k', str(self.api_key), 'tweet', 'search', str(limit), '-f', str(user)]
+        async with semaphore:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise TimeoutError(f"rettiwt did not answer in {timeout:.1f}s")
+
+        json_result = json.loads(stdout.decode())
+        return json_result.get('list', [])
+
+    def __cached(self, user: str, limit: int) -> list[dict[str, Any]] | None:
+        with self.lock:
+            entry = self.cache.get((user, limit))
+        fresh = entry is not None and time.monotonic() - entry[0] <= get_cache_policy().ttl(USER_CACHE_TTL_SECONDS)
+        return entry[1] if entry is not None and fresh else None
+
+    @staticmethod
+    def __run(coroutine: Any) -> Any:
+        """
+        Runs the coroutine to completion, also when called from a thread that already runs an event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
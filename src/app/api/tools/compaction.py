@@ -0,0 +1,266 @@
+import json
+import logging
+import re
+import statistics
+from typing import Any, Callable
+from pydantic import BaseModel
+from app.api.core.markets import Price
+from app.api.core.news import Article
+from app.api.core.social import SocialPost, SocialComment
+
+logging = logging.getLogger("compaction")
+
+
+
+class PriceSummary(BaseModel):
+    """
+    Compact representation of a price series.
+    Replaces the full list of Price objects with summary statistics and a few sampled points.
+    """
+    points: int = 0
+    start: str = ""
+    end: str = ""
+    open: float = 0.0
+    close: float = 0.0
+    high: float = 0.0
+    low: float = 0.0
+    change_pct: float = 0.0
+    """Percentage change from the first open to the last close"""
+    volatility_pct: float = 0.0
+    """Standard deviation of the close-to-close returns, in percentage"""
+    avg_volume: float = 0.0
+    samples: list[Price] = []
+    """Evenly spaced points of the series, always including the last one"""
+
+    @staticmethod
+    def from_prices(prices: list[Price], samples: int = 12) -> 'PriceSummary':
+        """
+        Builds the summary of a price series.
+        Args:
+            prices (list[Price]): The price series, in any order.
+            samples (int): The maximum number of points to keep in the summary.
+        Returns:
+            PriceSummary: The summary of the series.
+        """
+        summary = PriceSummary()
+        if not prices:
+            return summary
+
+        prices = sorted(prices, key=lambda p: p.timestamp)
+        closes = [p.close for p in prices]
+        returns = [(curr - prev) / prev * 100 for prev, curr in zip(closes, closes[1:]) if prev]
+
+        summary.points = len(prices)
+        summary.start = prices[0].timestamp
+        summary.end = prices[-1].timestamp
+        summary.open = prices[0].open
+        summary.close = prices[-1].close
+        summary.high = max(p.high for p in prices)
+        summary.low = min(p.low for p in prices)
+        summary.change_pct = round((summary.close - summary.open) / summary.open * 100, 4) if summary.open else 0.0
+        summary.volatility_pct = round(statistics.pstdev(returns), 4) if len(returns) > 1 else 0.0
+        summary.avg_volume = statistics.mean(p.volume for p in prices)
+        summary.samples = downsample(prices, samples)
+        return summary
+
+
+def downsample(items: list[Any], size: int) -> list[Any]:
+    """
+    Keeps at most `size` evenly spaced items of the list, always including the last one.
+    Args:
+        items (list): The list to downsample.
+        size (int): The maximum number of items to keep.
+    Returns:
+        list: The downsampled list.
+    """
+    if size <= 0:
+        return []
+    if len(items) <= size:
+        return list(items)
+    if size == 1:
+        return [items[-1]]
+    step = (len(items) - 1) / (size - 1)
+    return [items[round(i * step)] for i in range(size)]
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """
+    Truncates the text to `max_chars` characters, adding an ellipsis if it was cut.
+    """
+    text = text.strip()
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+
+def title_key(title: str) -> str:
+    """
+    Normalizes an article title to detect duplicates: lowercase, only letters and digits separated by single spaces.
+    """
+    return re.sub(r"[^a-z0-9]+", " ", title.lower()).strip()
+
+
+def compact_articles(articles: list[Article], max_articles: int = 20, max_chars: int = 300) -> list[Article]:
+    """
+    Removes duplicated articles (same normalized title) and truncates their descriptions.
+    Args:
+        articles (list[Article]): The articles to compact.
+        max_articles (int): The maximum number of articles to return.
+        max_chars (int): The maximum length of each description.
+    Returns:
+        list[Article]: The compacted articles, in the original order.
+    """
+    seen: set[str] = set()
+    compacted: list[Article] = []
+    for article in articles:
+        key = title_key(article.title)
+        if key in seen:
+            continue
+        seen.add(key)
+        compacted.append(article.model_copy(update={"description": truncate(article.description, max_chars)}))
+        if len(compacted) >= max_articles:
+            break
+    return compacted
+
+
+def compact_posts(posts: list[SocialPost], max_chars: int = 300) -> list[SocialPost]:
+    """
+    Truncates the description and the comments of each post.
+    Args:
+        posts (list[SocialPost]): The posts to compact.
+        max_chars (int): The maximum length of each description and comment.
+    Returns:
+        list[SocialPost]: The compacted posts.
+    """
+    return [post.model_copy(update={
+        "description": truncate(post.description, max_chars),
+        "comments": [SocialComment(timestamp=c.timestamp, description=truncate(c.description, max_chars // 2)) for c in post.comments],
+    }) for post in posts]
+
+
+def is_feed(value: Any) -> bool:
+    """
+    Whether the value is a list of articles or posts, or a dict of such lists by provider.
+    These are the only outputs that can be cut to fit the token budget: the model only loses some items of a feed.
+    """
+    if isinstance(value, dict):
+        lists: list[Any] = list(value.values()) # type: ignore
+        return any(lists) and all(isinstance(v, list) and (not v or is_feed(v)) for v in lists) # type: ignore
+    return isinstance(value, list) and bool(value) and (
+        all(isinstance(a, Article) for a in value) or all(isinstance(p, SocialPost) for p in value)) # type: ignore
+
+
+def count_items(value: Any) -> int:
+    """
+    Returns the number of items of a feed (see is_feed).
+    """
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values()) # type: ignore
+    return len(value) # type: ignore
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Rough estimate of the tokens needed to serialize the value in the LLM context (about 4 chars per token).
+    """
+    text = json.dumps(value, default=lambda o: o.model_dump() if isinstance(o, BaseModel) else str(o))
+    return len(text) // 4
+
+
+class ToolOutputCompactor:
+    """
+    Compaction layer between the tools and agno.
+    It is used as an agno tool hook: every tool call goes through `hook`, and the result
+    is shrunk before being serialized into the LLM context:
+    - price series are replaced by a PriceSummary
+    - articles are deduplicated and truncated
+    - social posts and comments are truncated
+    - article and post feeds are trimmed until they fit the token budget, with a marker of the removed items
+    """
+
+    def __init__(self, token_budget: int = 2000, price_samples: int = 12, max_articles: int = 20, max_chars: int = 300):
+        """
+        Args:
+            token_budget (int): The maximum estimated tokens of each tool output.
+            price_samples (int): The number of points kept from a price series.
+            max_articles (int): The maximum number of articles returned by a news tool.
+            max_chars (int): The maximum length of descriptions of articles and posts.
+        """
+        self.token_budget = token_budget
+        self.price_samples = price_samples
+        self.max_articles = max_articles
+        self.max_chars = max_chars
+
+    def hook(self, function_name: str, function_call: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+        """
+        Agno tool hook that calls the tool and compacts its output.
+        """
+        result = function_call(**arguments)
+        before = estimate_tokens(result)
+        result = self.fit_budget(self.compact(result))
+        logging.debug(f"{function_name} output compacted from ~{before} to ~{estimate_tokens(result)} tokens")
+        return result
+
+    def compact(self, result: Any) -> Any:
+        """
+        Compacts the result of a tool based on its type. Unknown types are returned as they are.
+        """
+        if isinstance(result, dict):
+            values: list[Any] = list(result.values()) # type: ignore
+            if values and all(isinstance(v, list) and all(isinstance(a, Article) for a in v) for v in values): # type: ignore
+                return self.compact_articles_by_provider(result) # type: ignore
+            return {key: self.compact(value) for key, value in result.items()} # type: ignore
+
+        if not isinstance(result, list) or not result:
+            return result
+
+        items: list[Any] = result # type: ignore
+        if all(isinstance(p, Price) for p in items):
+            return PriceSummary.from_prices(items, self.price_samples)
+        if all(isinstance(a, Article) for a in items):
+            return compact_articles(items, self.max_articles, self.max_chars)
+        if all(isinstance(p, SocialPost) for p in items):
+            return compact_posts(items, self.max_chars)
+        return result
+
+    def compact_articles_by_provider(self, articles: dict[str, list[Article]]) -> dict[str, list[Article]]:
+        """
+        Compacts the articles of multiple providers, removing also the duplicates across providers.
+        """
+        seen: set[str] = set()
+        compacted: dict[str, list[Article]] = {}
+        for provider, provider_articles in articles.items():
+            unique = [a for a in compact_articles(provider_articles, self.max_articles, self.max_chars) if title_key(a.title) not in seen]
+            seen.update(title_key(a.title) for a in unique)
+            compacted[provider] = unique
+        return compacted
+
+    def fit_budget(self, result: Any) -> Any:
+        """
+        Trims the result until its estimated size is within the token budget.
+        Price summaries lose samples (the number of points is kept).
+        Feeds of articles or posts (see is_feed) are cut from the end, evenly across providers, and returned as
+        {"result": <trimmed feed>, "truncated": <removed items>, "of": <total items>} so the model knows the data is partial.
+        Any other result is returned unchanged, since cutting it (e.g. a list of products or symbols) would silently lose data.
+        If the budget is 0 or less, the result is returned unchanged.
+        """
+        if self.token_budget <= 0 or estimate_tokens(result) <= self.token_budget:
+            return result
+
+        if isinstance(result, PriceSummary):
+            while result.samples and estimate_tokens(result) > self.token_budget:
+                result.samples = downsample(result.samples, len(result.samples) // 2)
+            return result
+
+        if not is_feed(result):
+            return result
+
+        total = count_items(result)
+        while estimate_tokens(result) > self.token_budget:
+            if isinstance(result, list) and len(result) > 1: # type: ignore
+                result = result[:len(result) // 2] # type: ignore
+            elif isinstance(result, dict) and any(len(v) > 1 for v in result.values()): # type: ignore
+                result = {k: v[:max(1, len(v) // 2)] for k, v in result.items()} # type: ignore
+            else:
+                break
+
+        kept = count_items(result)
+        return result if kept == total else {"result": result, "truncated": total - kept, "of": total}
@@ -1,18 +1,32 @@
+import threading
+import time
 from agno.tools import Toolkit
 
 from app.agents.action_registry import friendly_action
 from app.api.tools.instructions import MARKET_TOOL_INSTRUCTIONS
 from app.api.wrapper_handler import WrapperHandler
+from app.api.core.assets import get_asset_usage, resolve_base
+from app.api.core.caching import get_cache_policy
 from app.api.core.markets import MarketWrapper, Price, ProductInfo
+from app.api.core.metrics import get_metrics
 from app.api.markets import BinanceWrapper, CoinBaseWrapper, CryptoCompareWrapper, YFinanceWrapper
 from app.configs import AppConfig
 
+
+PRODUCT_CACHE_SECONDS = 60
+"""Seconds during which the product information of an asset is reused (shared by all the runs), or longer with the prefetch (see CachePolicy)"""
+
+PRODUCT_CACHE: dict[str, tuple[float, ProductInfo]] = {}
+PRODUCT_CACHE_LOCK = threading.Lock()
+
 class MarketAPIsTool(MarketWrapper, Toolkit):
     """
     Class that aggregates multiple market API wrappers and manages them using WrapperHandler.
     This class supports retrieving product information and historical prices.
     This class can also aggregate data from multiple sources to provide a more comprehensive view of the market.
     Providers can be configured in configs.yaml under api.market_providers.
+    The product information of the first available provider is cached for PRODUCT_CACHE_SECONDS,
+    and the requested assets are counted (see AssetUsage) so that the background prefetch can keep them warm.
     """
 
     def __init__(self):
@@ -26,7 +40,9 @@ class MarketAPIsTool(MarketWrapper, Toolkit):
             constructors=[BinanceWrapper, YFinanceWrapper, CoinBaseWrapper, CryptoCompareWrapper],
             filters=config.api.market_providers,
             try_per_wrapper=config.api.retry_attempts,
-            retry_delay=config.api.retry_delay_seconds
+            retry_delay=config.api.retry_delay_seconds,
+            shared=True,
+            replay=config.api.replay,
         )
 
         Toolkit.__init__( # type: ignore
@@ -57,7 +73,14 @@ class MarketAPIsTool(MarketWrapper, Toolkit):
         Returns:
             ProductInfo: An object containing the product information.
         """
-        return self.handler.try_call(lambda w: w.get_product(asset_id))
+        get_asset_usage().record([asset_id])
+        cached = self.__cached([asset_id])
+        if cached[0] is not None:
+            return cached[0]
+
+        product = self.handler.try_call(lambda w: w.get_product(asset_id))
+        self.__store([product])
+        return product
 
     @friendly_action("📦 Recupero i dati su più asset...")
     def get_products(self, asset_ids: list[str]) -> list[ProductInfo]:
@@ -72,9 +95,25 @@ class MarketAPIsTool(MarketWrapper, Toolkit):
             asset_ids (list[str]): The list of asset IDs to retrieve information for.
 
         Returns:
-            list[ProductInfo]: A list of objects containing product information.
+            list[ProductInfo]: A list of objects containing product information, in the same order as asset_ids.
         """
-        return self.handler.try_call(lambda w: w.get_products(asset_ids))
+        get_asset_usage().record(asset_ids)
+        cached = self.__cached(asset_ids)
+        missing = [asset_id for asset_id, product in zip(asset_ids, cached) if product is None]
+        if not missing:
+            return [product for product in cached if product is not None]
+
+        products = self.handler.try_call(lambda w: w.get_products(missing))
+        self.__store(products)
+
+        # The results are paired with the requested assets by position, so the input order is kept
+        fetched = {product.symbol.upper(): product for product in products}
+        ordered: list[ProductInfo] = []
+        for asset_id, product in zip(asset_ids, cached):
+            product = product or fetched.pop(resolve_base(asset_id), None)
+            if product is not None:
+                ordered.append(product)
+        return ordered + [product for product in products if product.symbol.upper() in fetched]
 
     @friendly_action("📊 Recupero i dati storici dei prezzi...")
     def get_historical_prices(self, asset_id: str, limit: int = 100) -> list[Price]:
@@ -136,3 +175,31 @@ class MarketAPIsTool(MarketWrapper, Toolkit):
         """
         all_prices = self.handler.try_call_all(lambda w: w.get_historical_prices(asset_id, limit))
         return Price.aggregate(all_prices)
+
+    def refresh_products(self, asset_ids: list[str]) -> list[ProductInfo]:
+        """
+        Fetches the product information of the assets from the first available provider and caches it,
+        without counting them as requested (used by the background prefetch).
+        """
+        products = self.handler.try_call(lambda w: w.get_products(asset_ids))
+        self.__store(products)
+        return products
+
+    @staticmethod
+    def __cached(asset_ids: list[str]) -> list[ProductInfo | None]:
+        now = time.monotonic()
+        with PRODUCT_CACHE_LOCK:
+            entries = [PRODUCT_CACHE.get(resolve_base(asset_id)) for asset_id in asset_ids]
+        ttl = get_cache_policy().ttl(PRODUCT_CACHE_SECONDS)
+        products = [entry[1] if entry and now - entry[0] < ttl else None for entry in entries]
+        for product in products:
+            get_metrics().cache("products", hit=product is not None)
+        return products
+
+    @staticmethod
+    def __store(products: list[ProductInfo]) -> None:
+        now = time.monotonic()
+        with PRODUCT_CACHE_LOCK:
+            for product in products:
+                if product.symbol:
+                    PRODUCT_CACHE[product.symbol.upper()] = (now, product)
@@ -3,7 +3,14 @@ from agno.tools import Toolkit
 from app.agents.action_registry import friendly_action
 from app.api.tools.instructions import NEWS_TOOL_INSTRUCTIONS
 from app.api.wrapper_handler import WrapperHandler
+from app.api.core.assets import get_asset_resolver, resolve_base
+from app.api.core.clustering import deduplicate_articles
+from app.api.core.metrics import get_metrics
 from app.api.core.news import NewsWrapper, Article
+from app.api.core.mentions import get_article_index
+from app.api.core.news_index import get_news_index
+from app.api.core.sentiment import AssetSentiment, aggregate_sentiment, annotate_articles
+from app.api.core.symbols import normalize_name
 from app.api.news import NewsApiWrapper, GoogleNewsWrapper, CryptoPanicWrapper, DuckDuckGoWrapper
 from app.configs import AppConfig
 
@@ -14,7 +21,14 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
     Providers can be configured in configs.yaml under api.news_providers.
 
     By default, it returns results from the first successful wrapper. 
-    Optionally, it can be configured to collect articles from all wrappers.
+    Optionally, it can be configured to collect articles from all wrappers:
+    in that case the same story reported by multiple providers is returned only once, with its source count.
+
+    Every article returned by the providers is stored in a local NewsIndex: a search repeated while
+    it is fresh (api.news_index_fresh_minutes) is answered locally without calling the providers.
+    Every returned article is annotated locally with its sentiment and the mentioned tickers,
+    and the sentiment can also be summarized per asset (bullish/bearish ratio).
+    The annotated articles are kept in a MentionIndex, to find the articles mentioning an asset without reading the others.
     If no wrapper succeeds, an exception is raised.
     """
 
@@ -29,8 +43,13 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
             constructors=[NewsApiWrapper, GoogleNewsWrapper, CryptoPanicWrapper, DuckDuckGoWrapper],
             filters=config.api.news_providers,
             try_per_wrapper=config.api.retry_attempts,
-            retry_delay=config.api.retry_delay_seconds
+            retry_delay=config.api.retry_delay_seconds,
+            shared=True,
+            replay=config.api.replay,
         )
+        self.fresh_seconds = config.api.news_index_fresh_minutes * 60
+        self.index = get_news_index(config.api.news_index_retention_hours * 3600)
+        self.mentions = get_article_index()
 
         Toolkit.__init__( # type: ignore
             self,
@@ -41,6 +60,8 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
                 self.get_latest_news,
                 self.get_top_headlines_aggregated,
                 self.get_latest_news_aggregated,
+                self.get_news_sentiment,
+                self.get_news_mentioning,
             ],
         )
 
@@ -59,7 +80,9 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
         Returns:
             list[Article]: A list of Article objects from the single successful provider.
         """
-        return self.handler.try_call(lambda w: w.get_top_headlines(limit))
+        articles = self.handler.try_call(lambda w: w.get_top_headlines(limit))
+        self.index.ingest(articles)
+        return self.__annotate(articles)
 
     @friendly_action("🔎 Cerco notizie recenti sull'argomento...")
     def get_latest_news(self, query: str, limit: int = 100) -> list[Article]:
@@ -68,6 +91,7 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
 
         This method sequentially queries multiple sources using the query
         and returns results from the first one that responds successfully.
+        If the same topic was searched recently, the results come from the local news index.
         Use this for a fast, specific search.
 
         Args:
@@ -77,7 +101,14 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
         Returns:
             list[Article]: A list of Article objects from the single successful provider.
         """
-        return self.handler.try_call(lambda w: w.get_latest_news(query, limit))
+        cached = self.__search_local(query, limit)
+        if cached is not None:
+            return self.__annotate(cached)
+
+        articles = self.handler.try_call(lambda w: w.get_latest_news(query, limit))
+        self.index.ingest(articles, query=query)
+        self.index.mark_fetched(query, limit)
+        return self.__annotate(articles)
 
     @friendly_action("🗞️ Raccolgo le notizie principali da tutte le fonti...")
     def get_top_headlines_aggregated(self, limit: int = 100) -> dict[str, list[Article]]:
@@ -86,6 +117,8 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
 
         This method queries all configured sources and returns a dictionary
         mapping each provider's name to its list of articles.
+        Near-duplicate articles (the same story from different providers) are returned once,
+        with `source_count` set to the number of providers/articles reporting it.
         Use this when you need a comprehensive report or to compare sources.
 
         Args:
@@ -97,7 +130,9 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
         Raises:
             Exception: If all providers fail to return results.
         """
-        return self.handler.try_call_all(lambda w: w.get_top_headlines(limit))
+        results = self.handler.try_call_all(lambda w: w.get_top_headlines(limit))
+        self.index.ingest_all(results)
+        return self.__annotate_all(deduplicate_articles(results))
 
     @friendly_action("📚 Raccolgo notizie specifiche da tutte le fonti...")
     def get_latest_news_aggregated(self, query: str, limit: int = 100) -> dict[str, list[Article]]:
@@ -106,6 +141,8 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
 
         This method queries all configured sources using the query and returns a dictionary
         mapping each provider's name to its list of articles.
+        Near-duplicate articles (the same story from different providers) are returned once,
+        with `source_count` set to the number of providers/articles reporting it.
         Use this when you need a comprehensive report or to compare sources.
 
         Args:
@@ -118,4 +155,78 @@ class NewsAPIsTool(NewsWrapper, Toolkit):
         Raises:
             Exception: If all providers fail to return results.
         """
-        return self.handler.try_call_all(lambda w: w.get_latest_news(query, limit))
+        results = self.handler.try_call_all(lambda w: w.get_latest_news(query, limit))
+        self.index.ingest_all(results, query)
+        self.index.mark_fetched(query, limit)
+        return self.__annotate_all(deduplicate_articles(results))
+
+    @friendly_action("📊 Misuro il sentiment delle notizie per ogni crypto...")
+    def get_news_sentiment(self, query: str = "crypto", limit: int = 50) -> list[AssetSentiment]:
+        """
+        Summarizes the sentiment of the news on a topic from *all available providers* for each mentioned crypto asset.
+
+        The articles are scored locally (lexicon-based, title and description) and grouped by the mentioned tickers;
+        the same story reported by multiple providers is counted once.
+        Use this instead of reading the articles when you only need how bullish or bearish the news are.
+
+        Args:
+            query (str): The search topic. Defaults to "crypto".
+            limit (int): The maximum number of articles to analyze *from each* provider. Defaults to 50.
+
+        Returns:
+            list[AssetSentiment]: For each mentioned asset (the most mentioned first): mentions, bullish, bearish
+            and neutral articles, bullish_ratio (bullish / (bullish + bearish)) and average_polarity (-1 to 1).
+
+        Raises:
+            Exception: If all providers fail to return results.
+        """
+        results = self.get_latest_news_aggregated(query, limit)
+        return aggregate_sentiment([article for articles in results.values() for article in articles])
+
+    def __search_local(self, query: str, limit: int) -> list[Article] | None:
+        """
+        Answers the query from the local index if it was fetched recently, or if the index already holds
+        at least `limit` matching articles ingested within the freshness window.
+        Returns None if the providers must be queried.
+        """
+        if self.fresh_seconds <= 0:
+            return None
+        if self.index.is_fresh(query, self.fresh_seconds, limit):
+            get_metrics().cache("news_index", hit=True)
+            return self.index.results(query, limit)
+        recent = self.index.search(query, limit, max_age_seconds=self.fresh_seconds)
+        get_metrics().cache("news_index", hit=len(recent) >= limit)
+        return recent if len(recent) >= limit else None
+
+    @friendly_action("🔍 Cerco le notizie che parlano della crypto...")
+    def get_news_mentioning(self, asset: str, hours: int = 24, limit: int = 10) -> list[Article]:
+        """
+        Retrieves the news articles that mention a specific crypto asset in the last hours.
+
+        The articles are looked up in a local index of the mentioned assets, filled by every news search;
+        if it holds fewer than `limit` articles, the asset is searched on the providers first.
+        Only the articles about the asset are returned.
+
+        Args:
+            asset (str): The asset, as a symbol or a name (e.g. "SOL" or "solana").
+            hours (int): How many hours to look back. Defaults to 24.
+            limit (int): The maximum number of articles to retrieve. Defaults to 10.
+
+        Returns:
+            list[Article]: The articles mentioning the asset, the newest first.
+        """
+        articles = self.mentions.mentions(asset, hours, limit)
+        if len(articles) < limit:
+            resolved = get_asset_resolver().resolve(asset)
+            self.get_latest_news(normalize_name(resolved.name) if resolved else resolve_base(asset), max(limit * 3, 30))
+            articles = self.mentions.mentions(asset, hours, limit)
+        return articles
+
+    def __annotate(self, articles: list[Article]) -> list[Article]:
+        self.mentions.add(annotate_articles(articles))
+        return articles
+
+    def __annotate_all(self, results: dict[str, list[Article]]) -> dict[str, list[Article]]:
+        for articles in results.values():
+            self.__annotate(articles)
+        return results
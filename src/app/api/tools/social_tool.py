@@ -1,13 +1,22 @@
+import time
 from agno.tools import Toolkit
 
 from app.agents.action_registry import friendly_action
 from app.api.tools.instructions import SOCIAL_TOOL_INSTRUCTIONS
 from app.api.wrapper_handler import WrapperHandler
+from app.api.core.mentions import get_post_index
+from app.api.core.sentiment import AssetSentiment, aggregate_sentiment, annotate_posts
 from app.api.core.social import SocialPost, SocialWrapper
 from app.api.social import *
 from app.configs import AppConfig
 
 
+MENTION_REFRESH_SECONDS = 600
+"""If no post was fetched in the last seconds, a mention search fetches the top posts of all the providers first"""
+
+MENTION_REFRESH_POSTS = 25
+"""Number of posts fetched from each provider when refreshing the mention index"""
+
 class SocialAPIsTool(SocialWrapper, Toolkit):
     """
     Aggregates multiple social media API wrappers and manages them using WrapperHandler.
@@ -16,6 +25,9 @@ class SocialAPIsTool(SocialWrapper, Toolkit):
 
     By default, it returns results from the first successful wrapper. 
     Optionally, it can be configured to collect posts from all wrappers.
+    Every post is annotated locally with its sentiment and the mentioned tickers,
+    and the sentiment can also be summarized per asset (bullish/bearish ratio).
+    The annotated posts are kept in a MentionIndex, to find the posts mentioning an asset without reading the others.
     If no wrapper succeeds, an exception is raised.
     """
 
@@ -30,8 +42,11 @@ class SocialAPIsTool(SocialWrapper, Toolkit):
             constructors=[RedditWrapper, XWrapper, ChanWrapper],
             filters=config.api.social_providers,
             try_per_wrapper=config.api.retry_attempts,
-            retry_delay=config.api.retry_delay_seconds
+            retry_delay=config.api.retry_delay_seconds,
+            shared=True,
+            replay=config.api.replay,
         )
+        self.mentions = get_post_index()
 
         Toolkit.__init__( # type: ignore
             self,
@@ -40,6 +55,8 @@ class SocialAPIsTool(SocialWrapper, Toolkit):
             tools=[
                 self.get_top_crypto_posts,
                 self.get_top_crypto_posts_aggregated,
+                self.get_social_sentiment,
+                self.get_posts_mentioning,
             ],
         )
 
@@ -58,7 +75,9 @@ class SocialAPIsTool(SocialWrapper, Toolkit):
         Returns:
             list[SocialPost]: A list of SocialPost objects from the single successful provider.
         """
-        return self.handler.try_call(lambda w: w.get_top_crypto_posts(limit))
+        posts = annotate_posts(self.handler.try_call(lambda w: w.get_top_crypto_posts(limit)))
+        self.mentions.add(posts)
+        return posts
 
     @friendly_action("🌐 Raccolgo i post da tutte le piattaforme social...")
     def get_top_crypto_posts_aggregated(self, limit_per_wrapper: int = 5) -> dict[str, list[SocialPost]]:
@@ -78,4 +97,50 @@ class SocialAPIsTool(SocialWrapper, Toolkit):
         Raises:
             Exception: If all providers fail to return results.
         """
-        return self.handler.try_call_all(lambda w: w.get_top_crypto_posts(limit_per_wrapper))
+        results = self.handler.try_call_all(lambda w: w.get_top_crypto_posts(limit_per_wrapper))
+        for posts in results.values():
+            self.mentions.add(annotate_posts(posts))
+        return results
+
+    @friendly_action("📊 Misuro il sentiment dei social per ogni crypto...")
+    def get_social_sentiment(self, limit_per_wrapper: int = 10) -> list[AssetSentiment]:
+        """
+        Summarizes the sentiment of the top posts of *all available providers* for each mentioned crypto asset.
+
+        The posts are scored locally (lexicon-based, comments included) and grouped by the mentioned tickers.
+        Use this instead of reading the posts when you only need how bullish or bearish the social media are.
+
+        Args:
+            limit_per_wrapper (int): The maximum number of posts to analyze *from each* provider. Defaults to 10.
+
+        Returns:
+            list[AssetSentiment]: For each mentioned asset (the most mentioned first): mentions, bullish, bearish
+            and neutral posts, bullish_ratio (bullish / (bullish + bearish)) and average_polarity (-1 to 1).
+
+        Raises:
+            Exception: If all providers fail to return results.
+        """
+        results = self.get_top_crypto_posts_aggregated(limit_per_wrapper)
+        return aggregate_sentiment([post for posts in results.values() for post in posts])
+
+
+    @friendly_action("🔍 Cerco i post che parlano della crypto...")
+    def get_posts_mentioning(self, asset: str, hours: int = 24, limit: int = 10) -> list[SocialPost]:
+        """
+        Retrieves the social media posts that mention a specific crypto asset in the last hours, from *all providers*.
+
+        The posts are looked up in a local index of the mentioned assets, refreshed with the top posts of all
+        providers when it is older than a few minutes, so only the posts about the asset are returned.
+        Use this instead of the top posts when the user asks about a specific asset.
+
+        Args:
+            asset (str): The asset, as a symbol or a name (e.g. "SOL" or "solana").
+            hours (int): How many hours to look back. Defaults to 24.
+            limit (int): The maximum number of posts to retrieve. Defaults to 10.
+
+        Returns:
+            list[SocialPost]: The posts mentioning the asset, the newest first. Empty if no recent post mentions it.
+        """
+        if time.time() - self.mentions.updated_at > MENTION_REFRESH_SECONDS:
+            self.get_top_crypto_posts_aggregated(MENTION_REFRESH_POSTS)
+        return self.mentions.mentions(asset, hours, limit)
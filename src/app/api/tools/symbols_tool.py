@@ -4,7 +4,12 @@ import asyncio
 import logging
 import pandas as pd
 from io import StringIO
+from typing import Literal
+from pydantic import BaseModel
 from agno.tools.toolkit import Toolkit
+from app.api.core.assets import CRYPTOS_FILE, get_asset_resolver, invalidate_asset_resolver
+from app.api.core.deadline import DEFAULT_REQUEST_TIMEOUT
+from app.api.core.symbols import SymbolIndex, load_table, parse_table, save_table
 from app.api.tools.instructions import SYMBOLS_TOOL_INSTRUCTIONS
 
 logging.basicConfig(level=logging.INFO)
@@ -13,15 +18,38 @@ logging = logging.getLogger("crypto_symbols")
 
 
 BASE_URL = "https://finance.yahoo.com/markets/crypto/all/"
+PAGE_SIZE = 250 # It looks like this is the max per page otherwise yahoo returns 26
+MAX_CONCURRENT_PAGES = 8
+MAX_SCREENER_ROWS = 50
+
+SCREENER_COLUMNS = {
+    "market_cap": "Market Cap",
+    "change_pct": "Change %",
+    "volume": "Volume",
+}
+
+
+class ScreenerRow(BaseModel):
+    """
+    Riga del risultato dello screener (dati dell'ultimo aggiornamento della cache).
+    """
+    symbol: str = ""
+    name: str = ""
+    price: float = 0.0
+    change_pct: float = 0.0
+    """Variazione percentuale nelle ultime 24h"""
+    market_cap: float = 0.0
+    volume_24h: float = 0.0
 
 class CryptoSymbolsTools(Toolkit):
     """
     Classe per ottenere i simboli delle criptovalute tramite Yahoo Finance.
     """
 
-    def __init__(self, cache_file: str = 'resources/cryptos.csv'):
+    def __init__(self, cache_file: str = CRYPTOS_FILE):
         self.cache_file = cache_file
-        self.final_table = pd.read_csv(self.cache_file) if os.path.exists(self.cache_file) else pd.DataFrame() # type: ignore
+        self.final_table = load_table(self.cache_file)
+        self.index = self.__get_index(self.final_table)
 
         Toolkit.__init__(self, # type: ignore
             name="Crypto Symbols Tool",
@@ -29,6 +57,8 @@ class CryptoSymbolsTools(Toolkit):
             tools=[
                 self.get_all_symbols,
                 self.get_symbols_by_name,
+                self.search_symbols,
+                self.get_top_cryptos,
             ],
         )
 
@@ -43,63 +73,175 @@ class CryptoSymbolsTools(Toolkit):
     def get_symbols_by_name(self, query: str) -> list[tuple[str, str]]:
         """
         Cerca i simboli che contengono la query.
+        I risultati esatti vengono prima, poi quelli che iniziano con la query e infine quelli che la contengono,
+        ognuno ordinato per capitalizzazione di mercato.
         Args:
             query (str): Query di ricerca.
         Returns:
             list[tuple[str, str]]: Lista di tuple (simbolo, nome) che contengono la query.
         """
-        query_lower = query.lower()
-        positions = self.final_table['Name'].str.lower().str.contains(query_lower)
-        return self.final_table[positions][['Symbol', 'Name']].apply(tuple, axis=1).tolist()
+        return self.index.items(self.index.search(query, fuzzy=False))
 
-    async def fetch_crypto_symbols(self, force_refresh: bool = False) -> None:
+    def search_symbols(self, query: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        Cerca i simboli per nome o simbolo, tollerando errori di battitura.
+        Come get_symbols_by_name, ma se i risultati sono meno di `limit` aggiunge quelli con nome simile.
+        Args:
+            query (str): Nome o simbolo da cercare (es. "bitcoin", "BTC", "etherum").
+            limit (int): Numero massimo di risultati.
+        Returns:
+            list[tuple[str, str]]: Lista di tuple (simbolo, nome) ordinate per rilevanza e capitalizzazione.
+        """
+        return self.index.items(self.index.search(query, limit=limit))
+
+    def get_top_cryptos(
+        self,
+        sort_by: Literal["market_cap", "change_pct", "volume"] = "market_cap",
+        limit: int = 10,
+        ascending: bool = False,
+        min_market_cap: float = 0.0,
+        min_volume: float = 0.0,
+    ) -> list[ScreenerRow]:
+        """
+        Screener delle criptovalute: restituisce le prime `limit` ordinate per capitalizzazione, variazione 24h o volume.
+        L'ordinamento e i filtri vengono fatti sulla tabella in cache, quindi non servono altre chiamate per i prezzi.
+        Esempi: maggiori capitalizzazioni (sort_by="market_cap"), top gainers (sort_by="change_pct"),
+        top losers (sort_by="change_pct", ascending=True), più scambiate (sort_by="volume").
+        Args:
+            sort_by (str): Colonna di ordinamento: "market_cap", "change_pct" o "volume".
+            limit (int): Numero di risultati (massimo 50).
+            ascending (bool): Se True restituisce i valori più bassi (es. top losers).
+            min_market_cap (float): Capitalizzazione minima in USD, utile per escludere le crypto più piccole e volatili.
+            min_volume (float): Volume minimo nelle 24h in USD.
+        Returns:
+            list[ScreenerRow]: Le crypto selezionate, nell'ordine richiesto.
+        """
+        table = self.final_table
+        if table.empty or sort_by not in SCREENER_COLUMNS:
+            return []
+
+        mask = (table['Market Cap'] >= min_market_cap) & (table['Volume'] >= min_volume) # type: ignore
+        selected = table[mask]
+        limit = max(1, min(limit, MAX_SCREENER_ROWS))
+        column = SCREENER_COLUMNS[sort_by]
+        top = selected.nsmallest(limit, column) if ascending else selected.nlargest(limit, column) # type: ignore
+
+        return [
+            ScreenerRow(symbol=symbol, name=name, price=price, change_pct=change, market_cap=cap, volume_24h=volume)
+            for symbol, name, price, change, cap, volume in zip(
+                top['Symbol'], top['Name'], top['Price'], top['Change %'], top['Market Cap'], top['Volume']
+            )
+        ]
+
+    async def fetch_crypto_symbols(self, force_refresh: bool = False, max_pages: int | None = None) -> None:
         """
         Recupera tutti i simboli delle criptovalute da Yahoo Finance e li memorizza in cache.
+        Le pagine vengono scaricate in parallelo (al massimo MAX_CONCURRENT_PAGES alla volta) con un unico client
+        e la tabella viene costruita una sola volta alla fine.
         Args:
             force_refresh (bool): Se True, forza il recupero anche se i dati sono già in cache.
+            max_pages (int | None): Numero massimo di pagine da scaricare (le prime sono le crypto con capitalizzazione maggiore).
+                Se la cache non è vuota, le righe scaricate sostituiscono quelle in cache e le altre restano invariate,
+                così si possono aggiornare solo gli asset principali scaricando poche pagine.
         """
         if not force_refresh and not self.final_table.empty:
             return
 
-        num_currencies = 250 # It looks like this is the max per page otherwise yahoo returns 26
-        offset = 0
-        stop = not self.final_table.empty
-        table = self.final_table.copy()
+        async with httpx.AsyncClient(headers={"User-Agent": "Mozilla/5.0"}, timeout=DEFAULT_REQUEST_TIMEOUT) as client:
+            frames = await self.__fetch_pages(client, max_pages)
+        if not frames:
+            logging.warning("No crypto symbols fetched, keeping the cached table")
+            return
 
-        while not stop:
-            text = await self.___request(offset, num_currencies)
-            tables = pd.read_html(text) # type: ignore
-            df = tables[0]
-            df.columns = table.columns if not table.empty else df.columns
-            table = pd.concat([table, df], ignore_index=True)
+        for df in frames:
+            df.columns = frames[0].columns
+        table = pd.concat(frames, ignore_index=True)
+        table.dropna(axis=0, how='all', inplace=True) # type: ignore
+        table.drop_duplicates(subset='Symbol', keep='first', inplace=True) # type: ignore
+        table = parse_table(table)
 
-            total_rows = df.shape[0]
-            offset += total_rows
-            if total_rows < num_currencies:
-                stop = True
+        if max_pages is not None and not self.final_table.empty:
+            table = self.__merge_partial(self.final_table, table)
 
-        table.dropna(axis=0, how='all', inplace=True) # type: ignore
-        table.dropna(axis=1, how='all', inplace=True) # type: ignore
-        table.to_csv(self.cache_file, index=False)
+        save_table(table, self.cache_file)
+        invalidate_asset_resolver(self.cache_file)
         self.final_table = table
+        self.index = self.__get_index(table)
 
-    async def ___request(self, offset: int, num_currencies: int) -> StringIO:
+    async def __fetch_pages(self, client: httpx.AsyncClient, max_pages: int | None) -> list[pd.DataFrame]:
+        """
+        Scarica le pagine a blocchi paralleli finché non trova una pagina incompleta (l'ultima).
+        Il primo blocco è stimato dalla dimensione della cache, così un aggiornamento richiede un solo blocco.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+        frames: list[pd.DataFrame] = []
+        page = 0
+        batch = max(MAX_CONCURRENT_PAGES, len(self.final_table) // PAGE_SIZE + 1)
+
+        while max_pages is None or page < max_pages:
+            batch = batch if max_pages is None else min(batch, max_pages - page)
+            pages = await asyncio.gather(*[
+                self.__fetch_page(client, semaphore, (page + i) * PAGE_SIZE) for i in range(batch)
+            ])
+            for df in pages:
+                if df is None:
+                    logging.error("Refresh of crypto symbols aborted, a page could not be fetched")
+                    return []
+                if df.empty: return frames
+                frames.append(df)
+                if df.shape[0] < PAGE_SIZE: return frames
+            page += batch
+            batch = MAX_CONCURRENT_PAGES
+        return frames
+
+    async def __fetch_page(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, offset: int) -> pd.DataFrame | None:
+        """
+        Scarica e legge una pagina. Restituisce un DataFrame vuoto se la pagina è oltre l'ultima e None in caso di errore.
+        """
+        async with semaphore:
+            text = await self.___request(client, offset, PAGE_SIZE)
+        if not text.getvalue():
+            return None
+        try:
+            return pd.read_html(text)[0] # type: ignore
+        except ValueError: # No tables found, the offset is past the last page
+            return pd.DataFrame()
+
+    @staticmethod
+    def __merge_partial(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+        """
+        Unisce le prime pagine appena scaricate con la tabella in cache: le righe scaricate sostituiscono
+        quelle con lo stesso simbolo, le altre restano quelle in cache.
+        """
+        rest = cached[~cached['Symbol'].isin(fresh['Symbol'])] # type: ignore
+        return pd.concat([fresh, rest], ignore_index=True)
+
+    def __get_index(self, table: pd.DataFrame) -> SymbolIndex:
+        """
+        Restituisce l'indice della tabella: per la cache condivisa è quello dell'AssetResolver,
+        costruito una sola volta per processo invece che a ogni creazione del tool.
+        """
+        if os.path.abspath(self.cache_file) == os.path.abspath(CRYPTOS_FILE):
+            return get_asset_resolver().index
+        if table.empty:
+            return SymbolIndex([], [], [])
+        return SymbolIndex(table['Symbol'], table['Name'], table['Market Cap'])
+
+    async def ___request(self, client: httpx.AsyncClient, offset: int, num_currencies: int) -> StringIO:
         while True:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(f"{BASE_URL}?start={offset}&count={num_currencies}", headers={"User-Agent": "Mozilla/5.0"})
-                if resp.status_code == 429: # Too many requests
-                    secs = int(resp.headers.get("Retry-After", 2))
-                    logging.warning(f"Rate limit exceeded, waiting {secs}s before retrying...")
-                    await asyncio.sleep(secs)
-                    continue
-                if resp.status_code != 200:
-                    logging.error(f"Error fetching crypto symbols: [{resp.status_code}] {resp.text}")
-                    break
-                return StringIO(resp.text)
+            resp = await client.get(f"{BASE_URL}?start={offset}&count={num_currencies}")
+            if resp.status_code == 429: # Too many requests
+                secs = int(resp.headers.get("Retry-After", 2))
+                logging.warning(f"Rate limit exceeded, waiting {secs}s before retrying...")
+                await asyncio.sleep(secs)
+                continue
+            if resp.status_code != 200:
+                logging.error(f"Error fetching crypto symbols: [{resp.status_code}] {resp.text}")
+                break
+            return StringIO(resp.text)
         return StringIO("")
 
 
-
 if __name__ == "__main__":
     crypto_symbols = CryptoSymbolsTools()
     asyncio.run(crypto_symbols.fetch_crypto_symbols(force_refresh=True))
@@ -1,8 +1,13 @@
 import inspect
 import logging
-import time
+import threading
 import traceback
-from typing import Any, Callable, Generic, TypeVar
+from typing import Any, Callable, ClassVar, Generic, TypeVar
+from app.api.core.deadline import DeadlineExceeded, current_deadline
+from app.api.core.metrics import get_metrics
+from app.api.core.tracing import span
+from app.api.replay import recording_wrapper, replay_wrapper
+from app.configs import ReplayConfig
 
 logging = logging.getLogger("wrapper_handler")
 WrapperType = TypeVar("WrapperType")
@@ -16,10 +21,16 @@ class WrapperHandler(Generic[WrapperType]):
     It attempts to call a function on the current wrapper, and if it fails,
     it retries a specified number of times before switching to the next wrapper.
     If all wrappers fail, it raises an exception.
+    The latency and the outcome of every attempt are recorded in the shared metrics, by wrapper,
+    and as a span of the trace of the current run (if any).
 
     Note: use `build_wrappers` to create an instance of this class for better error handling.
     """
 
+    shared_wrappers: ClassVar[dict[tuple[type, str], Any]] = {}
+    """Wrapper instances shared by all the handlers built with `shared=True`, by class and kwargs"""
+    shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(self, wrappers: list[WrapperType], try_per_wrapper: int = 3, retry_delay: int = 2):
         """
         Initializes the WrapperHandler with a list of wrappers and retry settings.\n
@@ -85,11 +96,14 @@ class WrapperHandler(Generic[WrapperType]):
             dict[str, T]: A dictionary mapping wrapper class names to results.
         Raises:
             Exception: If all wrappers fail after retries.
+            DeadlineExceeded: If the current run is cancelled or its deadline expires.
         """
 
         logging.debug(f"{inspect.getsource(func).strip()} {inspect.getclosurevars(func).nonlocals}")
         results: dict[str, OutputType] = {}
         starting_index = self.index
+        deadline = current_deadline()
+        metrics = get_metrics()
 
         for i in range(starting_index, len(self.wrappers) + starting_index):
             self.index = i % len(self.wrappers)
@@ -100,16 +114,23 @@ class WrapperHandler(Generic[WrapperType]):
                 logging.debug(f"try_call {wrapper_name}")
 
             for try_count in range(1, self.retry_per_wrapper + 1):
+                deadline.check()
                 try:
-                    result = func(wrapper)
+                    with (
+                        metrics.timed("wrapper_call_seconds", errors="wrapper_errors_total", wrapper=wrapper_name),
+                        span(wrapper_name, "provider", wrapper=wrapper_name, attempt=try_count),
+                    ):
+                        result = func(wrapper)
                     logging.debug(f"{wrapper_name} succeeded")
                     results[wrapper_name] = result
                     break
 
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
                     error = WrapperHandler.__concise_error(e)
                     logging.warning(f"{wrapper_name} failed {try_count}/{self.retry_per_wrapper}: {error}")
-                    time.sleep(self.retry_delay)
+                    deadline.sleep(self.retry_delay)
 
             if not try_all and results:
                 return results
@@ -121,6 +142,14 @@ class WrapperHandler(Generic[WrapperType]):
         self.index = starting_index
         return results
 
+    @staticmethod
+    def __shared(wrapper_class: type[WrapperClassType], kwargs: dict[str, Any] | None) -> WrapperClassType:
+        key = (wrapper_class, repr(sorted((kwargs or {}).items())))
+        with WrapperHandler.shared_lock:
+            if key not in WrapperHandler.shared_wrappers:
+                WrapperHandler.shared_wrappers[key] = wrapper_class(**(kwargs or {}))
+            return WrapperHandler.shared_wrappers[key]
+
     @staticmethod
     def __check(wrappers: list[Any]) -> bool:
         return all(w.__class__ is type for w in wrappers)
@@ -136,7 +165,9 @@ class WrapperHandler(Generic[WrapperType]):
         filters: list[str] | None = None,
         try_per_wrapper: int = 3,
         retry_delay: int = 2,
-        kwargs: dict[str, Any] | None = None) -> 'WrapperHandler[WrapperClassType]':
+        kwargs: dict[str, Any] | None = None,
+        shared: bool = False,
+        replay: ReplayConfig | None = None) -> 'WrapperHandler[WrapperClassType]':
         """
         Builds a WrapperHandler instance with the given wrapper constructors.
         It attempts to initialize each wrapper and logs a warning if any cannot be initialized.
@@ -147,12 +178,18 @@ class WrapperHandler(Generic[WrapperType]):
             try_per_wrapper (int): Number of retries per wrapper before switching to the next.
             retry_delay (int): Delay in seconds between retries.
             kwargs (dict | None): Optional dictionary with keyword arguments common to all wrappers.
+            shared (bool): If True, each wrapper is created once per process and reused by all the shared handlers,
+                so that its caches and clients survive between runs (and can be warmed in background).
+            replay (ReplayConfig | None): Optional record/replay configuration. In 'record' mode the responses of the wrappers
+                are saved as fixtures, in 'replay' mode the wrappers are not created and the fixtures are used instead.
         Returns:
             WrapperHandler[W]: An instance of WrapperHandler with the initialized wrappers.
         Raises:
             Exception: If no wrappers could be initialized.
         """
         assert WrapperHandler.__check(constructors), f"All constructors must be classes. Received: {constructors}"
+        mode = replay.mode if replay else "live"
+        assert mode in ("live", "record", "replay"), f"Unknown replay mode '{mode}'"
 
         # Order of wrappers is now determined by the order in filters
         if filters:
@@ -161,8 +198,11 @@ class WrapperHandler(Generic[WrapperType]):
         result: list[WrapperClassType] = []
         for wrapper_class in constructors:
             try:
-                wrapper = wrapper_class(**(kwargs or {}))
-                result.append(wrapper)
+                if replay and mode == "replay":
+                    result.append(replay_wrapper(wrapper_class, replay))
+                    continue
+                wrapper = WrapperHandler.__shared(wrapper_class, kwargs) if shared else wrapper_class(**(kwargs or {}))
+                result.append(recording_wrapper(wrapper, replay) if replay and mode == "record" else wrapper)
             except Exception as e:
                 logging.warning(f"'{wrapper_class.__name__}' cannot be initialized: {e}")
 
@@ -3,7 +3,7 @@ import threading
 import ollama
 import yaml
 import logging.config
-from typing import Any, ClassVar
+from typing import Any, Callable, ClassVar
 from pydantic import BaseModel
 from agno.agent import Agent
 from agno.tools import Toolkit
@@ -38,7 +38,7 @@ class AppModel(BaseModel):
             raise ValueError(f"Model class for '{self.name}' is not set.")
         return self.model(id=self.name, instructions=[instructions])
 
-    def get_agent(self, instructions: str, name: str = "", output_schema: type[BaseModel] | None = None, tools: list[Toolkit] | None = None) -> Agent:
+    def get_agent(self, instructions: str, name: str = "", output_schema: type[BaseModel] | None = None, tools: list[Toolkit] | None = None, tool_hooks: list[Callable[..., Any]] | None = None) -> Agent:
         """
         Costruisce un agente con il modello e le istruzioni specificate.
         Args:
@@ -46,6 +46,7 @@ class AppModel(BaseModel):
             name: nome dell'agente (opzionale)
             output: schema di output opzionale (Pydantic BaseModel)
             tools: lista opzionale di strumenti (tools) da fornire all'agente
+            tool_hooks: lista opzionale di hook eseguiti attorno ad ogni chiamata dei tools
         Returns:
              Un'istanza di Agent.
         """
@@ -54,19 +55,60 @@ class AppModel(BaseModel):
             name=name,
             retries=2,
             tools=tools,
+            tool_hooks=tool_hooks,
             delay_between_retries=5, # seconds
             output_schema=output_schema
         )
 
 
 
+class ReplayProfile(BaseModel):
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+
+
+class ReplayConfig(BaseModel):
+    mode: str = "live"
+    directory: str = "tests/fixtures/replay"
+    seed: int = 42
+    default: ReplayProfile = ReplayProfile()
+    providers: dict[str, ReplayProfile] = {}
+
+
 class APIConfig(BaseModel):
     retry_attempts: int = 3
     retry_delay_seconds: int = 2
+    request_timeout_seconds: int = 20
+    tool_token_budget: int = 2000
+    news_index_fresh_minutes: int = 15
+    news_index_retention_hours: int = 48
     market_providers: list[str] = []
     news_providers: list[str] = []
     social_providers: list[str] = []
+    replay: ReplayConfig = ReplayConfig()
+
+
+
+class SchedulerConfig(BaseModel):
+    max_concurrent_runs: int = 2
+    max_queued_runs: int = 10
+
+
+class PrefetchConfig(BaseModel):
+    enabled: bool = False
+    interval_minutes: int = 10
+    top_assets: int = 10
+    news_limit: int = 20
+    social_limit: int = 10
+    max_requests_per_hour: int = 180
+    min_request_interval_seconds: float = 2.0
+
 
+class TracingConfig(BaseModel):
+    enabled: bool = False
+    directory: str = "traces"
+    format: str = "chrome"
 
 
 class Strategy(BaseModel):
@@ -148,6 +190,10 @@ class AgentsConfigs(BaseModel):
     team_leader_model: str = "gemini-2.0-flash"
     query_analyzer_model: str = "gemini-2.0-flash"
     report_generation_model: str = "gemini-2.0-flash"
+    parallel_members: bool = False
+    members_timeout_seconds: int = 180
+    run_timeout_seconds: int = 600
+    stage_timeouts: dict[str, int] = {}
 
     def validate_defaults(self, configs: 'AppConfig') -> None:
         """
@@ -176,6 +222,9 @@ class AppConfig(BaseModel):
     gradio_share: bool = False
     logging_level: str = "INFO"
     api: APIConfig = APIConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    prefetch: PrefetchConfig = PrefetchConfig()
+    tracing: TracingConfig = TracingConfig()
     strategies: list[Strategy] = [Strategy()]
     models: ModelsConfig = ModelsConfig()
     agents: AgentsConfigs = AgentsConfigs()
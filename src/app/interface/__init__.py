@@ -1,4 +1,5 @@
 from app.interface.chat import ChatManager
+from app.interface.metrics import mount_metrics
 from app.interface.telegram import TelegramApp
 
-__all__ = ["ChatManager", "TelegramApp"]
+__all__ = ["ChatManager", "TelegramApp", "mount_metrics"]
@@ -5,6 +5,7 @@ from typing import Any, Callable
 import gradio as gr
 from app.agents.action_registry import get_user_friendly_action
 from app.agents.pipeline import Pipeline, PipelineEvent, PipelineInputs
+from app.agents.scheduler import RunRejected, RunScheduler
 
 
 class ChatManager:
@@ -15,9 +16,14 @@ class ChatManager:
     - salva e ricarica le chat
     """
 
-    def __init__(self):
+    def __init__(self, scheduler: RunScheduler | None = None):
+        """
+        Args:
+            scheduler: scheduler delle run, da condividere con le altre interfacce (opzionale)
+        """
         self.history: list[tuple[str, str]] = []  
         self.inputs = PipelineInputs()
+        self.scheduler = scheduler or RunScheduler()
 
     def save_chat(self, filename: str = "chat.json") -> None:
         """
@@ -52,14 +58,16 @@ class ChatManager:
     ########################################
     # Funzioni Gradio
     ########################################
-    async def gradio_respond(self, message: str, history: list[tuple[str, str]]):
+    async def gradio_respond(self, message: str, history: list[tuple[str, str]], request: gr.Request):
         """
         Versione asincrona in streaming.
-        Produce (yield) aggiornamenti di stato e la risposta finale.
+        Produce (yield) aggiornamenti di stato, il report parziale token per token e la risposta finale.
+        Ogni chunk sostituisce il messaggio precedente, quindi il report viene mostrato man mano che viene scritto.
         """
         self.inputs.user_query = message
         pipeline = Pipeline(self.inputs)
         listeners: list[tuple[PipelineEvent, Callable[[Any], str | None]]] = [ # type: ignore
+            (PipelineEvent.QUEUED, lambda e: f"⏳ Richiesta in coda, posizione {e.position}..."),
             (PipelineEvent.QUERY_CHECK, lambda _: "🔍 Sto controllando la tua richiesta..."),
             (PipelineEvent.INFO_RECOVERY, lambda _: "📊 Sto recuperando i dati (mercato, news, social)..."),
             (PipelineEvent.REPORT_GENERATION, lambda _: "✍️ Sto scrivendo il report finale..."),
@@ -67,9 +75,13 @@ class ChatManager:
         ]
 
         response = None
-        async for chunk in pipeline.interact_stream(listeners=listeners):
-            response = chunk  # Salva l'ultimo chunk (che sarà la risposta finale)
-            yield response  # Restituisce l'aggiornamento (o la risposta finale) a Gradio
+        try:
+            async for chunk in self.scheduler.run_stream(pipeline, user=f"gradio:{request.session_hash}", listeners=listeners):
+                response = chunk  # Salva l'ultimo chunk (che sarà la risposta finale)
+                yield response  # Restituisce l'aggiornamento (o la risposta finale) a Gradio
+        except RunRejected as e:
+            yield f"⚠️ {e}"
+            return
 
         # Dopo che il generatore è completo, salva l'ultima risposta nello storico
         if response:
@@ -0,0 +1,29 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.core.metrics import get_metrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def mount_metrics(app: FastAPI, path: str = "/metrics") -> None:
+    """
+    Aggiunge al server FastAPI (es. quello restituito da Gradio) gli endpoint delle metriche:
+    - `path`: tutte le metriche nel formato testuale di Prometheus
+    - `path`/snapshot: le stesse metriche in JSON, con i percentili stimati delle latenze
+    Le route vengono inserite in testa, così non vengono coperte da quelle già registrate.
+    Args:
+        app: l'applicazione FastAPI a cui aggiungere gli endpoint
+        path: il percorso delle metriche
+    """
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(get_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    def snapshot() -> JSONResponse:
+        return JSONResponse(get_metrics().snapshot())
+
+    before = len(app.router.routes)
+    app.add_api_route(path, metrics, methods=["GET"], include_in_schema=False)
+    app.add_api_route(f"{path}/snapshot", snapshot, methods=["GET"], include_in_schema=False)
+    added = app.router.routes[before:]
+    del app.router.routes[before:]
+    app.router.routes[0:0] = added
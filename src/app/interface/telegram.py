@@ -2,6 +2,7 @@ import asyncio
 import io
 import os
 import json
+import time
 from typing import Any
 import httpx
 import logging
@@ -10,8 +11,9 @@ from enum import Enum
 from markdown_pdf import MarkdownPdf, Section
 from telegram import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, Update, User
 from telegram.constants import ChatAction
-from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes, ConversationHandler, MessageHandler, filters
+from telegram.ext import Application, ApplicationHandlerStop, CallbackQueryHandler, CommandHandler, ContextTypes, ConversationHandler, MessageHandler, filters
 from app.agents.pipeline import Pipeline, PipelineEvent, PipelineInputs, RunMessage
+from app.agents.scheduler import RunRejected, RunScheduler
 
 # per per_message di ConversationHandler che rompe sempre qualunque input tu metta
 warnings.filterwarnings("ignore")
@@ -38,6 +40,10 @@ CONFIGS, SELECT_MODEL, SELECT_CONFIG = range(3)
 # Usato per separare la query arrivata da Telegram
 QUERY_SEP = "|==|"
 
+# Anteprima del report durante la generazione: secondi minimi tra due modifiche e caratteri mostrati (max Telegram 4096)
+PREVIEW_EDIT_INTERVAL = 1.5
+PREVIEW_MAX_CHARS = 4000
+
 class ConfigsChat(Enum):
     MODEL_CHECK = "Check Model"
     MODEL_TEAM_LEADER = "Team Leader Model"
@@ -63,11 +69,13 @@ class ConfigsChat(Enum):
 
 
 class TelegramApp:
-    def __init__(self):
+    def __init__(self, scheduler: RunScheduler | None = None):
         token = os.getenv("TELEGRAM_BOT_TOKEN")
         assert token, "TELEGRAM_BOT_TOKEN environment variable not set"
 
         self.user_requests: dict[User, PipelineInputs] = {}
+        self.user_runs: dict[User, Pipeline] = {}
+        self.scheduler = scheduler or RunScheduler()
         self.token = token
         self.create_bot()
 
@@ -90,6 +98,7 @@ class TelegramApp:
         app = Application.builder().token(self.token).build()
 
         app.add_error_handler(self.__error_handler)
+        app.add_handler(CommandHandler('cancel', self.__cancel_run), group=-1) # prima della conversazione, la blocca
         app.add_handler(ConversationHandler(
             per_message=False, # capire a cosa serve perchè da un warning quando parte il server
             entry_points=[CommandHandler('start', self.__start)],
@@ -98,7 +107,7 @@ class TelegramApp:
                     CallbackQueryHandler(self.__models, pattern=ConfigsChat.CHANGE_MODELS.name),
                     CallbackQueryHandler(self.__strategy, pattern=ConfigsChat.STRATEGY.name),
                     CallbackQueryHandler(self.__cancel, pattern='^CANCEL$'),
-                    MessageHandler(filters.TEXT, self.__start_llms)  # Any text message
+                    MessageHandler(filters.TEXT, self.__start_llms, block=False)  # Any text message, non blocca gli altri update (es. /cancel)
                 ],
                 SELECT_MODEL: [
                     CallbackQueryHandler(self.__model_select, pattern=ConfigsChat.MODEL_CHECK.name),
@@ -190,6 +199,17 @@ class TelegramApp:
         await query.edit_message_text("Conversation canceled. Use /start to begin again.")
         return ConversationHandler.END
 
+    async def __cancel_run(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        message, user = self.handle_message(update)
+        pipeline = self.user_runs.get(user)
+        if pipeline is None:
+            await message.reply_text("No analysis is running.")
+        else:
+            logging.info(f"@{user.username} canceled the running analysis.")
+            pipeline.cancel()
+            await message.reply_text("Analysis canceled.")
+        raise ApplicationHandlerStop # non deve arrivare alla conversazione come query
+
     ##########################################
     # Configurazioni
     ##########################################
@@ -247,7 +267,12 @@ class TelegramApp:
         confs.user_query = message.text or ""
 
         logging.info(f"@{user.username} started the team with [{confs.query_analyzer_model.label}, {confs.team_model.label}, {confs.team_leader_model.label}, {confs.report_generation_model.label}, {confs.strategy.label}]")
-        await self.__run(update, confs)
+        pipeline = Pipeline(confs)
+        self.user_runs[user] = pipeline
+        try:
+            await self.__run(update, user, pipeline)
+        finally:
+            self.user_runs.pop(user, None)
 
         logging.info(f"@{user.username} team finished.")
         return ConversationHandler.END
@@ -256,8 +281,9 @@ class TelegramApp:
     ##########################################
     # RUN APP
     ##########################################
-    async def __run(self, update: Update, inputs: PipelineInputs) -> None:
+    async def __run(self, update: Update, user: User, pipeline: Pipeline) -> None:
         if not update.message: return
+        inputs = pipeline.inputs
 
         bot = update.get_bot()
         msg_id = update.message.message_id - 1
@@ -279,13 +305,46 @@ class TelegramApp:
                 asyncio.create_task(msg.edit_text(message, parse_mode='MarkdownV2'))
 
         await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-        pipeline = Pipeline(inputs)
-        report_content = await pipeline.interact(listeners=[
+        report_content = ""
+        preview: Message | None = None
+        last_edit = 0.0
+
+        def update_queue(position: int) -> None:
+            asyncio.create_task(msg.edit_text(f"⏳ Richiesta in coda, posizione {position}..."))
+
+        # I listeners non restituiscono nulla, quindi lo stream contiene solo il report (parziale e finale)
+        stream = self.scheduler.run_stream(pipeline, user=f"telegram:{user.id}", listeners=[
+            (PipelineEvent.QUEUED, lambda e: update_queue(e.position)),
             (PipelineEvent.QUERY_CHECK_END, lambda _: update_user()),
             (PipelineEvent.TOOL_USED_END, lambda e: update_user(e.tool.tool_name.replace('get_', '').replace("_", "\\_"))),
             (PipelineEvent.INFO_RECOVERY_END, lambda _: update_user()),
             (PipelineEvent.REPORT_GENERATION_END, lambda _: update_user()),
         ])
+        try:
+            async for report_content in stream:
+                # Anteprima del report con modifiche limitate per non superare i rate limit di Telegram
+                now = time.monotonic()
+                if now - last_edit < PREVIEW_EDIT_INTERVAL: continue
+                last_edit = now
+
+                text = report_content[-PREVIEW_MAX_CHARS:]
+                if preview is None:
+                    preview = await msg.reply_text(text)
+                elif preview.text != text:
+                    edited = await preview.edit_text(text)
+                    if isinstance(edited, Message): preview = edited
+        except RunRejected as e:
+            await msg.edit_text(f"⚠️ {e}")
+            return
+
+        if preview is not None:
+            await preview.delete()
+        if pipeline.cancelled:
+            return
+        if pipeline.timed_out:
+            # Nessun report da allegare: l'ultimo messaggio dello stream spiega il motivo
+            await msg.reply_text(report_content)
+            return
 
         # attach report file to the message
         pdf = MarkdownPdf(toc_level=2, optimize=True)
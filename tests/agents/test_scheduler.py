@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from app.agents.pipeline import PipelineEvent
+from app.agents.scheduler import RunRejected, RunScheduler
+
+
+class FakePipeline:
+    def __init__(self, name: str, release: asyncio.Event):
+        self.name = name
+        self.release = release
+        self.cancelled = False
+
+    async def interact_stream(self, listeners=[]): # type: ignore
+        await self.release.wait()
+        yield self.name
+
+
+async def collect(scheduler: RunScheduler, pipeline: FakePipeline, user: str, priority: int = 0) -> list[str]:
+    listeners = [(PipelineEvent.QUEUED, lambda e: f"queued {e.position}")]
+    return [chunk async for chunk in scheduler.run_stream(pipeline, user, listeners, priority)] # type: ignore
+
+
+class TestRunScheduler:
+
+    def test_limits_concurrency(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent_runs=1, max_queued_runs=5)
+            release = asyncio.Event()
+            first = asyncio.create_task(collect(scheduler, FakePipeline("a", release), "u1"))
+            second = asyncio.create_task(collect(scheduler, FakePipeline("b", release), "u2"))
+            await asyncio.sleep(0.05)
+            assert scheduler.status() == {"running": 1, "queued": 1}
+
+            release.set()
+            results = await asyncio.gather(first, second)
+            assert scheduler.status() == {"running": 0, "queued": 0}
+            return results
+
+        first, second = asyncio.run(run())
+        assert first == ["a"]
+        assert second == ["queued 1", "b"]
+
+    def test_rejects_second_run_of_same_user(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent_runs=2, max_queued_runs=5)
+            release = asyncio.Event()
+            first = asyncio.create_task(collect(scheduler, FakePipeline("a", release), "u1"))
+            await asyncio.sleep(0.05)
+            with pytest.raises(RunRejected):
+                await collect(scheduler, FakePipeline("b", release), "u1")
+            release.set()
+            await first
+            assert await collect(scheduler, FakePipeline("c", release), "u1") == ["c"]
+
+        asyncio.run(run())
+
+    def test_rejects_when_queue_full(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent_runs=1, max_queued_runs=1)
+            release = asyncio.Event()
+            tasks = [asyncio.create_task(collect(scheduler, FakePipeline(n, release), n)) for n in ("a", "b")]
+            await asyncio.sleep(0.05)
+            with pytest.raises(RunRejected):
+                await collect(scheduler, FakePipeline("c", release), "c")
+            release.set()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+    def test_priority_and_positions(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent_runs=1, max_queued_runs=5)
+            order: list[str] = []
+            release = asyncio.Event()
+
+            async def tracked(name: str, priority: int) -> list[str]:
+                chunks = await collect(scheduler, FakePipeline(name, release), name, priority)
+                order.append(name)
+                return chunks
+
+            running = asyncio.create_task(tracked("a", 0))
+            await asyncio.sleep(0.05)
+            low = asyncio.create_task(tracked("low", 5))
+            await asyncio.sleep(0.05)
+            high = asyncio.create_task(tracked("high", 0))
+            await asyncio.sleep(0.05)
+
+            release.set()
+            await asyncio.gather(running, low, high)
+            return order, await low, await high
+
+        order, low, high = asyncio.run(run())
+        assert order == ["a", "high", "low"]
+        assert low[0] == "queued 1"
+        assert "queued 2" in low
+        assert high[0] == "queued 1"
+
+    def test_cancel_while_queued(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent_runs=1, max_queued_runs=5)
+            release = asyncio.Event()
+            first = asyncio.create_task(collect(scheduler, FakePipeline("a", release), "u1"))
+            await asyncio.sleep(0.05)
+            queued = FakePipeline("b", release)
+            second = asyncio.create_task(collect(scheduler, queued, "u2"))
+            await asyncio.sleep(0.05)
+            queued.cancelled = True
+            result = await second
+            assert scheduler.status() == {"running": 1, "queued": 0}
+            release.set()
+            await first
+            return result
+
+        result = asyncio.run(run())
+        assert result[0] == "queued 1"
+        assert result[-1] == "🛑 Esecuzione annullata."
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Any
+import pytest
+from agno.agent import Agent
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+from agno.team import Team
+from agno.tools import Toolkit
+from agno.utils.team import get_member_id
+from app.agents.core import with_tool_hooks
+from app.api.core.metrics import tool_metrics_hook
+from app.api.core.tracing import Trace, set_trace, team_tracing_hook, tool_tracing_hook
+from app.api.tools.compaction import ToolOutputCompactor
+
+
+class ScriptedModel(Model):
+    """Model that calls the given tools in order, then answers with the results of the calls"""
+
+    def __init__(self, calls: list[tuple[str, dict[str, Any]]]):
+        super().__init__(id="scripted", name="scripted", provider="test")
+        self.calls = calls
+
+    def __next(self, messages: list[Message]) -> ModelResponse:
+        results = [str(m.content) for m in messages if m.role == "tool"]
+        if len(results) >= len(self.calls):
+            return ModelResponse(role="assistant", content=" | ".join(results))
+        name, arguments = self.calls[len(results)]
+        return ModelResponse(role="assistant", tool_calls=[{
+            "id": f"call_{len(results)}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)},
+        }])
+
+    def invoke(self, messages: list[Message], **_: Any) -> ModelResponse: # type: ignore
+        return self.__next(messages)
+
+    async def ainvoke(self, messages: list[Message], **_: Any) -> ModelResponse: # type: ignore
+        return self.__next(messages)
+
+    def invoke_stream(self, messages: list[Message], **_: Any): # type: ignore
+        yield self.__next(messages)
+
+    async def ainvoke_stream(self, messages: list[Message], **_: Any): # type: ignore
+        yield self.__next(messages)
+
+    def _parse_provider_response(self, response: ModelResponse, **_: Any) -> ModelResponse: # type: ignore
+        return response
+
+    def _parse_provider_response_delta(self, response: ModelResponse) -> ModelResponse: # type: ignore
+        return response
+
+
+class PriceTool(Toolkit):
+    def __init__(self):
+        self.calls = 0
+        Toolkit.__init__(self, name="Prices", tools=[self.get_price]) # type: ignore
+
+    def get_price(self, asset: str) -> str:
+        """
+        Returns the price of the asset.
+        Args:
+            asset (str): The asset symbol.
+        """
+        self.calls += 1
+        return f"{asset} 100"
+
+
+@pytest.mark.tools
+class TestTeamToolHooks:
+
+    def team(self, member_tool: PriceTool, leader_tool: PriceTool) -> Team:
+        hooks = [tool_tracing_hook, tool_metrics_hook, ToolOutputCompactor().hook]
+        member = Agent(name="Market Agent", model=ScriptedModel([("get_price", {"asset": "BTC"})]), tools=[member_tool], tool_hooks=hooks)
+        return Team(
+            name="CryptoAnalysisTeam",
+            model=ScriptedModel([
+                ("get_price", {"asset": "ETH"}),
+                ("delegate_task_to_member", {"member_id": get_member_id(member), "task_description": "BTC price", "expected_output": "The price"}),
+            ]),
+            tools=with_tool_hooks([leader_tool], [team_tracing_hook("CryptoAnalysisTeam"), *hooks[1:]]),
+            members=[member],
+        )
+
+    def run(self, team: Team, trace: Trace | None = None) -> str:
+        async def run() -> str:
+            set_trace(trace)
+            content = ""
+            async for event in team.arun("BTC?", stream=True, stream_intermediate_steps=True): # type: ignore
+                if event.event == "TeamRunCompleted":
+                    content = str(event.content)
+            return content
+        return asyncio.run(run())
+
+    def test_delegation_with_hooks(self):
+        member_tool, leader_tool = PriceTool(), PriceTool()
+        team = self.team(member_tool, leader_tool)
+        content = self.run(team)
+        assert "coroutine" not in content
+        assert "ETH 100" in content and "BTC 100" in content
+        assert member_tool.calls == 1 and leader_tool.calls == 1
+        assert team.tool_hooks is None
+
+    def test_leader_tools_traced_as_team(self):
+        trace = Trace()
+        self.run(self.team(PriceTool(), PriceTool()), trace)
+        trace.finish()
+        spans = {s.span_id: s for s in trace.spans}
+        tools = [s for s in trace.spans if s.name == "get_price"]
+        assert sorted(spans[s.parent_id].name for s in tools) == ["CryptoAnalysisTeam", "Market Agent"] # type: ignore
+        assert "agent" not in [s.name for s in trace.spans]
@@ -0,0 +1,40 @@
+import pytest
+from app.agents.pipeline import ThinkFilter
+
+
+def feed_chunks(text: str, size: int) -> tuple[ThinkFilter, list[str]]:
+    think = ThinkFilter()
+    partials = [think.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    return think, partials
+
+
+class TestThinkFilter:
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+    def test_strip_think_block(self, size: int):
+        think, partials = feed_chunks("<think>reasoning about <b>btc</b></think>\n# Report\nBTC is up.", size)
+        assert think.result() == "# Report\nBTC is up."
+        assert all("reasoning" not in p and "<thi" not in p for p in partials)
+
+    @pytest.mark.parametrize("size", [1, 4, 1000])
+    def test_close_without_open(self, size: int):
+        think, _ = feed_chunks("hidden reasoning</think>Report", size)
+        assert think.result() == "Report"
+
+    @pytest.mark.parametrize("size", [1, 5, 1000])
+    def test_no_think(self, size: int):
+        think, partials = feed_chunks("Plain <b>report</b> text", size)
+        assert think.result() == "Plain <b>report</b> text"
+        assert partials[-1] == "Plain <b>report</b> text"
+
+    def test_partials_are_incremental(self):
+        think = ThinkFilter()
+        assert think.feed("<think>a") == ""
+        assert think.feed("b</thi") == ""
+        assert think.feed("nk>Hello") == "Hello"
+        assert think.feed(" <") == "Hello "
+        assert think.feed("3") == "Hello <3"
+
+    def test_unclosed_think(self):
+        think, _ = feed_chunks("Report<think>never closed", 3)
+        assert think.result() == "Report"
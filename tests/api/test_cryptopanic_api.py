@@ -1,6 +1,8 @@
 import os
+from typing import Any
 import pytest
 from app.api.news import CryptoPanicWrapper
+from app.api.news import cryptopanic_api
 
 
 @pytest.mark.limited
@@ -36,3 +38,71 @@ class TestCryptoPanicAPI:
     #         assert article.title is not None or article.title != ""
     #         assert article.description is not None or article.description != ""
 
+
+
+class FakeResponse:
+    def __init__(self, payload: dict[str, Any]):
+        self.status_code = 200
+        self.payload = payload
+
+    def json(self) -> dict[str, Any]:
+        return self.payload
+
+
+class FakeCryptoPanic:
+    def __init__(self, total: int, page_size: int = 3):
+        self.total = total
+        self.page_size = page_size
+        self.urls: list[str] = []
+
+    def get(self, url: str, params: dict[str, str], timeout: float) -> FakeResponse:
+        self.urls.append(url)
+        page = int(url.split("page=")[1]) if "page=" in url else 1
+        newest = self.total - (page - 1) * self.page_size
+        posts = [{"id": i, "published_at": f"2024-01-01T00:{i:02d}:00Z", "title": f"Post {i}"} for i in range(newest, max(0, newest - self.page_size), -1)]
+        next_url = f"https://fake/posts/?page={page + 1}" if newest - self.page_size > 0 else None
+        return FakeResponse({"results": posts, "next": next_url})
+
+
+@pytest.mark.news
+class TestCryptoPanicPolling:
+
+    def test_incremental_polling(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("CRYPTOPANIC_API_KEY", "fake")
+        server = FakeCryptoPanic(total=10)
+        monkeypatch.setattr(cryptopanic_api.requests, "get", server.get)
+        crypto = CryptoPanicWrapper()
+
+        articles = crypto.get_latest_news(query="BTC", limit=5)
+        assert [a.title for a in articles] == [f"Post {i}" for i in range(10, 5, -1)]
+        assert len(server.urls) == 2
+
+        articles = crypto.get_latest_news(query="btc", limit=3)
+        assert [a.title for a in articles] == ["Post 10", "Post 9", "Post 8"]
+        assert len(server.urls) == 2 # served from the cache
+
+        server.total = 12
+        monkeypatch.setattr(cryptopanic_api, "POLL_INTERVAL_SECONDS", -1)
+        articles = crypto.get_latest_news(query="BTC", limit=4)
+        assert [a.title for a in articles] == ["Post 12", "Post 11", "Post 10", "Post 9"]
+        assert len(server.urls) == 3 # the first page already reaches the posts seen
+
+    def test_larger_limit_backfills_older_posts(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("CRYPTOPANIC_API_KEY", "fake")
+        server = FakeCryptoPanic(total=10)
+        monkeypatch.setattr(cryptopanic_api.requests, "get", server.get)
+        crypto = CryptoPanicWrapper()
+
+        articles = crypto.get_latest_news(query="BTC", limit=2)
+        assert [a.title for a in articles] == ["Post 10", "Post 9"]
+        assert len(server.urls) == 1
+
+        articles = crypto.get_latest_news(query="BTC", limit=8)
+        assert [a.title for a in articles] == [f"Post {i}" for i in range(10, 2, -1)]
+        assert server.urls[1:] == ["https://fake/posts/?page=2", "https://fake/posts/?page=3"]
+
+        articles = crypto.get_latest_news(query="BTC", limit=20)
+        assert [a.title for a in articles] == [f"Post {i}" for i in range(10, 0, -1)]
+        assert len(server.urls) == 4
+        crypto.get_latest_news(query="BTC", limit=20)
+        assert len(server.urls) == 4 # no older pages left
@@ -1,4 +1,6 @@
+from typing import Any
 import pytest
+from gnews import GNews # type: ignore
 from app.api.news import GoogleNewsWrapper
 
 
@@ -32,3 +34,51 @@ class TestGoogleNews:
             assert article.title is not None or article.title != ""
             assert article.description is not None or article.description != ""
 
+
+
+def fake_top_news(calls: list[str]) -> Any:
+    def get_top_news(gnews: GNews) -> list[dict[str, Any]]:
+        calls.append("top")
+        return [{"title": f"Title {i}", "url": f"https://example.com/{i}"} for i in range(gnews.max_results)] # type: ignore
+    return get_top_news
+
+def fake_failing_news(calls: list[str]) -> Any:
+    def get_news(gnews: GNews, key: str) -> list[dict[str, Any]]:
+        calls.append(key)
+        return [] # as GNews does when the request fails
+    return get_news
+
+
+@pytest.mark.news
+class TestGoogleNewsCache:
+
+    def test_ttl(self, monkeypatch: pytest.MonkeyPatch):
+        calls: list[str] = []
+        monkeypatch.setattr(GNews, "get_top_news", fake_top_news(calls))
+        gnews_api = GoogleNewsWrapper()
+
+        first = gnews_api.get_top_headlines(limit=3)
+        second = gnews_api.get_top_headlines(limit=3)
+        assert len(first) == 3
+        assert [a.title for a in first] == [a.title for a in second]
+        assert calls == ["top"]
+
+        assert [a.title for a in gnews_api.get_top_headlines(limit=2)] == ["Title 0", "Title 1"]
+        assert calls == ["top", "top"]
+
+        gnews_api.cache.ttl_seconds = 0
+        gnews_api.get_top_headlines(limit=3)
+        assert calls == ["top", "top", "top"]
+
+    def test_empty_results_not_cached(self, monkeypatch: pytest.MonkeyPatch):
+        calls: list[str] = []
+        monkeypatch.setattr(GNews, "get_news", fake_failing_news(calls))
+        gnews_api = GoogleNewsWrapper()
+        assert gnews_api.get_latest_news("btc", limit=3) == []
+        assert gnews_api.get_latest_news("btc", limit=3) == []
+        assert calls == ["btc", "btc"]
+
+    def test_clients_are_reused(self):
+        gnews_api = GoogleNewsWrapper()
+        assert gnews_api._GoogleNewsWrapper__client(10) is gnews_api._GoogleNewsWrapper__client(10) # type: ignore
+        assert gnews_api._GoogleNewsWrapper__client(10) is not gnews_api._GoogleNewsWrapper__client(20) # type: ignore
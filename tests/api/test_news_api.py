@@ -1,6 +1,9 @@
 import os
+import time
+from typing import Any
 import pytest
 from app.api.news import NewsApiWrapper
+from app.api.news.newsapi import MAX_CONCURRENT_PAGES
 
 
 @pytest.mark.news
@@ -35,3 +38,56 @@ class TestNewsAPI:
             assert article.title is not None or article.title != ""
             assert article.description is not None or article.description != ""
 
+
+
+class FakeNewsApiClient:
+    def __init__(self, total: int, delay: float = 0.1, failing_page: int | None = None):
+        self.total = total
+        self.delay = delay
+        self.failing_page = failing_page
+        self.pages: list[int] = []
+
+    def get_everything(self, q: str, language: str, sort_by: str, page_size: int, page: int) -> dict[str, Any]:
+        self.pages.append(page)
+        if page == self.failing_page:
+            raise Exception("Rate limited")
+        time.sleep(self.delay)
+        start = (page - 1) * page_size
+        count = max(0, min(page_size, self.total - start))
+        return {"articles": [{"title": f"{q} {start + i}", "source": {"name": "Fake"}} for i in range(count)]}
+
+
+@pytest.mark.news
+class TestNewsAPIPages:
+
+    def wrapper(self, monkeypatch: pytest.MonkeyPatch, client: FakeNewsApiClient) -> NewsApiWrapper:
+        monkeypatch.setenv("NEWS_API_KEY", "fake")
+        news_api = NewsApiWrapper()
+        news_api.client = client # type: ignore
+        return news_api
+
+    def test_pages_are_ordered(self, monkeypatch: pytest.MonkeyPatch):
+        client = FakeNewsApiClient(total=1000)
+        news_api = self.wrapper(monkeypatch, client)
+        articles = news_api.get_latest_news(query="btc", limit=300)
+        assert [a.title for a in articles] == [f"btc {i}" for i in range(300)]
+        assert sorted(client.pages) == [1, 2, 3]
+
+    def test_failed_page_cancels_the_others(self, monkeypatch: pytest.MonkeyPatch):
+        client = FakeNewsApiClient(total=1000, failing_page=1)
+        news_api = self.wrapper(monkeypatch, client)
+        with pytest.raises(Exception):
+            news_api.get_latest_news(query="btc", limit=1000)
+        assert len(client.pages) <= MAX_CONCURRENT_PAGES + 1 # the worker of the failed page may start one more before the cancellation
+
+    def test_stops_at_short_page(self, monkeypatch: pytest.MonkeyPatch):
+        client = FakeNewsApiClient(total=150, delay=0.0)
+        news_api = self.wrapper(monkeypatch, client)
+        articles = news_api.get_latest_news(query="eth", limit=500)
+        assert [a.title for a in articles] == [f"eth {i}" for i in range(150)]
+
+    def test_no_articles_requested(self, monkeypatch: pytest.MonkeyPatch):
+        client = FakeNewsApiClient(total=150, delay=0.0)
+        news_api = self.wrapper(monkeypatch, client)
+        assert news_api.get_latest_news(query="eth", limit=0) == []
+        assert client.pages == []
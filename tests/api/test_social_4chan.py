@@ -1,5 +1,9 @@
 import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
 import pytest
+from app.api.social import chan
 from app.api.social.chan import ChanWrapper
 
 @pytest.mark.social
@@ -20,3 +24,61 @@ class TestChanWrapper:
             assert re.match(r'\d{4}-\d{2}-\d{2}', post.timestamp)
             assert isinstance(post.comments, list)
 
+
+
+CATALOG = [{"page": 1, "threads": [
+    {"sticky": 1, "now": "01/01/24(Mon)00:00:00", "com": "Rules"},
+    {
+        "now": "01/02/24(Tue)10:00:00", "name": "Anonymous", "sub": "BTC &amp; ETH",
+        "com": "<a href=\"#p1\" class=\"quotelink\">&gt;&gt;1</a><br>Moon<wbr>soon https:\\/\\/example.com",
+        "last_replies": [{"now": "01/02/24(Tue)11:00:00", "com": "<span class=\"quote\">&gt;buy</span><br><br>ok"}],
+    },
+    {"now": "01/03/24(Wed)10:00:00", "com": "Second thread"},
+    {"now": "not a date", "com": "Never parsed"},
+]}]
+
+
+class FakeChan:
+    def __init__(self, last_modified: str = "Mon, 01 Jan 2024 00:00:00 GMT"):
+        self.last_modified = last_modified
+        self.requests: list[dict[str, str]] = []
+
+    def get(self, url: str, headers: dict[str, str], timeout: float) -> Any:
+        self.requests.append(headers)
+        not_modified = headers.get("If-Modified-Since") == self.last_modified
+        return SimpleNamespace(
+            status_code=304 if not_modified else 200, text="",
+            headers={"Last-Modified": self.last_modified}, json=lambda: CATALOG,
+        )
+
+
+@pytest.mark.social
+class TestChanParsing:
+
+    def test_parse_catalog(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+        monkeypatch.setattr(chan.requests, "get", FakeChan().get)
+        posts = ChanWrapper(cache_path=str(tmp_path / "catalog.json")).get_top_crypto_posts(limit=2)
+        assert [post.title for post in posts] == ["Anonymous posted: BTC & ETH", "Anonymous posted: "]
+        assert posts[0].description == ">>1 Moon soon https:/example.com"
+        assert [c.description for c in posts[0].comments] == [">buy ok"]
+        assert posts[0].timestamp.startswith("2024-01-02")
+        assert posts[1].description == "Second thread"
+
+    def test_conditional_get_cache(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+        server = FakeChan()
+        monkeypatch.setattr(chan.requests, "get", server.get)
+        cache_path = str(tmp_path / "catalog.json")
+        wrapper = ChanWrapper(cache_path=cache_path)
+        first = wrapper.get_top_crypto_posts(limit=2)
+        assert wrapper.get_top_crypto_posts(limit=2) == first
+        assert server.requests == [{}]
+
+        monkeypatch.setattr(chan, "MIN_REFRESH_SECONDS", -1)
+        parsed = wrapper.posts[2]
+        assert wrapper.get_top_crypto_posts(limit=2) == first
+        assert server.requests[-1] == {"If-Modified-Since": server.last_modified}
+        assert wrapper.posts[2] is parsed # 304: not parsed again
+
+        restarted = ChanWrapper(cache_path=cache_path)
+        assert restarted.get_top_crypto_posts(limit=2) == first
+        assert len(server.requests) == 3 and server.requests[-1] == {"If-Modified-Since": server.last_modified}
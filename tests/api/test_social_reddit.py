@@ -1,7 +1,10 @@
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytest
-from app.api.social.reddit import MAX_COMMENTS, RedditWrapper
+from app.api.social.reddit import MAX_COMMENTS, MAX_CONCURRENT_COMMENT_FETCHES, RedditWrapper
 
 @pytest.mark.social
 @pytest.mark.api
@@ -25,3 +28,86 @@ class TestRedditWrapper:
             assert len(post.comments) <= MAX_COMMENTS
             for comment in post.comments:
                 assert comment.description != ""
+
+
+class FakeComment:
+    def __init__(self, i: int):
+        self.created = 1704067200 + i
+        self.body = f"comment {i}"
+
+
+class FakeReddit:
+    """Fake PRAW client that records if it is used by more than one thread at a time"""
+
+    def __init__(self, barrier: threading.Barrier | None = None):
+        self.active = 0
+        self.shared = False
+        self.lock = threading.Lock()
+        self.barrier = barrier
+        """If set, each comment fetch waits for the others: it is only passed if enough fetches run at the same time"""
+        self.submissions: list[FakeSubmission] = []
+
+    def subreddit(self, name: str) -> 'FakeReddit':
+        return self
+
+    def top(self, limit: int, time_filter: str) -> list['FakeSubmission']:
+        return [FakeSubmission(str(i), self) for i in range(limit)]
+
+    def submission(self, id: str) -> 'FakeSubmission':
+        submission = FakeSubmission(id, self)
+        self.submissions.append(submission)
+        return submission
+
+
+class FakeSubmission:
+    def __init__(self, id: str, client: FakeReddit):
+        self.id = id
+        self.client = client
+        self.created = 1704067200
+        self.title = f"post {id}"
+        self.selftext = ""
+        self.comment_limit: int | None = None
+
+    @property
+    def comments(self) -> list[FakeComment]:
+        with self.client.lock:
+            self.client.shared |= self.client.active > 0
+            self.client.active += 1
+        if self.client.barrier:
+            self.client.barrier.wait()
+        time.sleep(0.05) # the comment tree is a separate request
+        with self.client.lock:
+            self.client.active -= 1
+        return [FakeComment(i) for i in range(self.comment_limit or 50)]
+
+
+@pytest.mark.social
+class TestRedditComments:
+
+    def wrapper(self, monkeypatch: pytest.MonkeyPatch, clients: list[FakeReddit], barrier: threading.Barrier | None = None) -> RedditWrapper:
+        monkeypatch.setenv("REDDIT_API_CLIENT_ID", "fake")
+        monkeypatch.setenv("REDDIT_API_CLIENT_SECRET", "fake")
+        def new_client(self: RedditWrapper) -> FakeReddit:
+            clients.append(FakeReddit(barrier))
+            return clients[-1]
+        monkeypatch.setattr(RedditWrapper, "new_client", new_client)
+        return RedditWrapper()
+
+    def test_comments_are_fetched_concurrently(self, monkeypatch: pytest.MonkeyPatch):
+        clients: list[FakeReddit] = []
+        barrier = threading.Barrier(MAX_CONCURRENT_COMMENT_FETCHES, timeout=30) # broken if the fetches do not overlap
+        wrapper = self.wrapper(monkeypatch, clients, barrier)
+        posts = wrapper.get_top_crypto_posts(limit=MAX_CONCURRENT_COMMENT_FETCHES)
+        assert not barrier.broken
+        assert [post.title for post in posts] == [f"post {i}" for i in range(MAX_CONCURRENT_COMMENT_FETCHES)]
+        assert all(len(post.comments) == MAX_COMMENTS for post in posts)
+        assert all(s.comment_limit == MAX_COMMENTS for c in clients for s in c.submissions)
+
+    def test_clients_are_not_shared_between_threads(self, monkeypatch: pytest.MonkeyPatch):
+        clients: list[FakeReddit] = []
+        wrapper = self.wrapper(monkeypatch, clients)
+        with ThreadPoolExecutor(max_workers=2) as executor: # e.g. a user run and the prefetch thread
+            results = list(executor.map(wrapper.get_top_crypto_posts, [20, 20]))
+        assert all(len(posts) == 20 for posts in results)
+        assert len(clients) <= MAX_CONCURRENT_COMMENT_FETCHES
+        assert not any(client.shared for client in clients)
@@ -1,8 +1,11 @@
 import os
 import re
+import time
 import pytest
+from pathlib import Path
 from shutil import which
-from app.api.social.x import XWrapper
+from app.api.core.metrics import get_metrics
+from app.api.social.x import XWrapper, X_USERS
 
 @pytest.mark.social
 @pytest.mark.api
@@ -22,3 +25,41 @@ class TestXWrapper:
             assert post.title != ""
             assert re.match(r'\d{4}-\d{2}-\d{2}', post.timestamp)
             assert isinstance(post.comments, list)
+
+
+FAKE_RETTIWT = """#!/bin/sh
+sleep 0.5
+echo "$7" >> "$(dirname "$0")/calls.txt"
+echo '{"list": [{"createdAt": "2024-01-01T00:00:00+00:00", "fullText": "tweet of '"$7"'"}]}'
+"""
+
+
+@pytest.mark.social
+@pytest.mark.skipif(os.name == "nt", reason="the fake rettiwt is a shell script")
+class TestXWrapperConcurrency:
+
+    def wrapper(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> XWrapper:
+        script = tmp_path / "rettiwt"
+        script.write_text(FAKE_RETTIWT)
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv("X_API_KEY", "fake")
+        return XWrapper()
+
+    def test_users_are_fetched_concurrently_and_cached(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+        wrapper = self.wrapper(monkeypatch, tmp_path)
+        start = time.monotonic()
+        posts = wrapper.get_top_crypto_posts(limit=1)
+        assert time.monotonic() - start < 0.5 * len(X_USERS)
+        assert [post.description for post in posts] == [f"tweet of {user}" for user in X_USERS]
+
+        wrapper.get_top_crypto_posts(limit=1)
+        assert len((tmp_path / "calls.txt").read_text().split()) == len(X_USERS)
+
+    def test_cache_lookups_recorded_once(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+        wrapper = self.wrapper(monkeypatch, tmp_path)
+        get_metrics().reset()
+        wrapper.get_top_crypto_posts(limit=1)
+        assert get_metrics().cache_hit_ratios()["x_user_posts"] == 0.0
+        wrapper.get_top_crypto_posts(limit=1)
+        assert get_metrics().cache_hit_ratios()["x_user_posts"] == 0.5
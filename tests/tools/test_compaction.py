@@ -0,0 +1,101 @@
+import pytest
+from app.api.core.markets import Price
+from app.api.core.news import Article
+from app.api.tools.compaction import PriceSummary, ToolOutputCompactor, compact_articles, downsample, estimate_tokens
+
+
+@pytest.mark.tools
+class TestCompaction:
+
+    def __prices(self, count: int) -> list[Price]:
+        prices: list[Price] = []
+        for i in range(count):
+            price = Price(open=100.0 + i, close=101.0 + i, high=102.0 + i, low=99.0 + i, volume=10.0)
+            price.set_timestamp(timestamp_s=1_700_000_000 + i * 3600)
+            prices.append(price)
+        return prices
+
+    def test_downsample(self):
+        items = list(range(100))
+        sampled = downsample(items, 5)
+        assert len(sampled) == 5
+        assert sampled[0] == 0
+        assert sampled[-1] == 99
+        assert downsample(items[:3], 5) == [0, 1, 2]
+        assert downsample(items, 0) == []
+
+    def test_price_summary(self):
+        prices = self.__prices(100)
+        summary = PriceSummary.from_prices(list(reversed(prices)), samples=10)
+        assert summary.points == 100
+        assert summary.start == prices[0].timestamp
+        assert summary.end == prices[-1].timestamp
+        assert summary.open == 100.0
+        assert summary.close == 200.0
+        assert summary.high == 201.0
+        assert summary.low == 99.0
+        assert summary.change_pct == pytest.approx(100.0) # type: ignore
+        assert summary.volatility_pct > 0
+        assert len(summary.samples) == 10
+        assert summary.samples[-1].timestamp == prices[-1].timestamp
+
+    def test_price_summary_empty(self):
+        summary = PriceSummary.from_prices([])
+        assert summary.points == 0
+        assert summary.samples == []
+
+    def test_compact_articles(self):
+        articles = [
+            Article(source="A", title="Bitcoin hits new high", description="x" * 1000),
+            Article(source="B", title="Bitcoin hits new high!", description="duplicate"),
+            Article(source="C", title="Ethereum upgrade", description="short"),
+        ]
+        compacted = compact_articles(articles, max_articles=10, max_chars=50)
+        assert [a.source for a in compacted] == ["A", "C"]
+        assert len(compacted[0].description) <= 53
+        assert compacted[1].description == "short"
+
+    def test_hook_compacts_prices(self):
+        compactor = ToolOutputCompactor(token_budget=2000)
+        prices = self.__prices(100)
+        result = compactor.hook("get_historical_prices", lambda **_: prices, {})
+        assert isinstance(result, PriceSummary)
+        assert estimate_tokens(result) < estimate_tokens(prices)
+
+    def test_hook_fits_budget(self):
+        compactor = ToolOutputCompactor(token_budget=300, max_articles=100)
+        articles = [Article(title=f"Story {i}", description="x" * 100) for i in range(50)]
+        result = compactor.hook("get_latest_news", lambda **_: articles, {})
+        assert estimate_tokens(result) <= 300
+        assert result["of"] == 50
+        assert result["truncated"] == 50 - len(result["result"])
+        assert [a.title for a in result["result"]] == [a.title for a in articles[:len(result["result"])]]
+
+    def test_hook_does_not_cut_other_outputs(self):
+        compactor = ToolOutputCompactor(token_budget=100)
+        symbols = [f"SYM{i}-USD" for i in range(10_000)]
+        assert compactor.hook("get_all_symbols", lambda **_: symbols, {}) == symbols
+
+    def test_hook_keeps_unknown_types(self):
+        compactor = ToolOutputCompactor(token_budget=100)
+        result = compactor.hook("add_tasks", lambda task_names: f"Added {len(task_names)} new tasks.", {"task_names": ["a", "b"]})
+        assert result == "Added 2 new tasks."
+
+    def test_hook_aggregated_articles(self):
+        compactor = ToolOutputCompactor(token_budget=5000)
+        articles = {
+            "P1": [Article(title="Same story"), Article(title="Only in P1")],
+            "P2": [Article(title="Same story"), Article(title="Only in P2")],
+        }
+        result = compactor.hook("get_latest_news_aggregated", lambda **_: articles, {})
+        assert [a.title for a in result["P1"]] == ["Same story", "Only in P1"]
+        assert [a.title for a in result["P2"]] == ["Only in P2"]
+
+    def test_aggregated_articles_normalized_titles(self):
+        compactor = ToolOutputCompactor(token_budget=5000)
+        articles = {
+            "P1": [Article(title="Bitcoin hits new high")],
+            "P2": [Article(title="Bitcoin hits NEW high!"), Article(title="Only in P2")],
+        }
+        result = compactor.hook("get_latest_news_aggregated", lambda **_: articles, {})
+        assert [a.title for a in result["P2"]] == ["Only in P2"]
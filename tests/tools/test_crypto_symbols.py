@@ -1,4 +1,10 @@
+import asyncio
+import os
 import pytest
+import pandas as pd
+from io import StringIO
+from app.api.core.symbols import SymbolIndex, binary_path, load_table, parse_amount, parse_table, save_table
+from app.api.core.assets import get_asset_resolver
 from app.api.tools import CryptoSymbolsTools
 
 @pytest.mark.tools
@@ -25,3 +31,138 @@ class TestCryptoSymbolsTools:
         results = tool.get_symbols_by_name("InvalidName")
         assert isinstance(results, list)
         assert not results
+
+    def test_search_ranked_by_market_cap(self):
+        tool = CryptoSymbolsTools()
+        results = tool.get_symbols_by_name("bitcoin")
+        assert results[0] == ("BTC-USD", "Bitcoin USD")
+        assert tool.get_symbols_by_name("BTC")[0] == ("BTC-USD", "Bitcoin USD")
+
+    def test_search_symbols_fuzzy(self):
+        tool = CryptoSymbolsTools()
+        assert not tool.get_symbols_by_name("etherum")
+        results = tool.search_symbols("etherum", limit=3)
+        assert len(results) <= 3
+        assert ("ETH-USD", "Ethereum USD") in results
+
+    def test_get_top_cryptos(self):
+        tool = CryptoSymbolsTools()
+        top = tool.get_top_cryptos(limit=5)
+        assert len(top) == 5
+        assert top[0].symbol == "BTC-USD"
+        caps = [row.market_cap for row in top]
+        assert caps == sorted(caps, reverse=True)
+
+        gainers = tool.get_top_cryptos(sort_by="change_pct", limit=3, min_market_cap=1e9)
+        losers = tool.get_top_cryptos(sort_by="change_pct", limit=3, ascending=True)
+        assert all(row.market_cap >= 1e9 for row in gainers)
+        assert gainers[0].change_pct >= gainers[-1].change_pct
+        assert losers[0].change_pct <= losers[-1].change_pct
+        assert len(tool.get_top_cryptos(limit=1000)) == 50
+
+    def test_fetch_pages_concurrently(self, tmp_path, monkeypatch): # type: ignore
+        source = pd.read_csv('resources/cryptos.csv').head(600)
+        offsets: list[int] = []
+
+        async def fake_request(self, client, offset: int, num_currencies: int) -> StringIO: # type: ignore
+            offsets.append(offset)
+            page = source.iloc[offset:offset + num_currencies]
+            return StringIO(page.to_html(index=False) if not page.empty else "<html></html>")
+
+        monkeypatch.setattr(CryptoSymbolsTools, "_CryptoSymbolsTools___request", fake_request)
+        tool = CryptoSymbolsTools(cache_file=str(tmp_path / "cryptos.csv"))
+        asyncio.run(tool.fetch_crypto_symbols())
+
+        assert tool.final_table['Symbol'].tolist() == source['Symbol'].tolist()
+        assert tool.get_symbols_by_name("bitcoin")[0] == ("BTC-USD", "Bitcoin USD")
+        assert sorted(offsets)[:3] == [0, 250, 500]
+
+        offsets.clear()
+        source.loc[0, 'Price'] = "1.00"
+        asyncio.run(tool.fetch_crypto_symbols(force_refresh=True, max_pages=1))
+        assert offsets == [0]
+        assert len(tool.final_table) == len(source)
+        assert tool.final_table['Symbol'].tolist() == source['Symbol'].tolist()
+        assert tool.final_table.loc[0, 'Price'] == 1.0
+
+    def test_shared_index(self, tmp_path): # type: ignore
+        assert CryptoSymbolsTools().index is get_asset_resolver().index
+        assert CryptoSymbolsTools(cache_file=str(tmp_path / "cryptos.csv")).index is not get_asset_resolver().index
+
+
+@pytest.mark.tools
+class TestSymbolIndex:
+
+    def index(self) -> SymbolIndex:
+        return SymbolIndex(
+            symbols=["DOGE-USD", "BTC-USD", "BCH-USD", "WBTC-USD"],
+            names=["Dogecoin USD", "Bitcoin USD", "Bitcoin Cash USD", "Wrapped Bitcoin USD"],
+            market_caps=["30.5B", "2.2T", "10B", "--"],
+        )
+
+    def test_parse_amount(self):
+        assert parse_amount("2.218T") == pytest.approx(2.218e12) # type: ignore
+        assert parse_amount("1,234.5") == 1234.5
+        assert parse_amount("--") == 0.0
+        assert parse_amount(float("nan")) == 0.0
+
+    def test_exact_and_prefix(self):
+        index = self.index()
+        assert index.items(index.exact("btc")) == [("BTC-USD", "Bitcoin USD")]
+        assert index.items(index.exact("Bitcoin")) == [("BTC-USD", "Bitcoin USD")]
+        assert index.items(index.prefix("bitc")) == [("BTC-USD", "Bitcoin USD"), ("BCH-USD", "Bitcoin Cash USD")]
+
+    def test_contains_ranked(self):
+        index = self.index()
+        assert [s for s, _ in index.items(index.contains("coin"))] == ["BTC-USD", "DOGE-USD", "BCH-USD", "WBTC-USD"]
+        assert [s for s, _ in index.items(index.contains("sh"))] == ["BCH-USD"]
+        assert index.contains("xyz") == []
+
+    def test_search_order(self):
+        index = self.index()
+        assert [s for s, _ in index.items(index.search("bitcoin"))] == ["BTC-USD", "BCH-USD", "WBTC-USD"]
+        assert [s for s, _ in index.items(index.search("dogecon", limit=1))] == ["DOGE-USD"]
+        assert index.search("dogecon", fuzzy=False) == []
+
+    def test_parse_table(self):
+        raw = pd.DataFrame([{
+            "Symbol": "BTC-USD", "Name": "Bitcoin USD", "Price": "111,269.41 -1,277.88 (-1.14%)", "Change": -1277.88,
+            "Change %": "-1.14%", "Market Cap": "2.218T", "Volume": "72.374B", "Circulating Supply": "19.934M",
+            "52 Wk Change %": "+67.83%", "52 Wk Range": "65,188.04 126,198.07",
+        }])
+        row = parse_table(raw).iloc[0]
+        assert row["Price"] == 111269.41
+        assert row["Change %"] == -1.14
+        assert row["Market Cap"] == pytest.approx(2.218e12) # type: ignore
+        assert row["52 Wk Change %"] == 67.83
+        assert (row["52 Wk Low"], row["52 Wk High"]) == (65188.04, 126198.07)
+        assert row["Volume In Currency (24hr)"] == 0.0
+        assert parse_table(parse_table(raw)).equals(parse_table(raw))
+
+    def test_binary_cache(self, tmp_path): # type: ignore
+        path = str(tmp_path / "cryptos.csv")
+        pd.read_csv('resources/cryptos.csv').head(50).to_csv(path, index=False)
+
+        table = load_table(path)
+        assert table["Market Cap"].dtype == "float64"
+        assert os.path.exists(binary_path(path))
+
+        cached = load_table(path)
+        assert cached["Symbol"].tolist() == table["Symbol"].tolist()
+        assert cached["Market Cap"].tolist() == table["Market Cap"].tolist()
+
+        save_table(table.head(10), path)
+        assert len(load_table(path)) == 10
+
+    def test_load_does_not_rewrite_csv(self, tmp_path): # type: ignore
+        path = str(tmp_path / "cryptos.csv")
+        pd.read_csv('resources/cryptos.csv').head(50).to_csv(path, index=False)
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+        with open(path, "rb") as file:
+            content = file.read()
+
+        load_table(path)
+        load_table(path)
+        with open(path, "rb") as file:
+            assert file.read() == content
+        assert os.path.getmtime(path) == 1_700_000_000
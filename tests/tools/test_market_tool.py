@@ -1,5 +1,7 @@
 import pytest
-from app.api.tools import MarketAPIsTool
+from app.api.core.assets import AssetUsage
+from app.api.core.markets import ProductInfo
+from app.api.tools import MarketAPIsTool, market_tool
 
 
 @pytest.mark.tools
@@ -39,3 +41,32 @@ class TestMarketAPIsTool:
             assert fake_product is None or fake_product.price == 0
         except Exception as _:
             pass
+
+
+class FakeHandler:
+    def __init__(self):
+        self.requested: list[list[str]] = []
+
+    def try_call(self, func):  # type: ignore
+        return func(self)  # type: ignore
+
+    def get_products(self, asset_ids: list[str]) -> list[ProductInfo]:
+        self.requested.append(asset_ids)
+        return [ProductInfo(symbol=asset_id, price=1.0) for asset_id in reversed(asset_ids)]
+
+
+@pytest.mark.tools
+@pytest.mark.market
+class TestMarketProductsCache:
+
+    def test_products_keep_input_order(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(market_tool, "PRODUCT_CACHE", {})
+        monkeypatch.setattr(market_tool, "get_asset_usage", AssetUsage) # the shared usage is read by the prefetch tests
+        monkeypatch.setattr(market_tool, "resolve_base", lambda asset_id: asset_id.upper()) # type: ignore
+        tool = MarketAPIsTool.__new__(MarketAPIsTool)
+        tool.handler = FakeHandler() # type: ignore
+
+        tool.get_products(["ETH"])
+        products = tool.get_products(["BTC", "ETH", "SOL"])
+        assert [p.symbol for p in products] == ["BTC", "ETH", "SOL"]
+        assert tool.handler.requested == [["ETH"], ["BTC", "SOL"]] # type: ignore
@@ -0,0 +1,80 @@
+import pytest
+from app.api.core import assets
+from app.api.core.assets import AssetResolver, edit_distance, get_asset_resolver, invalidate_asset_resolver, is_ticker, provider_symbol
+from app.api.core.symbols import SymbolIndex
+
+
+@pytest.mark.market
+class TestAssetResolver:
+
+    def resolver(self) -> AssetResolver:
+        return AssetResolver(SymbolIndex(
+            symbols=["BTC-USD", "ETH-USD", "DOGE-USD", "PEPE24478-USD", "BCH-USD", "TSLA33436-USD", "META-USD", "COIN27782-USD"],
+            names=["Bitcoin USD", "Ethereum USD", "Dogecoin USD", "Pepe USD", "Bitcoin Cash USD", "TSLA6900 USD", "Metadium USD", "COIN USD"],
+            market_caps=["2.2T", "487B", "30B", "4B", "10B", "0", "30.1M", "0"],
+        ))
+
+    def test_edit_distance(self):
+        assert edit_distance("etherum", "ethereum", 2) == 1
+        assert edit_distance("kitten", "sitting", 3) == 3
+        assert edit_distance("bitcoin", "dogecoin", 1) == 2
+
+    def test_exact_symbols_and_names(self):
+        resolver = self.resolver()
+        assert resolver.resolve("btc").base == "BTC" # type: ignore
+        assert resolver.resolve("BTC-USD").base == "BTC" # type: ignore
+        assert resolver.resolve("Bitcoin").base == "BTC" # type: ignore
+        assert resolver.resolve("bitcoin cash").base == "BCH" # type: ignore
+        assert resolver.resolve("doge coin").base == "DOGE" # type: ignore
+
+    def test_aliases_and_typos(self):
+        resolver = self.resolver()
+        assert resolver.resolve("xbt").base == "BTC" # type: ignore
+        assert resolver.resolve("ether").base == "ETH" # type: ignore
+        assert resolver.resolve("etherum").base == "ETH" # type: ignore
+        assert resolver.resolve("bitcon").base == "BTC" # type: ignore
+        assert resolver.resolve("AAPL") is None
+        assert resolver.resolve("xyz") is None
+
+    def test_provider_symbols(self):
+        pepe = self.resolver().resolve("pepe")
+        assert pepe is not None
+        assert pepe.base == "PEPE"
+        assert pepe.symbol("binance", "USDT") == "PEPEUSDT"
+        assert pepe.symbol("coinbase") == "PEPE-USD"
+        assert pepe.symbol("cryptocompare") == "PEPE"
+        assert pepe.symbol("yfinance") == "PEPE24478-USD"
+        assert pepe.symbol("yfinance", "EUR") == "PEPE-EUR"
+
+    def test_memoized(self):
+        resolver = self.resolver()
+        assert resolver.resolve(" Etherum ") is resolver.resolve("etherum")
+        assert "etherum" in resolver.cache
+
+    def test_unknown_assets_keep_format(self):
+        assert provider_symbol("AAPL-USD", "yfinance") == "AAPL-USD"
+        assert provider_symbol("aapl", "binance", "USDT") == "AAPLUSDT"
+
+    def test_stock_tickers_not_resolved(self):
+        resolver = self.resolver()
+        assert is_ticker("tsla") and is_ticker("eth-usd") and not is_ticker("bitcoin") and not is_ticker("doge coin")
+        assert resolver.resolve("TSLA") is None
+        assert resolver.resolve("tsla-usd") is None
+        assert resolver.resolve("META") is None
+        assert resolver.resolve("COIN") is None
+        assert resolver.resolve("TSLA33436-USD").base == "TSLA" # type: ignore
+        assert resolver.resolve("PEPE").yahoo_symbol == "PEPE24478-USD" # type: ignore
+        assert resolver.resolve("Metadium").base == "META" # type: ignore
+
+    def test_invalidated_on_refresh(self, monkeypatch): # type: ignore
+        resolvers = iter([self.resolver(), AssetResolver(SymbolIndex(["XYZ-USD"], ["Xyz USD"], ["1B"]))])
+        monkeypatch.setattr(AssetResolver, "from_file", staticmethod(lambda path=assets.CRYPTOS_FILE: next(resolvers)))
+        get_asset_resolver.cache_clear()
+        try:
+            assert get_asset_resolver().resolve("xyz") is None
+            invalidate_asset_resolver("other.csv")
+            assert get_asset_resolver().resolve("xyz") is None
+            invalidate_asset_resolver(assets.CRYPTOS_FILE)
+            assert get_asset_resolver().resolve("xyz").base == "XYZ" # type: ignore
+        finally:
+            get_asset_resolver.cache_clear()
@@ -0,0 +1,38 @@
+import pytest
+from app.api.core.clustering import cluster_articles, deduplicate_articles, minhash, shingles
+from app.api.core.news import Article
+
+
+@pytest.mark.news
+class TestArticleClustering:
+
+    def test_minhash_similarity(self):
+        a = minhash(shingles("Bitcoin surges past $100,000 as ETF inflows grow"))
+        b = minhash(shingles("Bitcoin surges past $100,000 as ETF inflows grow - Reuters"))
+        c = minhash(shingles("Ethereum developers delay the next network upgrade"))
+        assert (a == b).mean() > 0.6
+        assert (a == c).mean() < 0.2
+
+    def test_cluster_articles(self):
+        articles = [
+            Article(title="Bitcoin surges past $100,000 as ETF inflows grow"),
+            Article(title="Solana hits record high"),
+            Article(title="Bitcoin surges past $100,000 as ETF inflows grow - Reuters"),
+            Article(title="Cardano hits record high"),
+            Article(title="Totally different", description="The SEC approved the first spot Ether ETFs on Thursday after months of delays"),
+            Article(title="Ether ETFs approved", description="The SEC approved the first spot Ether ETFs on Thursday after months of delays."),
+        ]
+        assert cluster_articles(articles) == [[0, 2], [1], [3], [4, 5]]
+        assert cluster_articles([]) == []
+
+    def test_deduplicate_articles(self):
+        articles = {
+            "NewsAPI": [Article(title="Ethereum upgrade goes live on mainnet"), Article(title="Solana hits record high")],
+            "Google": [Article(title="Ethereum upgrade goes live on mainnet today", description="More details")],
+            "DuckDuckGo": [Article(title="Ethereum upgrade goes live on mainnet!")],
+        }
+        result = deduplicate_articles(articles)
+        assert [a.title for a in result["NewsAPI"]] == ["Solana hits record high"]
+        assert [(a.title, a.source_count) for a in result["Google"]] == [("Ethereum upgrade goes live on mainnet today", 3)]
+        assert result["DuckDuckGo"] == []
+        assert result["NewsAPI"][0].source_count == 1
@@ -0,0 +1,77 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.agents.core import QueryInputs
+from app.agents.pipeline import Pipeline
+from app.api.core.deadline import Deadline, DeadlineExceeded, current_deadline, set_deadline
+
+
+class HangingWorkflow:
+    async def arun(self, query, stream, stream_intermediate_steps): # type: ignore
+        async def iterate():
+            await asyncio.sleep(10)
+            yield None
+        return iterate()
+
+
+class TestDeadline:
+
+    def test_no_deadline(self):
+        deadline = Deadline()
+        assert deadline.remaining() is None
+        assert not deadline.expired()
+        assert deadline.timeout() == deadline.request_timeout
+        deadline.check()
+
+    def test_run_deadline(self):
+        deadline = Deadline(0.05)
+        assert deadline.remaining() is not None
+        time.sleep(0.06)
+        assert deadline.expired()
+        with pytest.raises(DeadlineExceeded):
+            deadline.check()
+
+    def test_stage_deadline(self):
+        deadline = Deadline(100, stages={"Fast": 0.01})
+        deadline.start_stage("Fast")
+        assert deadline.remaining() <= 0.01 # type: ignore
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            deadline.check()
+        assert "Fast" in str(exc_info.value)
+
+        deadline.start_stage("Slow")
+        assert not deadline.expired()
+
+    def test_timeout_capped(self):
+        deadline = Deadline(1, request_timeout=20)
+        assert deadline.timeout() <= 1
+
+    def test_cancel_wakes_sleep(self):
+        deadline = Deadline()
+        threading.Timer(0.05, deadline.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            deadline.sleep(10)
+        assert time.monotonic() - start < 1
+
+    def test_current_deadline(self):
+        deadline = Deadline(10)
+
+        async def run() -> Deadline:
+            set_deadline(deadline)
+            return await asyncio.to_thread(current_deadline)
+
+        assert asyncio.run(run()) is deadline
+        assert current_deadline() is not deadline
+
+    def test_run_stream_timed_out(self):
+        deadline = Deadline(0.05)
+
+        async def run() -> list[str]:
+            return [chunk async for chunk in Pipeline.run_stream(HangingWorkflow(), QueryInputs(user_query="btc", strategy=""), events=[], deadline=deadline)] # type: ignore
+
+        chunks = asyncio.run(run())
+        assert deadline.timed_out
+        assert chunks[-1].startswith("⏱️")
@@ -0,0 +1,59 @@
+import time
+import pytest
+from app.api.core import assets
+from app.api.core.assets import AssetResolver, get_asset_resolver, invalidate_asset_resolver
+from app.api.core.mentions import article_index, get_mention_extractor, parse_time, post_index
+from app.api.core.symbols import SymbolIndex
+from app.api.core.news import Article
+from app.api.core.social import SocialPost
+
+
+def minutes_ago(minutes: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(time.time() - minutes * 60))
+
+
+@pytest.mark.social
+class TestMentionIndex:
+
+    def test_parse_time(self):
+        assert parse_time("2024-01-01T00:00:00Z") == parse_time("Mon, 01 Jan 2024 00:00:00 GMT")
+        assert parse_time("2024-01-01 10:30") is not None
+        assert parse_time("yesterday") is None
+        assert parse_time("") is None
+
+    def test_mentions_by_asset_and_time(self):
+        index = post_index()
+        posts = [
+            SocialPost(timestamp=minutes_ago(30), title="a", tickers=["BTC", "SOL"]),
+            SocialPost(timestamp=minutes_ago(5 * 60), title="b", tickers=["SOL"]),
+            SocialPost(timestamp=minutes_ago(10), title="c", tickers=["ETH"]),
+            SocialPost(timestamp=minutes_ago(60), title="d", tickers=[]),
+        ]
+        assert index.add(posts) == 3
+        assert index.add(posts) == 0
+        assert [p.title for p in index.mentions("SOL", hours=24)] == ["a", "b"]
+        assert [p.title for p in index.mentions("SOL", hours=1)] == ["a"]
+        assert [p.title for p in index.mentions("SOL", hours=24, limit=1)] == ["a"]
+        assert index.mentions("DOGE") == []
+        assert index.counts(hours=24) == {"SOL": 2, "BTC": 1, "ETH": 1}
+
+    def test_retention(self):
+        index = article_index()
+        index.retention_seconds = 3600
+        assert index.add([
+            Article(title="old", time="2020-01-01T00:00:00Z", tickers=["BTC"]),
+            Article(title="new", time="", tickers=["BTC"]), # unknown time: the time of the insertion
+        ]) == 1
+        assert [a.title for a in index.mentions("BTC")] == ["new"]
+        assert len(index) == 1
+
+    def test_extractor_rebuilt_on_refresh(self, monkeypatch: pytest.MonkeyPatch):
+        tables = iter([(["BTC-USD"], ["Bitcoin USD"], ["2T"]), (["BTC-USD", "XYZ-USD"], ["Bitcoin USD", "Xyz USD"], ["2T", "1B"])])
+        monkeypatch.setattr(AssetResolver, "from_file", staticmethod(lambda path=assets.CRYPTOS_FILE: AssetResolver(SymbolIndex(*next(tables)))))
+        get_asset_resolver.cache_clear()
+        try:
+            assert get_mention_extractor().extract("$BTC and $XYZ") == ["BTC"]
+            invalidate_asset_resolver(assets.CRYPTOS_FILE)
+            assert get_mention_extractor().extract("$BTC and $XYZ") == ["BTC", "XYZ"]
+        finally:
+            get_asset_resolver.cache_clear()
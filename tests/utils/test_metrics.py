@@ -0,0 +1,83 @@
+import pytest
+from app.api.core.metrics import Histogram, MetricsRegistry, get_metrics, tool_metrics_hook
+from app.api.wrapper_handler import WrapperHandler
+
+
+class SlowWrapper:
+    def do_something(self) -> str:
+        return "Success"
+
+class BrokenWrapper:
+    def do_something(self) -> str:
+        raise Exception("Intentional Failure")
+
+
+def series(snapshot: dict, kind: str, name: str, **labels: str) -> dict:
+    return next((s for s in snapshot[kind].get(name, []) if s["labels"] == labels), {})
+
+
+@pytest.mark.wrapper
+class TestMetrics:
+    def test_histogram_quantile(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 0.5, 1.5, 3.0):
+            histogram.observe(value)
+        assert histogram.count == 4
+        assert histogram.counts == [2, 1, 1, 0]
+        assert histogram.quantile(0.5) == pytest.approx(1.0)
+        assert histogram.quantile(0.75) == pytest.approx(2.0)
+        histogram.observe(10.0)
+        assert histogram.quantile(1.0) == 4.0
+
+    def test_timed_records_errors(self):
+        metrics = MetricsRegistry()
+        with metrics.timed("tool_call_seconds", errors="tool_errors_total", tool="a"):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.timed("tool_call_seconds", errors="tool_errors_total", tool="a"):
+                raise ValueError()
+
+        snapshot = metrics.snapshot()
+        assert series(snapshot, "histograms", "tool_call_seconds", outcome="ok", tool="a")["count"] == 1
+        assert series(snapshot, "histograms", "tool_call_seconds", outcome="error", tool="a")["count"] == 1
+        assert series(snapshot, "counters", "tool_errors_total", tool="a")["value"] == 1
+
+    def test_cache_hit_ratio(self):
+        metrics = MetricsRegistry()
+        for hit in (True, True, True, False):
+            metrics.cache("products", hit)
+        metrics.cache("news_index", False)
+        assert metrics.cache_hit_ratios() == {"news_index": 0.0, "products": 0.75}
+
+    def test_render_prometheus(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        metrics.observe("wrapper_call_seconds", 0.5, wrapper="Binance\"", outcome="ok")
+        metrics.inc("pipeline_runs_total", outcome="completed")
+        metrics.cache("products", True)
+        text = metrics.render()
+
+        assert "# TYPE upo_wrapper_call_seconds histogram" in text
+        assert 'upo_wrapper_call_seconds_bucket{outcome="ok",wrapper="Binance\\"",le="0.1"} 0' in text
+        assert 'upo_wrapper_call_seconds_bucket{outcome="ok",wrapper="Binance\\"",le="1"} 1' in text
+        assert 'upo_wrapper_call_seconds_bucket{outcome="ok",wrapper="Binance\\"",le="+Inf"} 1' in text
+        assert 'upo_wrapper_call_seconds_count{outcome="ok",wrapper="Binance\\""} 1' in text
+        assert 'upo_pipeline_runs_total{outcome="completed"} 1' in text
+        assert 'upo_cache_hit_ratio{cache="products"} 1' in text
+        assert text.endswith("\n")
+
+    def test_wrapper_handler_attempts(self):
+        before = get_metrics().snapshot()
+        handler = WrapperHandler.build_wrappers([BrokenWrapper, SlowWrapper], try_per_wrapper=2, retry_delay=0)
+        assert handler.try_call(lambda w: w.do_something()) == "Success"
+
+        after = get_metrics().snapshot()
+        errors = lambda s: series(s, "counters", "wrapper_errors_total", wrapper="BrokenWrapper").get("value", 0)
+        successes = lambda s: series(s, "histograms", "wrapper_call_seconds", outcome="ok", wrapper="SlowWrapper").get("count", 0)
+        assert errors(after) - errors(before) == 2
+        assert successes(after) - successes(before) == 1
+
+    def test_tool_hook(self):
+        before = series(get_metrics().snapshot(), "histograms", "tool_call_seconds", outcome="ok", tool="sum").get("count", 0)
+        assert tool_metrics_hook("sum", lambda a, b: a + b, {"a": 1, "b": 2}) == 3
+        after = series(get_metrics().snapshot(), "histograms", "tool_call_seconds", outcome="ok", tool="sum")["count"]
+        assert after - before == 1
@@ -0,0 +1,84 @@
+import time
+import pytest
+from app.api.core.news import Article
+from app.api.core import news_index
+from app.api.core.news_index import NewsIndex, article_key, get_news_index
+
+
+@pytest.mark.news
+class TestNewsIndex:
+
+    def articles(self) -> list[Article]:
+        return [
+            Article(source="Reuters", title="Bitcoin ETF inflows hit record", description="Spot bitcoin ETFs saw record inflows", url="https://example.com/1"),
+            Article(source="CoinDesk", title="Ethereum upgrade goes live", description="The Pectra upgrade is live on mainnet", url="https://example.com/2"),
+            Article(source="Blog", title="Regulators look at bitcoin mining", description="New rules for miners"),
+        ]
+
+    def test_article_key(self):
+        assert article_key(Article(url="https://example.com/1")) == "https://example.com/1"
+        assert article_key(Article(source="A", title="Same title!")) == article_key(Article(source="a", title="same title"))
+        assert article_key(Article(source="A", title="Same title")) != article_key(Article(source="B", title="Same title"))
+
+    def test_ingest_deduplicates(self):
+        index = NewsIndex(":memory:")
+        assert index.ingest(self.articles()) == 3
+        assert index.ingest(self.articles()) == 0
+        assert index.ingest([Article(title="Bitcoin ETF inflows hit record (updated)", url="https://example.com/1")]) == 0
+        assert len(index) == 3
+
+    def test_search(self):
+        index = NewsIndex(":memory:")
+        index.ingest(self.articles())
+        assert {a.url for a in index.search("bitcoin")} == {"https://example.com/1", ""}
+        assert [a.title for a in index.search("Pectra mainnet")] == ["Ethereum upgrade goes live"]
+        assert index.search("solana") == []
+        assert index.search("bitcoin", max_age_seconds=-1) == []
+
+    def test_query_freshness_and_results(self):
+        index = NewsIndex(":memory:")
+        assert not index.is_fresh("Bitcoin ETF", 60)
+        index.ingest(self.articles()[:2], provider="NewsAPI", query="Bitcoin ETF")
+        index.mark_fetched("Bitcoin ETF", limit=10)
+
+        assert index.is_fresh("bitcoin  etf", 60)
+        assert index.is_fresh("bitcoin etf", 60, limit=10)
+        assert not index.is_fresh("bitcoin etf", 60, limit=50)
+        assert [a.url for a in index.results("bitcoin etf")] == ["https://example.com/1", "https://example.com/2"]
+        time.sleep(0.01)
+        assert not index.is_fresh("bitcoin etf", 0.001)
+
+    def test_refetch_replaces_results(self):
+        index = NewsIndex(":memory:")
+        index.ingest_all({
+            "P1": [Article(title="old a", url="https://example.com/a")],
+            "P2": [Article(title="old b", url="https://example.com/b")],
+        }, query="bitcoin")
+        index.ingest_all({
+            "P1": [Article(title="new c", url="https://example.com/c")],
+            "P2": [Article(title="new d", url="https://example.com/d"), Article(title="old a", url="https://example.com/a")],
+        }, query="bitcoin")
+        assert [a.title for a in index.results("bitcoin")] == ["new c", "new d", "old a"]
+
+        index.ingest([Article(title="new e", url="https://example.com/e")], provider="P1", query="bitcoin")
+        assert [a.title for a in index.results("bitcoin")] == ["new e"]
+        assert len(index) == 5
+
+    def test_eviction(self):
+        index = NewsIndex(":memory:", retention_seconds=0.01)
+        index.ingest(self.articles(), query="bitcoin")
+        time.sleep(0.02)
+        assert index.evict() == 3
+        assert len(index) == 0
+        assert index.results("bitcoin") == []
+        assert index.search("bitcoin") == []
+
+    def test_shared_index(self, tmp_path, monkeypatch: pytest.MonkeyPatch): # type: ignore
+        monkeypatch.setattr(news_index, "NEWS_INDEX_FILE", str(tmp_path / "news_index.db"))
+        get_news_index.cache_clear()
+        try:
+            index = get_news_index(3600)
+            assert get_news_index(3600) is index
+            assert index.retention_seconds == 3600
+        finally:
+            get_news_index.cache_clear()
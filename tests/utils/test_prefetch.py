@@ -0,0 +1,115 @@
+import pytest
+from types import SimpleNamespace
+from app.api.core.assets import AssetUsage, get_asset_usage
+from app.api.core.caching import get_cache_policy
+from app.api.core.markets import ProductInfo
+from app.api.prefetch import REFRESH_MARGIN_SECONDS, PrefetchDaemon, RequestBudget
+from app.api.tools import MarketAPIsTool, market_tool
+from app.configs import PrefetchConfig
+
+
+class FakeTool:
+    def __init__(self, wrappers: int = 1, failing: bool = False):
+        self.handler = SimpleNamespace(wrappers=[object()] * wrappers)
+        self.failing = failing
+        self.calls: list[tuple[str, object]] = []
+
+    def __getattr__(self, name: str):
+        def call(*args: object):
+            self.calls.append((name, args[0] if args else None))
+            if self.failing:
+                raise Exception("Intentional Failure")
+            return []
+        return call
+
+
+class FakeMarketHandler:
+    def __init__(self):
+        self.requested: list[list[str]] = []
+
+    def try_call(self, func): # type: ignore
+        return func(self) # type: ignore
+
+    def get_products(self, asset_ids: list[str]) -> list[ProductInfo]:
+        self.requested.append(asset_ids)
+        return [ProductInfo(symbol=asset_id, price=1.0) for asset_id in asset_ids]
+
+
+def build_daemon(max_requests: int, failing_news: bool = False) -> tuple[PrefetchDaemon, FakeTool, FakeTool, FakeTool]:
+    config = PrefetchConfig(top_assets=3, social_limit=2, max_requests_per_hour=max_requests, min_request_interval_seconds=0)
+    market, news, social = FakeTool(), FakeTool(failing=failing_news), FakeTool(wrappers=2)
+    return PrefetchDaemon(config, market, news, social), market, news, social
+
+
+@pytest.mark.wrapper
+class TestRequestBudget:
+    def test_spend_within_budget(self):
+        budget = RequestBudget(5)
+        assert budget.try_spend(3)
+        assert budget.try_spend(2)
+        assert not budget.try_spend(1)
+        assert budget.available() == 0
+
+    def test_window_expires(self):
+        budget = RequestBudget(2, window_seconds=0)
+        assert budget.try_spend(2)
+        assert budget.try_spend(2)
+
+
+@pytest.mark.wrapper
+class TestPrefetchDaemon:
+    def test_most_used_assets_first(self):
+        get_asset_usage().record(["DOGE", "DOGE", "SOL"])
+        daemon, *_ = build_daemon(100)
+        assets = daemon.top_assets()
+        assert assets[:2] == ["DOGE", "SOL"]
+        assert len(assets) == 3
+
+    def test_refresh_all_tasks(self):
+        daemon, market, news, social = build_daemon(100)
+        assert daemon.refresh() == 6
+        assert market.calls[0][0] == "refresh_products"
+        assert [name for name, _ in news.calls] == ["get_top_headlines"] + ["get_latest_news"] * 3
+        assert social.calls == [("get_top_crypto_posts_aggregated", 2)]
+
+    def test_budget_skips_tasks(self):
+        daemon, market, news, social = build_daemon(4)
+        assert daemon.refresh() == 2 # products (3) and headlines (1)
+        assert len(market.calls) == 1
+        assert len(news.calls) == 1
+        assert social.calls == []
+        assert daemon.refresh() == 0
+
+    def test_failures_do_not_stop_refresh(self):
+        daemon, market, news, social = build_daemon(100, failing_news=True)
+        assert daemon.refresh() == 2
+        assert len(news.calls) == 4
+        assert len(social.calls) == 1
+
+    def test_default_refresh_fits_budget(self, monkeypatch: pytest.MonkeyPatch):
+        config = PrefetchConfig()
+        monkeypatch.setattr(PrefetchDaemon, "top_assets", lambda self: [f"A{i}" for i in range(config.top_assets)]) # type: ignore
+        daemon = PrefetchDaemon(config, FakeTool(), FakeTool(), FakeTool(wrappers=3))
+        cost = sum(cost for _, cost, _ in daemon.tasks())
+        assert cost * 60 / config.interval_minutes <= config.max_requests_per_hour
+
+    def test_prefetched_products_fresh_for_interval(self, monkeypatch: pytest.MonkeyPatch):
+        now = [0.0]
+        monkeypatch.setattr(market_tool, "time", SimpleNamespace(monotonic=lambda: now[0]))
+        monkeypatch.setattr(market_tool, "PRODUCT_CACHE", {})
+        monkeypatch.setattr(market_tool, "get_asset_usage", AssetUsage)
+        monkeypatch.setattr(PrefetchDaemon, "top_assets", lambda self: ["BTC", "ETH"]) # type: ignore
+        market = MarketAPIsTool.__new__(MarketAPIsTool)
+        market.handler = FakeMarketHandler() # type: ignore
+
+        config = PrefetchConfig(min_request_interval_seconds=0)
+        daemon = PrefetchDaemon(config, market, FakeTool(), FakeTool())
+        get_cache_policy.cache_clear()
+        try:
+            daemon.extend_cache_ttls()
+            daemon.refresh()
+            now[0] = config.interval_minutes * 60 + REFRESH_MARGIN_SECONDS / 2
+            assert [p.symbol for p in market.get_products(["BTC", "ETH"])] == ["BTC", "ETH"]
+            assert market.handler.requested == [["BTC", "ETH"]] # type: ignore
+        finally:
+            get_cache_policy.cache_clear()
@@ -0,0 +1,131 @@
+import json
+import time
+import pytest
+from app.api.core.markets import MarketWrapper, Price, ProductInfo
+from app.api.core.news import Article, NewsWrapper
+from app.api.replay import InjectedFailure, interface_of
+from app.api.wrapper_handler import WrapperHandler
+from app.configs import ReplayConfig, ReplayProfile
+
+
+class FakeMarketWrapper(MarketWrapper):
+    created = 0
+
+    def __init__(self):
+        FakeMarketWrapper.created += 1
+        self.calls = 0
+
+    def get_product(self, asset_id: str) -> ProductInfo:
+        self.calls += 1
+        return ProductInfo(id=f"{asset_id}-USD", symbol=asset_id, price=100.0 + self.calls)
+
+    def get_historical_prices(self, asset_id: str, limit: int = 100) -> list[Price]:
+        return [Price(close=float(i)) for i in range(limit)]
+
+    def get_products(self, asset_ids: list[str]) -> list[ProductInfo]:
+        raise Exception("Provider down")
+
+
+class FakeNewsWrapper(NewsWrapper):
+    def get_top_headlines(self, limit: int = 100) -> list[Article]:
+        return [Article(title=f"Headline {i}") for i in range(limit)]
+
+
+def config(tmp_path, mode: str, **profile: float) -> ReplayConfig:
+    return ReplayConfig(mode=mode, directory=str(tmp_path), default=ReplayProfile(**profile))
+
+
+def record(tmp_path) -> None:
+    handler = WrapperHandler.build_wrappers([FakeMarketWrapper], try_per_wrapper=1, retry_delay=0, replay=config(tmp_path, "record"))
+    handler.try_call(lambda w: w.get_product("BTC"))
+    handler.try_call(lambda w: w.get_product(asset_id="BTC"))
+    handler.try_call(lambda w: w.get_historical_prices("BTC", limit=3))
+    with pytest.raises(Exception):
+        handler.try_call(lambda w: w.get_products(["BTC"]))
+
+
+@pytest.mark.wrapper
+class TestReplay:
+    def test_interface_of(self):
+        assert interface_of(FakeMarketWrapper) is MarketWrapper
+        assert interface_of(FakeNewsWrapper) is NewsWrapper
+        with pytest.raises(ValueError):
+            interface_of(int)
+
+    def test_record_fixtures(self, tmp_path):
+        record(tmp_path)
+        with open(tmp_path / "FakeMarketWrapper.json") as file:
+            fixtures = json.load(file)
+        assert [entry["result"]["price"] for entry in fixtures["get_product"]['{"asset_id": "BTC"}']] == [101.0, 102.0]
+        assert len(fixtures["get_historical_prices"]['{"asset_id": "BTC", "limit": 3}'][0]["result"]) == 3
+        assert "Provider down" in fixtures["get_products"]['{"asset_ids": ["BTC"]}'][0]["error"]
+
+    def test_replay_without_network(self, tmp_path):
+        record(tmp_path)
+        created = FakeMarketWrapper.created
+        handler = WrapperHandler.build_wrappers([FakeMarketWrapper], try_per_wrapper=1, retry_delay=0, replay=config(tmp_path, "replay"))
+        assert FakeMarketWrapper.created == created
+
+        first = handler.try_call(lambda w: w.get_product("BTC"))
+        second = handler.try_call(lambda w: w.get_product("BTC"))
+        third = handler.try_call(lambda w: w.get_product("BTC"))
+        assert isinstance(first, ProductInfo)
+        assert [first.price, second.price, third.price] == [101.0, 102.0, 101.0]
+        assert [p.close for p in handler.try_call(lambda w: w.get_historical_prices("BTC", 3))] == [0.0, 1.0, 2.0]
+        assert list(handler.try_call_all(lambda w: w.get_product("BTC"))) == ["FakeMarketWrapper"]
+
+        with pytest.raises(Exception) as exc_info:
+            handler.try_call(lambda w: w.get_products(["BTC"]))
+        assert "Provider down" in str(exc_info.value)
+        with pytest.raises(Exception) as exc_info:
+            handler.try_call(lambda w: w.get_product("ETH"))
+        assert "No recorded response" in str(exc_info.value)
+
+    def test_synthetic_latency(self, tmp_path):
+        record(tmp_path)
+        handler = WrapperHandler.build_wrappers([FakeMarketWrapper], replay=config(tmp_path, "replay", latency_ms=60, jitter_ms=20))
+        start = time.monotonic()
+        handler.try_call(lambda w: w.get_product("BTC"))
+        assert time.monotonic() - start >= 0.04
+
+    def test_injected_failures(self, tmp_path):
+        record(tmp_path)
+        handler = WrapperHandler.build_wrappers([FakeMarketWrapper], try_per_wrapper=1, retry_delay=0, replay=config(tmp_path, "replay", failure_rate=1.0))
+        with pytest.raises(Exception) as exc_info:
+            handler.try_call(lambda w: w.get_product("BTC"))
+        assert "Injected failure of FakeMarketWrapper.get_product" in str(exc_info.value)
+
+        wrapper = handler.wrappers[0]
+        with pytest.raises(InjectedFailure):
+            wrapper.get_product("BTC")
+
+    def test_failures_are_reproducible(self, tmp_path):
+        record(tmp_path)
+        def outcomes() -> list[bool]:
+            wrapper = WrapperHandler.build_wrappers([FakeMarketWrapper], replay=config(tmp_path, "replay", failure_rate=0.5)).wrappers[0]
+            results: list[bool] = []
+            for _ in range(20):
+                try:
+                    wrapper.get_product("BTC")
+                    results.append(True)
+                except InjectedFailure:
+                    results.append(False)
+            return results
+        first = outcomes()
+        assert first == outcomes()
+        assert True in first and False in first
+
+    def test_provider_profiles(self, tmp_path):
+        recorder = WrapperHandler.build_wrappers([FakeNewsWrapper], replay=config(tmp_path, "record"))
+        recorder.try_call(lambda w: w.get_top_headlines(2))
+        replay = ReplayConfig(mode="replay", directory=str(tmp_path), providers={"FakeNewsWrapper": ReplayProfile(failure_rate=1.0)})
+        handler = WrapperHandler.build_wrappers([FakeNewsWrapper], try_per_wrapper=1, retry_delay=0, replay=replay)
+        with pytest.raises(Exception):
+            handler.try_call(lambda w: w.get_top_headlines(2))
+
+        default = WrapperHandler.build_wrappers([FakeNewsWrapper], replay=ReplayConfig(mode="replay", directory=str(tmp_path)))
+        assert [a.title for a in default.try_call(lambda w: w.get_top_headlines(limit=2))] == ["Headline 0", "Headline 1"]
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(AssertionError):
+            WrapperHandler.build_wrappers([FakeMarketWrapper], replay=config(tmp_path, "offline"))
@@ -0,0 +1,55 @@
+import pytest
+from app.api.core import sentiment
+from app.api.core.mentions import MentionExtractor
+from app.api.core.sentiment import aggregate_sentiment, annotate_posts, polarity_scores
+from app.api.core.social import SocialComment, SocialPost
+from app.api.core.symbols import SymbolIndex
+
+
+def extractor() -> MentionExtractor:
+    index = SymbolIndex(
+        ["BTC-USD", "ETH-USD", "SOL-USD", "LINK-USD", "BCH-USD", "SHIB-USD"],
+        ["Bitcoin USD", "Ethereum USD", "Solana USD", "Chainlink USD", "Bitcoin Cash USD", "Shiba Inu USD"],
+        ["2T", "500B", "80B", "10B", "9B", "8B"],
+    )
+    return MentionExtractor(index)
+
+
+@pytest.mark.social
+class TestSentiment:
+
+    def test_polarity(self):
+        bullish, bearish, neutral = polarity_scores(["BTC rally to the moon 🚀", "ETH crash, total scam", "The meeting is on Monday"])
+        assert bullish > 0.5
+        assert bearish < -0.5
+        assert neutral == 0.0
+
+    def test_negation(self):
+        negated, broken, other_text = polarity_scores(["this is not a scam", "not today. scam", "not"])
+        assert negated > 0
+        assert broken < 0
+        assert other_text == 0.0
+        assert polarity_scores(["not", "scam"])[1] < 0 # negations do not cross texts
+
+    def test_mentions(self):
+        mentions = extractor()
+        assert mentions.extract("$SOL and ETH pumping, bitcoin cash and shiba inu too") == ["SOL", "ETH", "BCH", "SHIB"]
+        assert mentions.extract("btc and eth, or Bitcoin again") == ["BTC", "ETH"]
+        assert mentions.extract("click the link, ONE more time") == []
+        assert mentions.extract("$LINK to the moon, ether too") == ["LINK", "ETH"]
+
+    def test_annotate_and_aggregate(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(sentiment, "get_mention_extractor", extractor)
+        posts = annotate_posts([
+            SocialPost(title="BTC breakout", description="Bitcoin to the moon"),
+            SocialPost(title="Solana", description="SOL is a scam", comments=[SocialComment(description="BTC will crash too")]),
+            SocialPost(title="BTC", description="Nothing new"),
+        ])
+        assert [post.tickers for post in posts] == [["BTC"], ["SOL", "BTC"], ["BTC"]]
+        assert posts[0].sentiment > 0 and posts[1].sentiment < 0 and posts[2].sentiment == 0
+
+        summary = {s.asset: s for s in aggregate_sentiment(posts)}
+        assert list(summary) == ["BTC", "SOL"]
+        assert (summary["BTC"].mentions, summary["BTC"].bullish, summary["BTC"].bearish, summary["BTC"].neutral) == (3, 1, 1, 1)
+        assert summary["BTC"].bullish_ratio == 0.5
+        assert summary["SOL"].bullish_ratio == 0.0
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from agno.agent import RunEvent
+from agno.run.team import TeamRunEvent
+from agno.run.workflow import WorkflowRunEvent
+from app.agents.pipeline import Pipeline
+from app.agents.core import QueryInputs
+from app.api.core.tracing import Trace, new_run_id, set_trace, span, team_tracing_hook, tool_tracing_hook
+from app.api.wrapper_handler import WrapperHandler
+
+
+class MockWrapper:
+    def do_something(self) -> str:
+        return "Success"
+
+class FailingWrapper(MockWrapper):
+    def do_something(self) -> str:
+        raise Exception("Intentional Failure")
+
+
+class FakeWorkflow:
+    def __init__(self, events: list[SimpleNamespace]):
+        self.events = events
+
+    async def arun(self, query, stream, stream_intermediate_steps): # type: ignore
+        async def iterate():
+            for event in self.events:
+                yield event
+                await asyncio.sleep(0)
+        return iterate()
+
+
+class TeamWorkflow(FakeWorkflow):
+    """Calls a tool of the team leader after the first event, as agno does while the team is running"""
+
+    async def arun(self, query, stream, stream_intermediate_steps): # type: ignore
+        async def iterate():
+            for i, event in enumerate(self.events):
+                yield event
+                await asyncio.sleep(0)
+                if i == 1:
+                    team_tracing_hook("CryptoAnalysisTeam")("think", lambda **_: "ok", {})
+        return iterate()
+
+
+def by_name(trace: Trace) -> dict[str, list]:
+    spans: dict[str, list] = {}
+    for s in trace.spans:
+        spans.setdefault(s.name, []).append(s)
+    return spans
+
+
+@pytest.mark.wrapper
+class TestTracing:
+    def test_unique_run_ids(self):
+        ids = {new_run_id() for _ in range(1000)}
+        assert len(ids) == 1000
+        assert all(len(run_id) == 32 for run_id in ids)
+
+    def test_no_trace_records_nothing(self):
+        set_trace(None)
+        with span("outside", "tool") as opened:
+            assert opened is None
+        assert tool_tracing_hook("sum", lambda a, b: a + b, {"a": 1, "b": 2}) == 3
+
+    def test_nested_spans_across_threads(self):
+        trace = Trace(query="btc")
+        agent = SimpleNamespace(name="Market Agent")
+        handler = WrapperHandler.build_wrappers([FailingWrapper, MockWrapper], try_per_wrapper=2, retry_delay=0)
+
+        async def run():
+            set_trace(trace)
+            trace.start_step("Info Recovery")
+            call = lambda **_: handler.try_call(lambda w: w.do_something())
+            return await asyncio.to_thread(tool_tracing_hook, "get_product", call, {"asset_id": "BTC"}, agent)
+
+        assert asyncio.run(run()) == "Success"
+        trace.finish(outcome="completed")
+        spans = by_name(trace)
+        step, agent_span, tool = spans["Info Recovery"][0], spans["Market Agent"][0], spans["get_product"][0]
+        assert agent_span.parent_id == step.span_id
+        assert tool.parent_id == agent_span.span_id
+        assert tool.attributes["arguments"] == '{"asset_id": "BTC"}'
+
+        failing, succeeded = spans["FailingWrapper"], spans["MockWrapper"]
+        assert [s.attributes["attempt"] for s in failing] == [1, 2]
+        assert all(s.parent_id == tool.span_id and s.error for s in failing)
+        assert succeeded[0].parent_id == tool.span_id and succeeded[0].error is None
+        assert all(s.end_ns >= s.start_ns for s in trace.spans)
+        assert agent_span.attributes["unfinished"] is True
+
+    def test_export(self, tmp_path):
+        trace = Trace(query="btc")
+        set_trace(trace)
+        with span("attempt", "provider"):
+            pass
+        set_trace(None)
+        trace.finish(error="timeout", outcome="timeout")
+
+        with open(trace.export(str(tmp_path), "chrome")) as file:
+            chrome = json.load(file)
+        complete = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+        assert [e["name"] for e in complete] == ["Pipeline run", "attempt"]
+        assert complete[1]["args"]["parent_id"] == complete[0]["args"]["span_id"]
+        assert complete[0]["args"]["error"] == "timeout"
+
+        with open(trace.export(str(tmp_path), "otlp")) as file:
+            otlp = json.load(file)
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {s["traceId"] for s in spans} == {trace.run_id}
+        assert spans[0]["status"] == {"code": 2, "message": "timeout"}
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert {"key": "query", "value": {"stringValue": "btc"}} in spans[0]["attributes"]
+
+    def test_pipeline_run_stream(self):
+        def event(name: str, **fields) -> SimpleNamespace:
+            return SimpleNamespace(event=name, **fields)
+
+        metrics = SimpleNamespace(input_tokens=10, output_tokens=5, duration=0.1, time_to_first_token=0.05)
+        workflow = FakeWorkflow([
+            event(WorkflowRunEvent.step_started.value, step_name="Query Check"),
+            event(RunEvent.run_started.value, step_name="Query Check", agent_name="Query Check Agent"),
+            event(RunEvent.run_completed.value, step_name="Query Check", agent_name="Query Check Agent", metrics=metrics),
+            event(WorkflowRunEvent.step_completed.value, step_name="Query Check", content="done"),
+        ])
+        trace = Trace()
+
+        async def run():
+            return [chunk async for chunk in Pipeline.run_stream(workflow, QueryInputs(user_query="btc", strategy=""), events=[], trace=trace)] # type: ignore
+
+        assert asyncio.run(run()) == ["done"]
+        spans = by_name(trace)
+        step, agent = spans["Query Check"][0], spans["Query Check Agent"][0]
+        assert agent.parent_id == step.span_id
+        assert agent.attributes == {"agent": "Query Check Agent", "input_tokens": 10, "output_tokens": 5}
+        assert trace.root.attributes["outcome"] == "completed"
+        assert all(s.end_ns for s in trace.spans)
+
+    def test_team_leader_tools(self):
+        def event(name: str, **fields) -> SimpleNamespace:
+            return SimpleNamespace(event=name, **fields)
+
+        workflow = TeamWorkflow([
+            event(WorkflowRunEvent.step_started.value, step_name="Info Recovery"),
+            event(TeamRunEvent.run_started.value, step_name="Info Recovery", team_name="CryptoAnalysisTeam"),
+            event(TeamRunEvent.run_completed.value, step_name="Info Recovery", team_name="CryptoAnalysisTeam", metrics=None),
+            event(WorkflowRunEvent.step_completed.value, step_name="Info Recovery", content="done"),
+        ])
+        trace = Trace()
+
+        async def run():
+            return [chunk async for chunk in Pipeline.run_stream(workflow, QueryInputs(user_query="btc", strategy=""), events=[], trace=trace)] # type: ignore
+
+        assert asyncio.run(run()) == ["done"]
+        spans = by_name(trace)
+        assert "agent" not in spans
+        team, tool = spans["CryptoAnalysisTeam"], spans["think"][0]
+        assert len(team) == 1
+        assert team[0].parent_id == spans["Info Recovery"][0].span_id
+        assert tool.parent_id == team[0].span_id
+        assert "unfinished" not in team[0].attributes
+        assert team[0].end_ns <= spans["Info Recovery"][0].end_ns
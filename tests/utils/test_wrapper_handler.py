@@ -1,4 +1,5 @@
 import pytest
+from app.api.core.deadline import Deadline, DeadlineExceeded, set_deadline
 from app.api.wrapper_handler import WrapperHandler
 
 class MockWrapper:
@@ -144,3 +145,27 @@ class TestWrapperHandler:
         with pytest.raises(Exception) as exc_info:
             handler.try_call_all(lambda w: w.do_something("param", 99))
         assert "All wrappers failed" in str(exc_info.value)
+
+    def test_cancelled_deadline_stops_retries(self):
+        calls: list[str] = []
+        deadline = Deadline()
+
+        class CancellingWrapper(MockWrapper):
+            def do_something(self) -> str:
+                calls.append("call")
+                deadline.cancel()
+                raise Exception("Intentional Failure")
+
+        handler = WrapperHandler.build_wrappers([CancellingWrapper, MockWrapper], try_per_wrapper=3, retry_delay=10)
+        set_deadline(deadline)
+        with pytest.raises(DeadlineExceeded):
+            handler.try_call(lambda w: w.do_something())
+        set_deadline(Deadline())
+        assert calls == ["call"]
+
+    def test_shared_wrappers_are_reused(self):
+        first = WrapperHandler.build_wrappers([MockWrapper, MockWrapper2], shared=True)
+        second = WrapperHandler.build_wrappers([MockWrapper2], shared=True)
+        private = WrapperHandler.build_wrappers([MockWrapper2])
+        assert first.wrappers[1] is second.wrappers[0]
+        assert private.wrappers[0] is not second.wrappers[0]